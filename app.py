@@ -1,5 +1,5 @@
 import streamlit as st
-from utils import get_ip_info
+from utils import ensure_ip_info
 
 # Set page configuration
 st.set_page_config(page_title="Smart Insights", page_icon="📊")
@@ -11,19 +11,39 @@ if "currency" not in st.session_state:
     st.session_state["currency"] = "USD"
 if "country" not in st.session_state:
     st.session_state["country"] = "United States"
-if "ipinfo" not in st.session_state:
-    st.session_state["ipinfo"] = get_ip_info()
+
+# The IP lookup runs in the background and never blocks first paint
+ensure_ip_info()
+
+def location_badge():
+    ipinfo = ensure_ip_info()
+    st.info(f"🌍 {ipinfo.get('country', 'Unknown')}, {ipinfo.get('city', 'Unknown')}")
+
+# Polls only while the lookup is in flight; once it lands the app reruns and shows the static badge
+@st.fragment(run_every=2)
+def locating_badge():
+    ensure_ip_info()
+    if "ipinfo_future" in st.session_state:
+        st.info("🌍 Locating...")
+    else:
+        st.rerun()
 
 # Sidebar setup
 st.sidebar.title("Smart Insights")
 st.sidebar.markdown("Helping small businesses make data-driven decisions.")
 st.sidebar.markdown("---")
-st.sidebar.info(
-    f"🌍 {st.session_state['ipinfo'].get('country', 'Unknown')}, "
-    f"{st.session_state['ipinfo'].get('city', 'Unknown')}"
-)
+with st.sidebar:
+    if "ipinfo_future" in st.session_state:
+        locating_badge()
+    else:
+        location_badge()
 st.sidebar.markdown("**Version 1.0** | © 2025 Smart Insights")
 
 # Placeholder main page
 st.title("Smart Insights App")
 st.success("App loaded successfully ✅")
+
+# Scheduled email reports left in the queue run after a restart; imported after first paint
+from utils.reports import start_workers_from_secrets
+
+start_workers_from_secrets(st.secrets)
@@ -0,0 +1,62 @@
+"""
+Compare forecasting engines on synthetic monthly series.
+
+Each series has a linear trend, yearly seasonality and noise; the last
+12 months are held out. Reports fit+predict time and holdout MAPE per
+engine and series length. Prophet is skipped when it is not installed.
+
+    python -m benchmarks.forecasters
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.forecasters import ENGINES, make_forecaster, prophet_available
+
+HOLDOUT = 12
+
+
+def synthetic_series(n_months, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_months)
+    y = 1_000 + 8 * t + 150 * np.sin(2 * np.pi * t / 12) + rng.normal(0, 40, n_months)
+    return pd.DataFrame({"ds": pd.date_range("2010-01-01", periods=n_months, freq="MS"), "y": y})
+
+
+def run(lengths, repeats=3, time_budget=2.0) -> pd.DataFrame:
+    engines = [name for name in ENGINES if name != "prophet" or prophet_available()] + ["auto"]
+    rows = []
+    for n in lengths:
+        df = synthetic_series(n + HOLDOUT)
+        train, test = df.iloc[:-HOLDOUT], df.iloc[-HOLDOUT:]
+        for engine in engines:
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                model = make_forecaster(engine, train, time_budget=time_budget).fit(train)
+                forecast = model.predict(HOLDOUT)
+                timings.append(time.perf_counter() - started)
+            yhat = forecast["yhat"].to_numpy()[-HOLDOUT:]
+            mape = np.mean(np.abs(yhat - test["y"].to_numpy()) / np.abs(test["y"].to_numpy())) * 100
+            rows.append({
+                "months": n,
+                "engine": engine if engine != "auto" else f"auto ({model.name})",
+                "fit_ms": min(timings) * 1000,
+                "mape_pct": mape,
+            })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[12, 36, 120, 600])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--time-budget", type=float, default=2.0)
+    args = parser.parse_args()
+    print(run(args.lengths, args.repeats, args.time_budget).to_string(index=False, float_format="%.2f"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Import-time profile of the app and its pages.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter
+per target, parses the report and prints the slowest imports by
+cumulative time. ``--budget-ms`` makes the run fail when a target's total
+import time exceeds the budget, so cold-start regressions show up.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time utils pages.dashboard --top 15 --budget-ms 1500
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+DEFAULT_TARGETS = ["streamlit", "utils", "utils.forecasting", "utils.store", "utils.ingest"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module) -> pd.DataFrame:
+    """Per-module self and cumulative import time (ms) for ``import module``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list per target")
+    parser.add_argument("--budget-ms", type=float, default=None, help="fail if a target exceeds this total")
+    args = parser.parse_args()
+
+    summary, over_budget = [], []
+    for target in args.targets:
+        profile = import_profile(target)
+        total = profile.loc[profile["depth"] == 0, "cumulative_ms"].sum()
+        summary.append({"target": target, "total_ms": total, "modules": len(profile)})
+        print(f"\n== import {target}: {total:.1f} ms across {len(profile)} modules")
+        slowest = profile.sort_values("cumulative_ms", ascending=False).head(args.top)
+        print(slowest.to_string(index=False, float_format="%.1f"))
+        if args.budget_ms is not None and total > args.budget_ms:
+            over_budget.append(target)
+
+    print("\n== Summary")
+    print(pd.DataFrame(summary).to_string(index=False, float_format="%.1f"))
+    if over_budget:
+        print(f"\nOver the {args.budget_ms:.0f} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
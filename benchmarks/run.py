@@ -0,0 +1,318 @@
+"""
+End-to-end benchmarks of the page pipelines on synthetic datasets.
+
+Runs each pipeline headlessly (no Streamlit) on ``benchmarks.synthetic``
+data at every requested size and reports wall time (best of ``--repeats``,
+each from a cold cache) and peak traced memory (one extra run under
+``tracemalloc``):
+
+- ``ingest``: chunked CSV read plus writing the dataset store, as the Home page upload does
+- ``dashboard``: KPIs, currency conversion and every revenue rollup
+- ``forecast``: monthly revenue series, model fit and a 12 month prediction
+- ``ml``: split, encode and train, sampled the way ML Insights samples large data
+- ``export_csv`` / ``export_xlsx``: streamed export with currency conversion
+- ``dashboard_duckdb`` / ``ml_duckdb``: the dashboard and ML pipelines on the
+  DuckDB engine, to compare with the pandas ones as sizes grow (skipped when
+  duckdb is not installed; DuckDB's own memory is not seen by tracemalloc,
+  so their ``peak_mb`` only covers the Python side)
+
+External APIs are never called: exchange rates come from a fixed
+``StaticRateSource`` and any other HTTP request raises. App state (dataset
+store, models, caches) goes to a temporary directory that is removed
+afterwards; generated CSVs are kept in ``--data-dir`` for reuse.
+
+``--save-baseline`` stores the results as JSON; ``--baseline`` compares a
+run against it and exits non-zero when a pipeline is more than
+``--tolerance`` slower, so a change can be judged on the same machine.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --sizes 10000 100000 1000000 10000000 --pipelines ingest dashboard
+    python -m benchmarks.run --save-baseline data/benchmarks/baseline.json
+    python -m benchmarks.run --baseline data/benchmarks/baseline.json --tolerance 0.15
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The utils modules read these at import time, so set them before importing any.
+WORK_DIR = tempfile.mkdtemp(prefix="bpd-bench-")
+os.environ["BPD_DATA_DIR"] = os.path.join(WORK_DIR, "data")
+os.environ["BPD_MODELS_DIR"] = os.path.join(WORK_DIR, "models")
+
+import pandas as pd  # noqa: E402
+
+from benchmarks.synthetic import dataset_csv  # noqa: E402
+
+DEFAULT_SIZES = [10_000, 100_000]
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+RATES = {"EUR": 0.92, "GBP": 0.79, "JPY": 151.3, "NGN": 1480.0, "CAD": 1.36, "AUD": 1.52}
+TARGET = "Churned"
+FEATURES = ["Region", "Product", "Channel", "Quantity", "Price", "Amount"]
+ML_PARAMS = {"n_estimators": 50, "max_depth": 12}
+
+
+class Skip(Exception):
+    pass
+
+
+class OfflineClient:
+    """Stands in for the shared HTTP client so no benchmark reaches the network."""
+
+    def get_json(self, url, **kwargs):
+        raise RuntimeError(f"Network access is disabled in benchmarks: {url}")
+
+
+def stub_external_apis():
+    from utils import http
+    from utils.fx import StaticRateSource, set_rate_source
+
+    http._client = OfflineClient()
+    set_rate_source(StaticRateSource(RATES))
+
+
+def ingest(ctx):
+    from utils.ingest import HAS_PYARROW, read_csv_chunked
+    from utils.store import DatasetStore
+
+    data = read_csv_chunked(ctx["csv"], engine="pyarrow" if HAS_PYARROW else "c")
+    store = DatasetStore(os.path.join(WORK_DIR, "ingest"))
+    store.put(data, "bench")
+    store.delete("bench")
+
+
+def dashboard(ctx):
+    from utils.aggregates import PERIODS, get_aggregates
+    from utils.fx import get_rate
+    from utils.store import dataset_key, load_dataset
+
+    dataset = ctx["dataset"]
+    aggregates = get_aggregates(dataset_key(dataset), "Date", "Amount",
+                                lambda cols: load_dataset(dataset, columns=dict.fromkeys(cols)))
+    rate = get_rate("USD", "EUR")
+    aggregates.total * rate, aggregates.mean * rate
+    for freq in PERIODS.values():
+        aggregates.rollup(freq)
+
+
+def forecast(ctx):
+    from utils.aggregates import get_aggregates
+    from utils.forecasters import prophet_available
+    from utils.forecasting import fit_model
+    from utils.store import dataset_key, load_dataset
+
+    dataset = ctx["dataset"]
+    monthly = get_aggregates(dataset_key(dataset), "Date", "Amount",
+                             lambda cols: load_dataset(dataset, columns=dict.fromkeys(cols))).rollup("M")
+    df = pd.DataFrame({"ds": monthly.index, "y": monthly.to_numpy()})
+    fit_model(df, "prophet" if prophet_available() else "auto").predict(12, include_history=True)
+
+
+def ml(ctx, engine="pandas"):
+    from utils.ml import DEFAULT_ENCODING, sample_size, select_model, train, training_key
+    from utils.store import dataset_key, load_dataset
+
+    dataset = ctx["dataset"]
+    sample_rows = sample_size(dataset.n_rows)
+    model_name = select_model(dataset.n_rows, DEFAULT_ENCODING)
+    data_key = f"{dataset_key(dataset)}:{engine}"
+    if engine == "duckdb":
+        from utils.sql import select_rows
+
+        load = lambda: select_rows(dataset, [*FEATURES, TARGET], not_null=[TARGET], sample_rows=sample_rows)
+    else:
+        load = lambda: load_dataset(dataset, columns=dict.fromkeys([TARGET, *FEATURES]))
+    key = training_key(data_key, TARGET, FEATURES, ML_PARAMS, DEFAULT_ENCODING, model_name, sample_rows)
+    train(key, data_key, load, TARGET, FEATURES, ML_PARAMS, DEFAULT_ENCODING, model_name, sample_rows)
+
+
+def _require_duckdb():
+    from utils.sql import HAS_DUCKDB
+
+    if not HAS_DUCKDB:
+        raise Skip("duckdb is not installed")
+
+
+def dashboard_duckdb(ctx):
+    from utils.aggregates import PERIODS, get_aggregates
+    from utils.fx import get_rate
+    from utils.sql import revenue_aggregates
+    from utils.store import dataset_key
+
+    _require_duckdb()
+    dataset = ctx["dataset"]
+    aggregates = get_aggregates(dataset_key(dataset), "Date", "Amount", None,
+                                compute=lambda: revenue_aggregates(dataset, "Date", "Amount"), engine="duckdb")
+    rate = get_rate("USD", "EUR")
+    aggregates.total * rate, aggregates.mean * rate
+    for freq in PERIODS.values():
+        aggregates.rollup(freq)
+
+
+def ml_duckdb(ctx):
+    _require_duckdb()
+    ml(ctx, engine="duckdb")
+
+
+def _export(ctx, fmt):
+    from utils.export import convert_chunks, export_to_tempfile, remove_export
+    from utils.store import iter_dataset
+
+    remove_export(export_to_tempfile(convert_chunks(iter_dataset(ctx["dataset"]), "EUR"), fmt))
+
+
+def export_csv(ctx):
+    _export(ctx, "csv")
+
+
+def export_xlsx(ctx):
+    from utils.export import EXCEL_MAX_ROWS
+
+    if ctx["dataset"].n_rows >= EXCEL_MAX_ROWS:
+        raise Skip(f"Excel holds at most {EXCEL_MAX_ROWS:,} rows")
+    _export(ctx, "xlsx")
+
+
+PIPELINES = {
+    "ingest": ingest,
+    "dashboard": dashboard,
+    "forecast": forecast,
+    "ml": ml,
+    "export_csv": export_csv,
+    "export_xlsx": export_xlsx,
+    "dashboard_duckdb": dashboard_duckdb,
+    "ml_duckdb": ml_duckdb,
+}
+
+
+def _cold():
+    from utils.cache import get_cache
+
+    get_cache().clear()
+    gc.collect()
+
+
+def measure(fn, ctx, repeats=3, memory=True) -> dict:
+    """Best wall time over ``repeats`` cold runs, plus peak traced memory from one more run."""
+    timings = []
+    for _ in range(repeats):
+        _cold()
+        started = time.perf_counter()
+        fn(ctx)
+        timings.append(time.perf_counter() - started)
+    peak_mb = None
+    if memory:
+        _cold()
+        tracemalloc.start()
+        try:
+            fn(ctx)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return {"wall_s": min(timings), "median_s": sorted(timings)[len(timings) // 2], "peak_mb": peak_mb}
+
+
+def prepare(n_rows, data_dir, seed=0) -> dict:
+    """Generated CSV and the dataset stored from it; excluded from the timings."""
+    from utils.ingest import read_csv_chunked
+    from utils.store import get_store
+
+    csv = dataset_csv(n_rows, data_dir, seed)
+    dataset = get_store().put(read_csv_chunked(csv), f"sales-{n_rows}-{seed}")
+    return {"csv": csv, "dataset": dataset}
+
+
+def run(sizes, pipelines, repeats=3, memory=True, data_dir=None, seed=0) -> pd.DataFrame:
+    data_dir = data_dir or os.path.join(ROOT, "data", "benchmarks")
+    stub_external_apis()
+    rows = []
+    for n_rows in sizes:
+        ctx = prepare(n_rows, data_dir, seed)
+        for name in pipelines:
+            row = {"pipeline": name, "rows": n_rows}
+            try:
+                row.update(measure(PIPELINES[name], ctx, repeats, memory))
+            except Skip as e:
+                row["note"] = f"skipped: {e}"
+            rows.append(row)
+            print(f"{name:>12} {n_rows:>11,} rows  {_describe(row)}", file=sys.stderr, flush=True)
+        del ctx
+    return pd.DataFrame(rows, columns=["pipeline", "rows", "wall_s", "median_s", "peak_mb", "note"])
+
+
+def _describe(row):
+    if "wall_s" not in row:
+        return row.get("note", "")
+    memory = f", peak {row['peak_mb']:.1f} MB" if row.get("peak_mb") is not None else ""
+    return f"{row['wall_s']:.3f} s{memory}"
+
+
+def save_baseline(results: pd.DataFrame, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    payload = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": json.loads(results.to_json(orient="records")),
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, indent=2)
+
+
+def compare(results: pd.DataFrame, path, tolerance=0.1) -> pd.DataFrame:
+    """Join ``results`` with a saved baseline; ``status`` is faster/slower beyond ``tolerance``, else same."""
+    with open(path, encoding="utf-8") as fh:
+        baseline = pd.DataFrame(json.load(fh)["results"])
+    merged = results.merge(baseline[["pipeline", "rows", "wall_s", "peak_mb"]], on=["pipeline", "rows"],
+                           how="left", suffixes=("", "_baseline"))
+    merged["time_ratio"] = merged["wall_s"] / merged["wall_s_baseline"]
+    merged["memory_ratio"] = merged["peak_mb"] / merged["peak_mb_baseline"]
+    merged["status"] = "same"
+    merged.loc[merged["time_ratio"] > 1 + tolerance, "status"] = "slower"
+    merged.loc[merged["time_ratio"] < 1 - tolerance, "status"] = "faster"
+    merged.loc[merged["time_ratio"].isna(), "status"] = "new"
+    return merged[["pipeline", "rows", "wall_s", "wall_s_baseline", "time_ratio", "peak_mb", "peak_mb_baseline",
+                   "memory_ratio", "status"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help=f"row counts (the full suite is {' '.join(map(str, SIZES))})")
+    parser.add_argument("--pipelines", nargs="+", choices=list(PIPELINES), default=list(PIPELINES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None, help="where generated CSVs are kept (default data/benchmarks)")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    try:
+        results = run(args.sizes, args.pipelines, args.repeats, not args.no_memory, args.data_dir, args.seed)
+        print(results.drop(columns="note" if results["note"].isna().all() else []).to_string(
+            index=False, float_format="%.3f"))
+        if args.save_baseline:
+            save_baseline(results, args.save_baseline)
+            print(f"\nBaseline saved to {args.save_baseline}")
+        if args.baseline:
+            comparison = compare(results, args.baseline, args.tolerance)
+            print(f"\n== Compared with {args.baseline}")
+            print(comparison.to_string(index=False, float_format="%.3f"))
+            if (comparison["status"] == "slower").any():
+                sys.exit(1)
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Synthetic business datasets for the benchmarks.
+
+``business_dataset`` builds a sales-ledger frame shaped like the uploads
+the app is meant for: a ``Date`` over three years, categorical ``Region``,
+``Product`` and ``Channel`` columns, a high-cardinality ``Customer`` id,
+``Quantity``, ``Price`` and a seasonal ``Amount`` in USD, plus a binary
+``Churned`` target that depends on the other columns. Rows are generated
+in blocks with a fixed seed, so the same size always yields the same data.
+``dataset_csv`` writes it to CSV once per size and seed and reuses the file.
+
+    python -m benchmarks.synthetic 100000 --out sales.csv
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+BLOCK_ROWS = 1_000_000
+START = pd.Timestamp("2021-01-01")
+DAYS = 3 * 365
+REGIONS = ["North", "South", "East", "West", "Central", "Online"]
+CHANNELS = ["Retail", "Wholesale", "Web", "Partner"]
+PRODUCTS = [f"P{i:03d}" for i in range(50)]
+
+
+def _block(n_rows, offset, seed) -> pd.DataFrame:
+    rng = np.random.default_rng([seed, offset])
+    day = rng.integers(0, DAYS, n_rows)
+    region = rng.integers(0, len(REGIONS), n_rows)
+    channel = rng.choice(len(CHANNELS), n_rows, p=[0.4, 0.2, 0.3, 0.1])
+    product = rng.zipf(1.3, n_rows) % len(PRODUCTS)
+    quantity = rng.poisson(3, n_rows) + 1
+    price = np.round(5 + product * 1.7 + rng.gamma(2.0, 4.0, n_rows), 2)
+    season = 1 + 0.25 * np.sin(2 * np.pi * day / 365.25) + day / DAYS * 0.3
+    amount = np.round(quantity * price * season * rng.lognormal(0, 0.1, n_rows), 2)
+    score = -1.5 + 0.4 * (channel == 2) - 0.02 * quantity + 0.3 * (region == 5) + rng.normal(0, 1, n_rows)
+    customers = max(n_rows // 20, 100)
+    return pd.DataFrame({
+        "Date": START + pd.to_timedelta(day, unit="D"),
+        "Region": pd.Categorical.from_codes(region, REGIONS),
+        "Product": pd.Categorical.from_codes(product, PRODUCTS),
+        "Channel": pd.Categorical.from_codes(channel, CHANNELS),
+        "Customer": pd.Series(rng.integers(0, customers, n_rows)).map("C{:07d}".format),
+        "Quantity": quantity.astype("int32"),
+        "Price": price,
+        "Amount": amount,
+        "Churned": score > 0,
+    })
+
+
+def iter_business_dataset(n_rows, seed=0, block_rows=BLOCK_ROWS):
+    """``business_dataset(n_rows, seed)`` in blocks of at most ``block_rows`` rows."""
+    for offset in range(0, n_rows, block_rows):
+        yield _block(min(block_rows, n_rows - offset), offset, seed)
+
+
+def business_dataset(n_rows, seed=0) -> pd.DataFrame:
+    return pd.concat(list(iter_business_dataset(n_rows, seed)), ignore_index=True)
+
+
+def dataset_csv(n_rows, directory, seed=0) -> str:
+    """Path of the CSV for ``n_rows`` and ``seed`` in ``directory``, written on first use."""
+    path = os.path.join(directory, f"sales-{n_rows}-{seed}.csv")
+    if os.path.exists(path):
+        return path
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as fh:
+        for i, block in enumerate(iter_business_dataset(n_rows, seed)):
+            block.to_csv(fh, index=False, header=i == 0, date_format="%Y-%m-%d")
+    os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    with open(args.out, "w", newline="", encoding="utf-8") as fh:
+        for i, block in enumerate(iter_business_dataset(args.rows, args.seed)):
+            block.to_csv(fh, index=False, header=i == 0, date_format="%Y-%m-%d")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Business Performance Dashboard."""
@@ -0,0 +1,35 @@
+"""
+Headless analytics core: the numbers behind the dashboard pages as plain
+functions over DataFrames, usable without Streamlit (scripts, cron jobs,
+worker processes, benchmarks). ``python -m bpd.core --help`` lists the
+command line entry points.
+
+Re-exports are resolved on first access, as in ``utils``.
+"""
+import importlib
+
+_EXPORTS = {
+    "KPIs": ".kpis",
+    "compute_kpis": ".kpis",
+    "revenue_rollup": ".kpis",
+    "summarize": ".kpis",
+    "converted_rollup": ".kpis",
+    "ForecastResult": ".forecast",
+    "prepare_series": ".forecast",
+    "forecast_series": ".forecast",
+    "convert_forecast": ".forecast",
+    "train_model": ".train",
+    "evaluate": ".train",
+    "export_frame": ".export",
+    "export_dataset": ".export",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
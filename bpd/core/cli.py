@@ -0,0 +1,162 @@
+"""
+Command line entry point for batch jobs.
+
+    python -m bpd.core kpis sales.csv --date-col Date --revenue-col Amount --currency EUR --period Monthly
+    python -m bpd.core forecast sales.csv --date-col Date --value-col Amount --periods 6 --out forecast.csv
+    python -m bpd.core train sales.csv --target Churned --features Region Channel Amount --out model.joblib
+    python -m bpd.core export sales.csv --format parquet --currency EUR --out sales.parquet
+
+Inputs are CSV (read with the app's chunked reader) or Parquet. Results
+are printed as JSON, or written to ``--out`` where the command produces a
+table or file. Exchange rates come from ``--rates-file`` (a JSON rate
+table, see ``utils.fx.FileRateSource``), ``BPD_FX_RATES_FILE`` or the live
+API, in that order. KPIs and forecasts convert each date at its own rate
+from the local history store unless ``--latest-rate`` is given.
+"""
+import argparse
+import json
+import sys
+
+import pandas as pd
+
+
+def read_input(path) -> pd.DataFrame:
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path)
+    from utils.ingest import read_csv_chunked
+
+    return read_csv_chunked(path)
+
+
+def _print_json(payload):
+    json.dump(payload, sys.stdout, indent=2, default=str)
+    sys.stdout.write("\n")
+
+
+def _write_table(frame: pd.DataFrame, out):
+    if out:
+        frame.to_csv(out, index=False)
+    else:
+        frame.to_csv(sys.stdout, index=False)
+
+
+def kpis_command(args):
+    from .kpis import compute_kpis, revenue_rollup
+
+    df = read_input(args.input)
+    kpis = compute_kpis(df, args.date_col, args.revenue_col, args.currency, historical=not args.latest_rate)
+    if args.period:
+        rollup = revenue_rollup(df, args.date_col, args.revenue_col, args.period, args.currency,
+                                historical=not args.latest_rate)
+        rollup = rollup.rename_axis("period").rename("revenue").reset_index()
+        if args.out:
+            _write_table(rollup, args.out)
+        else:
+            _print_json({**kpis.to_dict(), "rollup": rollup.to_dict(orient="records")})
+            return
+    _print_json(kpis.to_dict())
+
+
+def forecast_command(args):
+    from utils.forecasting import FORECAST_COLUMNS
+
+    from .forecast import forecast_series
+
+    result = forecast_series(read_input(args.input), args.date_col, args.value_col, args.periods, args.engine,
+                             freq=args.freq, time_budget=args.time_budget, currency=args.currency,
+                             historical=not args.latest_rate)
+    forecast = result.forecast[FORECAST_COLUMNS]
+    if not args.include_history:
+        forecast = forecast.tail(args.periods)
+    print(f"engine: {result.engine}", file=sys.stderr)
+    _write_table(forecast, args.out)
+
+
+def train_command(args):
+    from .train import evaluate, train_model
+
+    params = {"n_estimators": args.n_estimators, "max_depth": args.max_depth}
+    result = train_model(read_input(args.input), args.target, args.features, params, args.encoding, args.model)
+    if args.out:
+        import joblib
+
+        joblib.dump(result, args.out)
+    _print_json({"model": result.model_name, "encoding": result.encoding, "sample_rows": result.sample_rows,
+                 "features": len(result.feature_names), **evaluate(result)})
+
+
+def export_command(args):
+    from .export import export_frame
+
+    rows = export_frame(read_input(args.input), args.format, args.out, args.currency, args.column)
+    _print_json({"rows": rows, "format": args.format, "path": args.out})
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from utils.aggregates import PERIODS
+    from utils.encoding import ENCODINGS
+    from utils.export import FORMATS
+    from utils.forecasters import DEFAULT_FREQ, ENGINES
+    from utils.ml import DEFAULT_ENCODING, MODEL_FAMILIES
+
+    parser = argparse.ArgumentParser(prog="python -m bpd.core", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates-file", help="JSON exchange rate table to use instead of the live API")
+    parser.add_argument("--latest-rate", action="store_true",
+                        help="convert at today's rate instead of each date's historical rate")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    kpis = commands.add_parser("kpis", help="row count, total and average revenue, optional rollup")
+    kpis.add_argument("input")
+    kpis.add_argument("--date-col", required=True)
+    kpis.add_argument("--revenue-col", required=True)
+    kpis.add_argument("--currency", default="USD")
+    kpis.add_argument("--period", choices=list(PERIODS), help="also report revenue per period")
+    kpis.add_argument("--out", help="write the rollup as CSV here")
+    kpis.set_defaults(func=kpis_command)
+
+    forecast = commands.add_parser("forecast", help="fit a forecaster and write the forecast as CSV")
+    forecast.add_argument("input")
+    forecast.add_argument("--date-col", required=True)
+    forecast.add_argument("--value-col", required=True)
+    forecast.add_argument("--periods", type=int, default=6)
+    forecast.add_argument("--engine", choices=["auto", *ENGINES], default="auto")
+    forecast.add_argument("--freq", default=DEFAULT_FREQ)
+    forecast.add_argument("--time-budget", type=float, default=2.0)
+    forecast.add_argument("--currency", default="USD")
+    forecast.add_argument("--include-history", action="store_true")
+    forecast.add_argument("--out", help="CSV path (default: stdout)")
+    forecast.set_defaults(func=forecast_command)
+
+    train = commands.add_parser("train", help="train an ML Insights model and report its test metrics")
+    train.add_argument("input")
+    train.add_argument("--target", required=True)
+    train.add_argument("--features", nargs="+", required=True)
+    train.add_argument("--encoding", choices=list(ENCODINGS), default=DEFAULT_ENCODING)
+    train.add_argument("--model", choices=list(MODEL_FAMILIES), help="default: chosen from the data size")
+    train.add_argument("--n-estimators", type=int, default=100)
+    train.add_argument("--max-depth", type=int, default=None)
+    train.add_argument("--out", help="save the trained result with joblib")
+    train.set_defaults(func=train_command)
+
+    export = commands.add_parser("export", help="convert and write the dataset in another format")
+    export.add_argument("input")
+    export.add_argument("--format", choices=list(FORMATS), default="csv")
+    export.add_argument("--out", required=True)
+    export.add_argument("--currency", default="USD")
+    export.add_argument("--column", default="Amount", help="amount column converted to --currency")
+    export.set_defaults(func=export_command)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.rates_file:
+        from utils.fx import FileRateSource, set_rate_source
+
+        set_rate_source(FileRateSource(args.rates_file))
+    try:
+        args.func(args)
+    except (KeyError, ValueError, FileNotFoundError) as e:
+        parser.exit(1, f"error: {e}\n")
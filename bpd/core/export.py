@@ -0,0 +1,24 @@
+"""Dataset export to CSV, gzip CSV, Excel and Parquet with currency conversion."""
+import pandas as pd
+
+from utils.export import FORMATS, convert_chunks, export_to_tempfile, write_export
+from utils.store import dataset_len, iter_dataset
+
+
+def export_frame(df: pd.DataFrame, fmt, path, currency="USD", column="Amount", progress=None) -> int:
+    """
+    Write ``df`` to ``path`` in ``fmt`` (a key of ``utils.export.FORMATS``),
+    adding a ``Converted`` column with ``column`` in ``currency`` unless it
+    is USD. Returns the number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if currency != "USD" and column not in df.columns:
+        raise ValueError(f"Currency conversion needs an {column!r} column")
+    return write_export(convert_chunks(iter_dataset(df), currency, column), fmt, path, len(df), progress)
+
+
+def export_dataset(dataset, fmt, currency="USD", column="Amount", progress=None) -> str:
+    """Stream a session dataset (handle or DataFrame) into a new temporary file and return its path; the caller removes it."""
+    return export_to_tempfile(convert_chunks(iter_dataset(dataset), currency, column), fmt, dataset_len(dataset),
+                              progress)
@@ -0,0 +1,61 @@
+"""Revenue forecasting over a date/value frame."""
+from dataclasses import dataclass
+
+import pandas as pd
+
+from utils.forecasters import DEFAULT_FREQ
+from utils.forecasting import fit_model
+from utils.fx import convert_columns
+from utils.fx_history import convert_asof
+
+MIN_ROWS = 2
+
+
+@dataclass
+class ForecastResult:
+    model: object
+    forecast: pd.DataFrame
+    currency: str
+
+    @property
+    def engine(self):
+        return self.model.name
+
+
+def prepare_series(df: pd.DataFrame, date_col, value_col) -> pd.DataFrame:
+    """
+    ``ds``/``y`` frame from two columns of ``df``, dropping rows that do not
+    parse. Raises ``ValueError`` when fewer than two rows are left.
+    """
+    series = pd.DataFrame({
+        "ds": pd.to_datetime(df[date_col], errors="coerce"),
+        "y": pd.to_numeric(df[value_col], errors="coerce"),
+    }).dropna()
+    if len(series) < MIN_ROWS:
+        raise ValueError(f"Not enough data to build a forecast: need at least {MIN_ROWS} valid rows, got {len(series)}")
+    return series.reset_index(drop=True)
+
+
+def convert_forecast(forecast: pd.DataFrame, currency="USD", from_currency="USD", historical=True) -> pd.DataFrame:
+    """
+    Forecast with ``yhat`` and its interval converted to ``currency``. With
+    ``historical``, each date uses its own rate and future dates the latest.
+    """
+    columns = ["yhat", "yhat_lower", "yhat_upper"]
+    if historical:
+        return convert_asof(forecast, "ds", columns, currency, from_currency)
+    return convert_columns(forecast, columns, currency, from_currency)
+
+
+def forecast_series(df: pd.DataFrame, date_col, value_col, periods, engine="auto", params=None, freq=DEFAULT_FREQ,
+                    time_budget=2.0, holidays=None, currency="USD", from_currency="USD",
+                    historical=True) -> ForecastResult:
+    """
+    Fit ``engine`` on ``value_col`` over ``date_col`` and forecast ``periods``
+    steps ahead. The returned frame holds the history fit followed by the
+    horizon, in ``currency``.
+    """
+    series = prepare_series(df, date_col, value_col)
+    model = fit_model(series, engine, params, freq, time_budget, holidays)
+    forecast = model.predict(periods, include_history=True)
+    return ForecastResult(model, convert_forecast(forecast, currency, from_currency, historical), currency)
@@ -0,0 +1,72 @@
+"""Dashboard KPIs and revenue rollups."""
+from dataclasses import asdict, dataclass
+
+import pandas as pd
+
+from utils.aggregates import PERIODS, RevenueAggregates, period_sums
+from utils.fx import get_rate
+from utils.fx_history import convert_series_asof
+
+
+@dataclass
+class KPIs:
+    rows: int
+    total_revenue: float
+    average_revenue: float
+    currency: str
+    invalid_rows: int = 0
+    first_date: pd.Timestamp = None
+    last_date: pd.Timestamp = None
+
+    def to_dict(self) -> dict:
+        return {k: (v.isoformat() if isinstance(v, pd.Timestamp) else v) for k, v in asdict(self).items()}
+
+
+def converted_daily(aggregates: RevenueAggregates, currency="USD", from_currency="USD", historical=True) -> pd.Series:
+    """
+    Daily revenue in ``currency``, each day at its own rate when
+    ``historical`` (see ``utils.fx_history``), else at today's rate.
+    """
+    if historical:
+        return convert_series_asof(aggregates.daily_sum, currency, from_currency)
+    return aggregates.daily_sum * get_rate(from_currency, currency)
+
+
+def summarize(aggregates: RevenueAggregates, currency="USD", from_currency="USD", historical=True) -> KPIs:
+    """KPIs of already computed aggregates, with amounts converted to ``currency``."""
+    total = float(converted_daily(aggregates, currency, from_currency, historical).sum())
+    dates = aggregates.daily_count.index
+    return KPIs(
+        rows=aggregates.count,
+        total_revenue=total,
+        average_revenue=total / aggregates.count if aggregates.count else float("nan"),
+        currency=currency,
+        invalid_rows=int(aggregates.invalid_rows),
+        first_date=dates.min() if len(dates) else None,
+        last_date=dates.max() if len(dates) else None,
+    )
+
+
+def compute_kpis(df: pd.DataFrame, date_col, revenue_col, currency="USD", from_currency="USD", historical=True) -> KPIs:
+    """
+    Row count, total and average revenue of ``df``. Rows whose date or
+    revenue does not parse are left out and counted in ``invalid_rows``.
+    """
+    return summarize(RevenueAggregates.from_frame(df, date_col, revenue_col), currency, from_currency, historical)
+
+
+def converted_rollup(aggregates: RevenueAggregates, freq="M", currency="USD", from_currency="USD",
+                     historical=True) -> pd.Series:
+    """``aggregates.rollup(freq)`` in ``currency``, converting each day before summing."""
+    if currency.upper() == from_currency.upper():
+        return aggregates.rollup(freq)
+    return period_sums(converted_daily(aggregates, currency, from_currency, historical), freq)
+
+
+def revenue_rollup(df: pd.DataFrame, date_col, revenue_col, period="Monthly", currency="USD",
+                   from_currency="USD", historical=True) -> pd.Series:
+    """Revenue per ``period`` (a key of ``utils.aggregates.PERIODS``) in ``currency``, indexed by period start."""
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period {period!r}; expected one of {', '.join(PERIODS)}")
+    aggregates = RevenueAggregates.from_frame(df, date_col, revenue_col)
+    return converted_rollup(aggregates, PERIODS[period], currency, from_currency, historical)
@@ -0,0 +1,38 @@
+"""ML Insights model training over a DataFrame."""
+import pandas as pd
+
+from utils.ml import DEFAULT_ENCODING, TrainingResult, sample_size, select_model, train, training_key
+from utils.store import hash_frame
+
+DEFAULT_PARAMS = {"n_estimators": 100, "max_depth": None}
+
+
+def train_model(df: pd.DataFrame, target, features, params=None, encoding=DEFAULT_ENCODING, model_name=None,
+                sample_rows=None) -> TrainingResult:
+    """
+    Split, encode and fit a model predicting ``target`` from ``features``,
+    as the ML Insights page does. ``model_name`` and ``sample_rows`` default
+    to the page's automatic choices for the size of ``df``. The result is
+    also saved under ``models/``.
+    """
+    features = list(features)
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    model_name = model_name or select_model(len(df), encoding)
+    sample_rows = sample_rows if sample_rows is not None else sample_size(len(df))
+    data = df[[*features, target]]
+    data_key = hash_frame(data)
+    key = training_key(data_key, target, features, params, encoding, model_name, sample_rows)
+    return train(key, data_key, lambda: data, target, features, params, encoding, model_name, sample_rows)
+
+
+def evaluate(result: TrainingResult) -> dict:
+    """Test-set accuracy for classifiers, mean squared error and R² for regressors."""
+    from sklearn.metrics import accuracy_score, mean_squared_error, r2_score
+
+    if result.is_classification:
+        return {"task": result.task, "accuracy": float(accuracy_score(result.y_test, result.predictions))}
+    return {
+        "task": result.task,
+        "mse": float(mean_squared_error(result.y_test, result.predictions)),
+        "r2": float(r2_score(result.y_test, result.predictions)),
+    }
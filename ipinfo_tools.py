@@ -1,14 +1,12 @@
 import streamlit as st
-import requests
+from utils.http import get_json
 
 def get_location_info():
     ipinfo_token = st.secrets["IPINFO_API_KEY"]
-    url = f"https://ipinfo.io/json?token={ipinfo_token}"
-    
+
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
+        data = get_json("https://ipinfo.io/json", params={"token": ipinfo_token})
+        if data:
             return {
                 "ip": data.get("ip"),
                 "city": data.get("city"),
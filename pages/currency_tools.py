@@ -1,6 +1,12 @@
 import streamlit as st
-import requests
+import datetime
+import pandas as pd
+from utils.fx_history import history_pending, rate_history, rate_on
+from utils.perf import timed
 
+HISTORY_DAYS = 365
+
+@timed("page.currency_tools")
 def currency_tools_page():
     st.title("💱 Currency Tools - Convert Currencies")
 
@@ -9,23 +15,42 @@ def currency_tools_page():
 
     # Dropdowns for currency selection
     currencies = ["USD", "EUR", "GBP", "JPY", "CAD", "AUD", "NGN"]
-    
-    # Fallback to detected currency
-    default_currency = st.session_state["ipinfo"].get("country", "USD")
-    from_currency = st.selectbox("From Currency", currencies, index=currencies.index(default_currency))
+
+    # Fallback to the session currency (detected from the IP lookup)
+    default_currency = st.session_state.get("currency", "USD")
+    from_currency = st.selectbox("From Currency", currencies, index=currencies.index(default_currency) if default_currency in currencies else 0)
     to_currency = st.selectbox("To Currency", currencies, index=currencies.index("NGN"))
 
-    # Input for amount
+    # Input for amount and the date whose rate to use
     amount = st.number_input("Amount", min_value=0.0, value=1.0, step=0.01)
+    today = datetime.date.today()
+    day = st.date_input("Rate Date", value=today, max_value=today)
 
-    # Convert button
+    # Rates come from the local history store, filled in bulk in the background; a click doesn't wait on the API
     if st.button("Convert"):
         try:
-            response = requests.get(f"https://api.exchangerate.host/convert?from={from_currency}&to={to_currency}&amount={amount}")
-            if response.status_code == 200:
-                result = response.json().get("result", 0.0)
-                st.metric(label=f"{amount} {from_currency} = ", value=f"{result:.2f} {to_currency}")
+            rate, rate_date = rate_on(day, from_currency, to_currency)
+            st.metric(label=f"{amount} {from_currency} = ", value=f"{amount * rate:.2f} {to_currency}")
+            if rate_date:
+                st.caption(f"Rate {rate:.6g} from {rate_date}.")
+            elif history_pending(day, day):
+                st.caption("Historical rates are still downloading; using the current rate.")
             else:
-                st.error("Failed to fetch conversion rate. Try again later.")
+                st.caption("Historical rates unavailable; using the current rate.")
         except Exception as e:
             st.error(f"Error: {e}")
+
+    # === Rate History ===
+    st.subheader(f"📈 {from_currency}/{to_currency} over the last year")
+    try:
+        start = today - datetime.timedelta(days=HISTORY_DAYS)
+        history = rate_history(from_currency, to_currency, start, today)
+        history = history[history["date"] >= pd.Timestamp(start)]
+        if len(history) > 1:
+            st.line_chart(history.set_index("date")["rate"])
+        elif history_pending(start, today):
+            st.info("⏳ Downloading rate history; it appears here on the next rerun.")
+        else:
+            st.info("ℹ️ No rate history stored yet for this pair.")
+    except Exception as e:
+        st.error(f"Error loading rate history: {e}")
@@ -19,9 +19,18 @@ import streamlit as st
 st.set_page_config(page_title="Dashboard", page_icon="📊")
 
 import pandas as pd
-import matplotlib.pyplot as plt
-from utils import convert_currency
-
+from bpd.core.kpis import converted_rollup, summarize
+from utils.aggregates import PERIODS, get_aggregates
+from utils.fx import RATE_TTL_SECONDS
+from utils.fx_history import history_version
+from utils.profile import get_profile
+from utils.render import MAX_POINTS, PAGE_SIZES, downsample, figure_png, page_bounds
+from utils.sql import revenue_aggregates
+from utils.store import dataset_key, dataset_len, dataset_schema, load_dataset
+from utils.widgets import query_engine
+from utils.perf import timed
+
+@timed("page.dashboard")
 def dashboard_page():
     st.title("📊 Dashboard - Business KPIs Overview")
     st.sidebar.markdown("### Dashboard Tools")
@@ -31,79 +40,101 @@ def dashboard_page():
         st.warning("Please upload a dataset on the Home page to proceed.")
         st.stop()
 
-    data = st.session_state["uploaded_data"]
+    dataset = st.session_state["uploaded_data"]
     currency = st.session_state.get("currency", "USD")
+    columns = list(dataset_schema(dataset).columns)
+
+    # Default columns come from the upload's profile: detected dates and the best revenue candidate
+    profile = get_profile(dataset)
+    date_col_default = next(iter(profile.date_columns), None)
+    revenue_col_default = next(iter(profile.revenue_columns), None)
+
+    st.sidebar.header("📅 Select Columns")
+    date_col = st.sidebar.selectbox("Select Date Column", options=columns, index=columns.index(date_col_default) if date_col_default else 0)
+    revenue_col = st.sidebar.selectbox("Select Revenue Column", options=columns, index=columns.index(revenue_col_default) if revenue_col_default else 0)
 
-    # Validate selected columns
-    date_col = st.selectbox("Select Date Column", options=data.columns)
-    revenue_col = st.selectbox("Select Revenue Column", options=data.columns)
+    engine = query_engine(help="DuckDB scans the stored file out of core, for datasets larger than memory.")
 
+    # KPIs and rollups are cached per dataset, column pair and engine; only a miss reads the data
     try:
-        data[date_col] = pd.to_datetime(data[date_col], errors="coerce")
-        data[revenue_col] = pd.to_numeric(data[revenue_col], errors="coerce")
-        filtered_data = data.dropna(subset=[date_col, revenue_col])
-        if filtered_data.empty:
+        with timed(f"dashboard.aggregates.{engine}"):
+            aggregates = get_aggregates(
+                dataset_key(dataset), date_col, revenue_col,
+                lambda cols: load_dataset(dataset, columns=dict.fromkeys(cols)),
+                # DuckDB aggregates out of core, reading only the two columns from the stored file
+                compute=(lambda: revenue_aggregates(dataset, date_col, revenue_col)) if engine == "duckdb" else None,
+                engine=engine,
+            )
+        if aggregates.empty:
             st.warning("No valid data after filtering. Check your column selection.")
             st.stop()
     except Exception as e:
         st.error(f"Error processing columns: {e}")
         st.stop()
 
-    st.dataframe(filtered_data)
+    with timed("dashboard.preview"):
+        data_preview(dataset, [date_col, revenue_col])
 
     # Display KPIs
     st.write("### Key Performance Indicators")
-    st.metric("Total Rows", len(filtered_data))
-    st.metric("Total Columns", len(filtered_data.columns))
-
-    # Suggest default columns based on patterns
-    date_col_default = next((col for col in filtered_data.columns if "date" in col.lower() or "time" in col.lower()), None)
-    revenue_col_default = next((col for col in filtered_data.columns if "revenue" in col.lower() or "amount" in col.lower()), None)
-
-    st.sidebar.header("📅 Select Columns")
-    date_col = st.sidebar.selectbox("Select Date Column", options=filtered_data.columns, index=filtered_data.columns.get_loc(date_col_default) if date_col_default else 0)
-    revenue_col = st.sidebar.selectbox("Select Revenue Column", options=filtered_data.columns, index=filtered_data.columns.get_loc(revenue_col_default) if revenue_col_default else 0)
-
-    try:
-        filtered_data[date_col] = pd.to_datetime(filtered_data[date_col], errors="coerce")
-        filtered_data = filtered_data.dropna(subset=[date_col, revenue_col])
-        if filtered_data.empty:
-            st.warning("No valid data after filtering. Check your column selection.")
-            return
-        st.success("Data loaded successfully!")
-    except Exception as e:
-        st.error(f"Error processing data: {e}")
-        return
+    st.metric("Total Rows", aggregates.count)
+    st.metric("Total Columns", len(columns))
+    st.success("Data loaded successfully!")
 
     st.subheader("📌 Key Metrics")
     try:
-        total_revenue = pd.to_numeric(filtered_data[revenue_col], errors="coerce").sum()
-        avg_revenue = pd.to_numeric(filtered_data[revenue_col], errors="coerce").mean()
-
         try:
-            total_revenue_converted = convert_currency(total_revenue, currency)
-            avg_revenue_converted = convert_currency(avg_revenue, currency)
+            kpis = summarize(aggregates, currency)
         except Exception as e:
             st.error(f"Error converting currency: {e}")
             return
 
         col1, col2 = st.columns(2)
-        col1.metric("💰 Total Revenue", f"{total_revenue_converted:,.2f} {currency}")
-        col2.metric("📊 Average Revenue", f"{avg_revenue_converted:,.2f} {currency}")
+        col1.metric("💰 Total Revenue", f"{kpis.total_revenue:,.2f} {currency}")
+        col2.metric("📊 Average Revenue", f"{kpis.average_revenue:,.2f} {currency}")
+        if currency != "USD":
+            st.caption(f"Each day's revenue is converted to {currency} at that day's exchange rate.")
     except Exception as e:
         st.error(f"❌ KPI Calculation Error: {e}")
         return
 
-    st.subheader("📆 Monthly Revenue Overview")
+    period = st.sidebar.radio("Revenue Period", options=list(PERIODS), index=list(PERIODS).index("Monthly"))
+    st.subheader(f"📆 {period} Revenue Overview")
     try:
-        monthly_data = filtered_data.groupby(filtered_data[date_col].dt.to_period("M"))[revenue_col].sum()
-        monthly_data.index = monthly_data.index.to_timestamp()
-
-        fig, ax = plt.subplots()
-        monthly_data.plot(kind="bar", ax=ax)
-        ax.set_title("Monthly Revenue")
-        ax.set_xlabel("Month")
-        ax.set_ylabel("Revenue")
-        st.pyplot(fig)
+        with timed("dashboard.chart"):
+            # Rendered once per dataset, columns, period, currency and stored rate range, then served as a
+            # cached PNG; each day is converted at its own historical rate before summing. The TTL matches
+            # the rate caches, so the chart never outlives the rates the KPIs above it use.
+            png = figure_png(
+                ("revenue", dataset_key(dataset), date_col, revenue_col, period, currency, history_version()),
+                lambda: revenue_figure(converted_rollup(aggregates, PERIODS[period], currency), period, currency),
+                ttl=RATE_TTL_SECONDS,
+            )
+            st.image(png)
     except Exception as e:
         st.error(f"❌ Revenue chart error: {e}")
+
+def data_preview(dataset, columns):
+    """One page of the selected columns; only that window is read and sent to the browser."""
+    n_rows = dataset_len(dataset)
+    col1, col2 = st.columns(2)
+    page_size = col1.selectbox("Rows per page", options=PAGE_SIZES, index=1)
+    pages = page_bounds(n_rows, 1, page_size)[2]
+    page = col2.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1)
+    offset, rows, _ = page_bounds(n_rows, page, page_size)
+    st.dataframe(load_dataset(dataset, columns=dict.fromkeys(columns), limit=rows, offset=offset))
+    st.caption(f"Rows {offset + 1:,}–{offset + rows:,} of {n_rows:,}")
+
+def revenue_figure(period_data, period, currency="USD"):
+    """Bars per period, or a min/max-downsampled line when there are more periods than pixels."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    if len(period_data) > MAX_POINTS:
+        downsample(period_data, MAX_POINTS, method="minmax").plot(ax=ax)
+    else:
+        period_data.plot(kind="bar", ax=ax)
+    ax.set_title(f"{period} Revenue")
+    ax.set_xlabel("Period")
+    ax.set_ylabel(f"Revenue ({currency})")
+    return fig
@@ -1,22 +1,23 @@
 import streamlit as st
 st.set_page_config(page_title="Export", page_icon="📁")
 
+import re
 import pandas as pd
-from io import BytesIO
-from datetime import datetime
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
-from utils import convert_currency
+from bpd.core.export import export_dataset
+from utils.export import FORMATS, PreparedExport
+from utils.reports import SCHEDULES, SMTPConfig, enqueue_report, ensure_workers, get_queue, start_workers_from_secrets
+from utils.store import dataset_key, dataset_schema, get_store
+from utils.perf import timed
+
+# Pages can be opened directly, so make sure queued reports are being sent even if app.py hasn't run
+start_workers_from_secrets(st.secrets)
 
 # Validate dataset availability
 if "uploaded_data" not in st.session_state or st.session_state["uploaded_data"] is None:
     st.warning("Please upload a dataset on the Home page to proceed.")
     st.stop()
 
-data = st.session_state["uploaded_data"]
-
+@timed("page.export")
 def export_page():
     st.title("📁 Export - Download Your Data")
     st.sidebar.markdown("### Export Options")
@@ -25,65 +26,80 @@ def export_page():
         st.warning("⚠️ No data available. Please upload data on the Home page.")
         return
 
+    dataset = st.session_state["uploaded_data"]
+
     # Currency selection
     currency = st.session_state.get("currency", "USD")
     st.write(f"Exporting data in {currency} currency.")
 
     # File format and currency selection
-    file_format = st.selectbox("Select file format", ["CSV", "Excel"])
+    file_format = st.selectbox("Select file format", list(FORMATS), format_func=lambda f: FORMATS[f][0])
     currency = st.selectbox("Select currency", ["USD", "EUR", "GBP"])  # Add more as needed
 
-    # Convert currency if needed
-    if currency != "USD":
+    if currency != "USD" and "Amount" not in dataset_schema(dataset).columns:
+        st.error("❌ Currency conversion failed: the dataset has no 'Amount' column.")
+        return
+
+    # Files are only built on request, streamed chunk by chunk into a temp file
+    label, extension, mime = FORMATS[file_format]
+    export_key = (dataset_key(dataset), file_format, currency)
+    prepared = st.session_state.get("export_file")
+    if st.button(f"Prepare {label} download"):
+        if prepared:
+            prepared.remove()
+            st.session_state.pop("export_file")
+        bar = st.progress(0.0, text=f"Writing {label}...")
         try:
-            data["Converted"] = data["Amount"].apply(lambda x: convert_currency(x, currency))
+            path = export_dataset(dataset, file_format, currency,
+                                  progress=lambda fraction: bar.progress(fraction, text=f"Writing {label}..."))
         except Exception as e:
-            st.error(f"❌ Currency conversion failed: {e}")
+            st.error(f"Error exporting data: {e}")
             return
-
-    # Export functionality
-    if st.button("Export"):
+        finally:
+            bar.empty()
+        # Removed with the session state when the session ends
+        prepared = st.session_state["export_file"] = PreparedExport(export_key, path)
+
+    if prepared and prepared.key == export_key and prepared.exists():
+        # A callable defers reading the file until the button is clicked, instead of on every rerun
+        st.download_button(f"Download {label}", prepared.reader(), f"data{extension}", mime)
+
+    email_reports_section(dataset, file_format, currency)
+
+def email_reports_section(dataset, file_format, currency):
+    st.subheader("📧 Email Reports")
+    try:
+        SMTPConfig.from_secrets(st.secrets)
+    except ValueError as e:
+        st.error(f"❌ Email settings in secrets are invalid: {e}")
+    except (KeyError, FileNotFoundError):
+        pass
+    recipients = st.text_area("Recipients (one per line or comma-separated)")
+    subject = st.text_input("Subject", value="Smart Insights report")
+    body = st.text_area("Message", value="Please find the latest data attached.")
+    schedule = st.selectbox("Schedule", [None, *SCHEDULES], format_func=lambda s: "Send once" if s is None else s.capitalize())
+
+    if st.button("Queue report"):
         try:
-            if file_format == "CSV":
-                data.to_csv("exported_data.csv", index=False)
-                st.success("Data exported as CSV.")
-            elif file_format == "Excel":
-                data.to_excel("exported_data.xlsx", index=False)
-                st.success("Data exported as Excel.")
+            job_ids = send_email_with_attachment(re.split(r"[,\n]", recipients), subject, body, dataset,
+                                                 file_format, currency, schedule)
+            st.success(f"Queued {len(job_ids)} report job(s); they are sent in the background.")
+        except KeyError as e:
+            st.error(f"❌ Email settings are missing from secrets: {e}")
         except Exception as e:
-            st.error(f"Error exporting data: {e}")
-
-    # Download buttons
-    csv = data.to_csv(index=False)
-    st.download_button("Download CSV", csv, "data.csv", "text/csv")
-
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        data.to_excel(writer, index=False, sheet_name="Sheet1")
-    st.download_button("Download Excel", output.getvalue(), "data.xlsx", "application/vnd.ms-excel")
-
-def send_email_with_attachment(to, subject, body, df):
-    from_email = st.secrets["EMAIL"]
-    from_password = st.secrets["EMAIL_PASSWORD"]
-    smtp_server = st.secrets["SMTP_SERVER"]
-    smtp_port = st.secrets["SMTP_PORT"]
-
-    buffer = BytesIO()
-    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="SmartInsights")
-    attachment = buffer.getvalue()
-
-    msg = MIMEMultipart()
-    msg["From"] = from_email
-    msg["To"] = to
-    msg["Subject"] = subject
-    msg.attach(MIMEText(body, "plain"))
-
-    part = MIMEApplication(attachment, Name="smart_insights_data.xlsx")
-    part["Content-Disposition"] = 'attachment; filename="smart_insights_data.xlsx"'
-    msg.attach(part)
-
-    with smtplib.SMTP(smtp_server, smtp_port) as server:
-        server.starttls()
-        server.login(from_email, from_password)
-        server.send_message(msg)
+            st.error(f"❌ Could not queue the report: {e}")
+
+    jobs = get_queue().jobs(limit=20)
+    if not jobs.empty:
+        st.dataframe(jobs, hide_index=True)
+
+def send_email_with_attachment(to, subject, body, dataset, file_format="xlsx", currency="USD", schedule=None):
+    """
+    Queue the dataset as an emailed report for ``to`` (an address or list of
+    addresses) and make sure the background senders are running. Returns the job ids.
+    """
+    ensure_workers(SMTPConfig.from_secrets(st.secrets))
+    if isinstance(dataset, pd.DataFrame):
+        dataset = get_store().put(dataset)
+    recipients = [to] if isinstance(to, str) else list(to)
+    return enqueue_report(dataset_key(dataset), recipients, subject, body, file_format, currency, schedule)
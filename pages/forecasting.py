@@ -1,11 +1,31 @@
 import streamlit as st
 st.set_page_config(page_title="Forecasting", page_icon="🔮")
 
-import pandas as pd
-from prophet import Prophet
-import matplotlib.pyplot as plt
-from utils import convert_currency  # Import currency conversion utility
-
+import time
+from concurrent.futures import wait
+from bpd.core.forecast import convert_forecast, prepare_series
+from utils.backtest import backtest_async, backtest_key, backtests, horizon_metrics
+from utils.calendarific import calendar
+from utils.forecasting import fit_model_async, forecast_many_async, model_key, models, predict
+from utils.fx import RATE_TTL_SECONDS
+from utils.fx_history import history_version
+from utils.holidays import NATIONAL_TYPES, history_years, to_prophet_holidays
+from utils.profile import get_profile
+from utils.render import PAGE_SIZES, downsample, figure_png, page_bounds
+from utils.store import dataset_key, dataset_schema, load_dataset
+from utils.perf import timed
+
+MAX_PERIODS = 24
+
+ENGINE_OPTIONS = {
+    "auto": "Auto",
+    "prophet": "Prophet",
+    "holt_winters": "Holt-Winters",
+    "linear": "Linear Trend",
+    "naive": "Seasonal Naive",
+}
+
+@timed("page.forecasting")
 def forecasting_page():
     st.title("🔮 Forecasting - Business Trend Prediction")
     st.sidebar.markdown("### Forecasting Tools")
@@ -15,59 +35,188 @@ def forecasting_page():
         st.stop()
 
     try:
-        data = st.session_state["uploaded_data"].copy()
-        # Ensure data compatibility
-        if "date" not in data.columns or "value" not in data.columns:
-            st.error("The dataset must contain 'date' and 'value' columns for forecasting.")
+        dataset = st.session_state["uploaded_data"]
+        columns = list(dataset_schema(dataset).columns)
+        # Ensure data compatibility using the upload's profile instead of rescanning the data
+        profile = get_profile(dataset)
+        if not profile.date_columns or not profile.revenue_columns:
+            st.error("The dataset must contain a date column and a numeric column for forecasting.")
             st.stop()
 
-        date_col = st.selectbox("Select Date Column", options=data.columns)
-        revenue_col = st.selectbox("Select Revenue Column", options=data.columns)
+        date_col = st.selectbox("Select Date Column", options=columns, index=columns.index(profile.date_columns[0]))
+        revenue_col = st.selectbox("Select Revenue Column", options=columns, index=columns.index(profile.revenue_columns[0]))
 
         try:
-            data[date_col] = pd.to_datetime(data[date_col], errors="coerce")
-            data[revenue_col] = pd.to_numeric(data[revenue_col], errors="coerce")
-            data = data.dropna(subset=[date_col, revenue_col])
+            df = prepare_series(load_dataset(dataset, columns=dict.fromkeys([date_col, revenue_col])), date_col, revenue_col)
+        except ValueError as e:
+            st.error(f"❌ {e}. Please check the column selections.")
+            return
         except Exception as e:
             st.error(f"Error processing columns: {e}")
             st.stop()
 
-        if data.empty:
-            st.error("❌ No valid data available after cleaning. Please check the column selections.")
-            return
-
-        aggregated_data = data.groupby(date_col).sum()
-        st.line_chart(aggregated_data[revenue_col])
-
-        df = data[[date_col, revenue_col]].copy()
-        df.columns = ["ds", "y"]
-
-        if len(df) < 2:
-            st.error("❌ Not enough data to build forecast. Need at least 2 rows.")
+        # Downsampled to the chart's width, so the payload stays the same size as the data grows
+        st.line_chart(downsample(df.groupby("ds")["y"].sum()))
+
+        periods = st.sidebar.slider("📆 Months to Forecast", min_value=1, max_value=MAX_PERIODS, value=6)
+        engine = st.sidebar.selectbox("Forecast Engine", options=ENGINE_OPTIONS, format_func=ENGINE_OPTIONS.get)
+        time_budget = 2.0
+        if engine == "auto":
+            time_budget = st.sidebar.slider("⏱️ Time Budget (seconds)", min_value=0.5, max_value=30.0, value=2.0, step=0.5)
+        params = {
+            "seasonality_mode": st.sidebar.selectbox("Seasonality Mode", ["additive", "multiplicative"]),
+            "changepoint_prior_scale": st.sidebar.select_slider(
+                "Trend Flexibility", options=[0.001, 0.01, 0.05, 0.1, 0.5], value=0.05
+            ),
+        }
+
+        holidays = None
+        if st.sidebar.checkbox("🎉 Include public holidays", help="Holiday effects are modelled by the Prophet engine."):
+            holidays = public_holidays(df["ds"])
+
+        # Fitted models are cached across reruns and sessions; fits run in the background
+        key = model_key(df, date_col, revenue_col, engine, params, time_budget=time_budget, holidays=holidays)
+        future = fit_model_async(key, df, engine, params, time_budget=time_budget, holidays=holidays)
+        wait([future], timeout=0.5)
+        if not future.done():
+            st.info(f"⏳ Still fitting the forecast model ({models.elapsed(key):.0f}s)...")
+            time.sleep(1)
+            st.rerun()
+        try:
+            model = future.result()
+        except Exception as e:
+            st.error(f"❌ Model fitting failed: {e}")
+            if st.button("Retry"):
+                models.discard(key)
+                st.rerun()
             return
-
-        periods = st.sidebar.slider("📆 Months to Forecast", min_value=1, max_value=24, value=6)
-
-        model = Prophet()
-        model.fit(df)
-        future = model.make_future_dataframe(periods=periods, freq="M")
-        forecast = model.predict(future)
+        forecast = predict(key, model, periods)
 
         # Convert forecasted revenue to selected currency
         currency = st.session_state.get("currency", "USD")
-        forecast["yhat"] = forecast["yhat"].apply(lambda x: convert_currency(x, currency))
-        forecast["yhat_lower"] = forecast["yhat_lower"].apply(lambda x: convert_currency(x, currency))
-        forecast["yhat_upper"] = forecast["yhat_upper"].apply(lambda x: convert_currency(x, currency))
+        forecast = convert_forecast(forecast, currency)
 
         st.subheader(f"📈 Forecasted Revenue ({currency})")
-        fig1 = model.plot(forecast)
-        st.pyplot(fig1)
+        st.caption(f"Engine: {ENGINE_OPTIONS[model.name]}")
+        # Converted at historical rates, so the cached images follow the stored rate range and the rate TTL
+        rates = history_version()
+        st.image(figure_png(("forecast", key, periods, currency, rates), lambda: model.plot(forecast), ttl=RATE_TTL_SECONDS))
 
-        st.subheader("🧠 Forecast Components")
-        fig2 = model.plot_components(forecast)
-        st.pyplot(fig2)
+        if hasattr(model, "plot_components"):
+            st.subheader("🧠 Forecast Components")
+            st.image(figure_png(("components", key, periods, currency, rates), lambda: model.plot_components(forecast),
+                                ttl=RATE_TTL_SECONDS))
 
         st.subheader(f"📊 Forecasted Data Preview ({currency})")
         st.dataframe(forecast[["ds", "yhat", "yhat_lower", "yhat_upper"]].tail(periods))
+
+        backtest_section(df, engine, params, periods, time_budget)
+        batch_forecast_section(dataset, columns, date_col, revenue_col, periods, engine, params)
     except Exception as e:
         st.error(f"❌ An error occurred: {e}")
+
+def public_holidays(dates):
+    """
+    National holidays of the selected country over the history and the
+    longest horizon, so moving the horizon slider doesn't change the model.
+    """
+    country = st.session_state.get("country", "United States")
+    years = history_years(dates, MAX_PERIODS)
+    try:
+        # Served from the holiday store; missing years download in the background
+        holidays = calendar().holidays(country, years, types=NATIONAL_TYPES)
+    except Exception as e:
+        st.warning(f"⚠️ Holidays unavailable, forecasting without them: {e}")
+        return None
+    if holidays.empty:
+        if calendar().pending(country, years):
+            st.sidebar.caption(f"⏳ Downloading holidays for {country}; they are used once stored.")
+        else:
+            st.sidebar.caption(f"No national holidays found for {country}.")
+        return None
+    st.sidebar.caption(f"{len(holidays)} national holidays for {country}.")
+    return to_prophet_holidays(holidays)
+
+
+def backtest_section(df, engine, params, periods, time_budget):
+    """
+    Rolling-origin accuracy of the selected engine. Folds always forecast
+    MAX_PERIODS ahead, so moving the horizon slider only changes which
+    steps are shown.
+    """
+    st.subheader("🎯 Backtest Accuracy")
+    key = backtest_key(df, engine, params, horizon=MAX_PERIODS, time_budget=time_budget)
+    requested = st.session_state.setdefault("forecast_backtests", set())
+    if st.button("Run Backtest"):
+        requested.add(key)
+    if key not in requested:
+        st.caption("Refits the model at several past cutoffs and scores each forecast against what happened.")
+        return
+    future = backtest_async(key, df, engine, params, horizon=MAX_PERIODS, time_budget=time_budget)
+    wait([future], timeout=0.5)
+    if not future.done():
+        st.progress(backtests.progress(key) or 0.0, text=f"Backtesting ({backtests.elapsed(key):.0f}s)...")
+        time.sleep(0.5)
+        st.rerun()
+    try:
+        result = future.result()
+    except Exception as e:
+        st.error(f"❌ Backtest failed: {e}")
+        backtests.discard(key)
+        requested.discard(key)
+        return
+    metrics = horizon_metrics(result.predictions, periods)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("MAPE", f"{metrics['mape'].mean():.1f}%")
+    col2.metric("RMSE", f"{metrics['rmse'].mean():,.2f}")
+    col3.metric("Interval Coverage", f"{metrics['coverage'].mean():.0%}")
+    st.caption(f"{ENGINE_OPTIONS[result.engine]}, {result.folds} folds, {result.fitted_folds} fitted in {result.seconds:.1f}s "
+               "(the rest reused from cache). Errors in the dataset's currency.")
+    st.dataframe(metrics.style.format({"mape": "{:.1f}%", "rmse": "{:,.2f}", "coverage": "{:.0%}"}), hide_index=True)
+
+def batch_forecast_section(dataset, columns, date_col, revenue_col, periods, engine, params):
+    """Forecast one series per store/SKU/region across all CPU cores."""
+    st.subheader("🗂️ Batch Forecasting")
+    group_options = [col for col in columns if col not in (date_col, revenue_col)]
+    if not group_options:
+        st.info("ℹ️ Add a grouping column (e.g. store or SKU) to forecast multiple series.")
+        return
+
+    group_col = st.selectbox("Forecast each series of", options=group_options)
+    # Series are fitted on the forecast worker, so the page stays responsive while a batch runs
+    key = ("batch", dataset_key(dataset), group_col, date_col, revenue_col, periods, engine, tuple(sorted(params.items())))
+    requested = st.session_state.setdefault("batch_forecasts", set())
+    if st.button("Run Batch Forecast"):
+        requested.add(key)
+    if key not in requested:
+        return
+    load = lambda: load_dataset(dataset, columns=[group_col, date_col, revenue_col])
+    future = forecast_many_async(key, load, group_col, date_col, revenue_col, periods, engine=engine, params=params)
+    wait([future], timeout=0.5)
+    if not future.done():
+        fraction = models.progress(key) or 0.0
+        st.progress(fraction, text=f"Fitting series... {fraction:.0%} ({models.elapsed(key):.0f}s)")
+        time.sleep(0.5)
+        st.rerun()
+    try:
+        combined, stats = future.result()
+    except Exception as e:
+        st.error(f"❌ Batch forecast failed: {e}")
+        models.discard(key)
+        requested.discard(key)
+        return
+
+    # Converted like the single-series forecast
+    currency = st.session_state.get("currency", "USD")
+    combined = convert_forecast(combined, currency)
+    engines = stats["engine"].value_counts()
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Series", len(stats))
+    col2.metric("Baseline Fallbacks", int(engines.get("baseline", 0)))
+    col3.metric("Failed", int(engines.get("failed", 0)))
+    pages = page_bounds(len(combined), 1, PAGE_SIZES[-1])[2]
+    page = st.number_input(f"Forecast rows page (of {pages:,})", min_value=1, max_value=pages, value=1)
+    offset, rows, _ = page_bounds(len(combined), page, PAGE_SIZES[-1])
+    st.dataframe(combined.iloc[offset:offset + rows])
+    with st.expander("Per-series fit times and errors"):
+        st.dataframe(stats.sort_values("fit_seconds", ascending=False))
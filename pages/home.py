@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
-from utils import get_ip_info
+from utils import ensure_ip_info
+from utils.ingest import HAS_PYARROW, memory_usage_mb, read_csv_chunked
+from utils.aggregates import append_rows
+from utils.profile import get_profile
+from utils.store import get_store, hash_file
+from utils.validation import dataset_warnings, validate_profile
+from utils.perf import timed
 
-if "ipinfo" not in st.session_state:
-    st.session_state["ipinfo"] = get_ip_info()
+ensure_ip_info()
 
 if "currency" not in st.session_state:
     st.session_state["currency"] = st.session_state["ipinfo"].get("currency", "USD")
@@ -11,17 +16,88 @@ if "currency" not in st.session_state:
 if "uploaded_data" not in st.session_state:
     st.session_state["uploaded_data"] = None
 
+@timed("home.ingest")
 def process_uploaded_file(uploaded_file):
+    """Ingest an upload into the dataset store and return its handle."""
     try:
-        data = pd.read_csv(uploaded_file)
+        store = get_store()
+        key = hash_file(uploaded_file)
+        handle = store.get(key)
+        if handle is not None:
+            st.caption(f"Reusing stored dataset ({handle.n_rows:,} rows).")
+            return check_dataset(handle)
+        progress_bar = st.progress(0.0, text="Reading file...")
+        coerced = {}
+        data = read_csv_chunked(
+            uploaded_file,
+            engine="pyarrow" if HAS_PYARROW else "c",
+            progress=lambda fraction: progress_bar.progress(fraction, text=f"Reading file... {fraction:.0%}"),
+            coerced=coerced,
+        )
+        progress_bar.empty()
+        warn_coerced(coerced)
         if data.empty:
             st.error("The uploaded file is empty. Please upload a valid dataset.")
             return None
-        return data
+        st.caption(f"Loaded {len(data):,} rows ({memory_usage_mb(data):,.1f} MB in memory).")
+        return check_dataset(store.put(data, key))
     except Exception as e:
         st.error(f"Error reading file: {e}")
         return None
 
+def warn_coerced(coerced):
+    """Report values that didn't fit their column's type and were read as missing."""
+    if coerced:
+        counts = ", ".join(f"{column} ({count:,})" for column, count in coerced.items())
+        st.warning(f"⚠️ Some values didn't match their column's type and were read as missing: {counts}.")
+
+def check_dataset(handle):
+    """Profile a stored upload once and report problems; returns ``None`` if it can't be analysed."""
+    profile = get_profile(handle)
+    problems = validate_profile(profile)
+    for problem in problems:
+        st.error(problem)
+    for warning in dataset_warnings(profile):
+        st.warning(f"⚠️ {warning}")
+    with st.expander("🧾 Column profile"):
+        if profile.sampled:
+            st.caption(f"Statistics from a sample of {profile.profiled_rows:,} of {profile.n_rows:,} rows.")
+        st.dataframe(profile.table(), hide_index=True)
+    return None if problems else handle
+
+def append_uploaded_file(handle, uploaded_file):
+    """Append an upload's rows to the current dataset, updating cached KPIs incrementally."""
+    try:
+        coerced = {}
+        rows = read_csv_chunked(uploaded_file, engine="pyarrow" if HAS_PYARROW else "c", coerced=coerced)
+        warn_coerced(coerced)
+        new_handle = get_store().append(handle, rows)
+        append_rows(handle.key, new_handle.key, rows)
+        return check_dataset(new_handle)
+    except Exception as e:
+        st.error(f"Error appending file: {e}")
+        return None
+
+@timed("page.home")
 def home_page():
     st.title("🏠 Home")
     st.write("Welcome to Smart Insights!")
+
+    # Only a new upload replaces the dataset, so rerunning doesn't undo appended rows
+    uploaded_file = st.file_uploader("Upload your sales data (CSV)", type="csv")
+    if uploaded_file is not None and uploaded_file.file_id != st.session_state.get("uploaded_file_id"):
+        st.session_state["uploaded_file_id"] = uploaded_file.file_id
+        dataset = process_uploaded_file(uploaded_file)
+        if dataset is not None:
+            st.session_state["uploaded_data"] = dataset
+
+    # New rows are appended to the stored dataset and cached KPIs are updated instead of recomputed
+    handle = st.session_state["uploaded_data"]
+    if handle is not None:
+        st.subheader("Append rows")
+        new_rows = st.file_uploader("Upload more rows with the same columns (CSV)", type="csv", key="append_file")
+        if new_rows is not None and st.button("Append rows"):
+            dataset = append_uploaded_file(handle, new_rows)
+            if dataset is not None:
+                st.session_state["uploaded_data"] = dataset
+                st.success(f"Dataset now has {dataset.n_rows:,} rows.")
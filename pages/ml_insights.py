@@ -1,11 +1,23 @@
 import streamlit as st
 st.set_page_config(page_title="ML Insights", page_icon="🤖")
 
+import time
+from concurrent.futures import wait
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.metrics import classification_report, mean_squared_error, accuracy_score
-
+from bpd.core.train import evaluate
+from utils.encoding import ENCODINGS
+from utils.explain import DEFAULT_TIME_BUDGET, explain_async, explanations
+from utils.ml import (
+    DEFAULT_ENCODING, LARGE_DATA_ROWS, MODEL_FAMILIES, compare_async, compatible_models, encoding_footprints,
+    sample_size, select_model, train_async, training, training_key,
+)
+from utils.profile import get_profile
+from utils.sql import FILTER_OPS, parse_filter_value, select_rows
+from utils.store import dataset_key, dataset_len, dataset_schema, load_dataset
+from utils.widgets import query_engine
+from utils.perf import timed
+
+@timed("page.ml_insights")
 def ml_insights_page():
     st.title("🤖 ML Insights - Automated Machine Learning Analysis")
     st.sidebar.markdown("### ML Tools")
@@ -15,28 +27,29 @@ def ml_insights_page():
         st.stop()
 
     try:
-        data = st.session_state["uploaded_data"]
-        # Add compatibility checks if necessary
+        dataset = st.session_state["uploaded_data"]
+        schema = dataset_schema(dataset)
     except Exception as e:
         st.error(f"Error processing data: {e}")
         st.stop()
 
-    if data.shape[0] < 2:
+    if dataset_len(dataset) < 2:
         st.warning("⚠️ Dataset must have at least 2 rows.")
         st.stop()
 
-    numeric_columns = data.select_dtypes(include=["number"]).columns
-    categorical_columns = data.select_dtypes(include=["object"]).columns
+    profile = get_profile(dataset)
+    numeric_columns = pd.Index(profile.numeric_columns)
+    categorical_columns = pd.Index(profile.categorical_columns)
 
     # Validate dataset size before train-test split
-    if data.shape[1] < 2:
+    if schema.shape[1] < 2:
         st.error("Dataset must have at least 2 columns for ML Insights.")
         return
 
     st.sidebar.header("⚙️ Model Settings")
 
-    target_col = st.selectbox("Select Target Column", options=data.columns)
-    if pd.api.types.is_datetime64_any_dtype(data[target_col]):
+    target_col = st.selectbox("Select Target Column", options=schema.columns)
+    if profile[target_col].kind == "datetime":
         st.error("Target column cannot be of type datetime.")
         st.stop()
 
@@ -46,51 +59,109 @@ def ml_insights_page():
         st.info("ℹ️ Please select both a target and one or more feature columns.")
         return
 
+    n_estimators = st.sidebar.slider("Number of Trees", min_value=20, max_value=500, value=100, step=20)
+    max_depth = st.sidebar.selectbox("Max Tree Depth", options=[None, 5, 10, 20], format_func=lambda d: "Unlimited" if d is None else str(d))
+    params = {"n_estimators": n_estimators, "max_depth": max_depth}
+    encoding = st.sidebar.selectbox(
+        "Feature Encoding", options=list(ENCODINGS), index=list(ENCODINGS).index(DEFAULT_ENCODING),
+        format_func=ENCODINGS.get,
+    )
+
+    data_key = dataset_key(dataset)
+    n_rows = dataset_len(dataset)
+    load = lambda: load_dataset(dataset, columns=dict.fromkeys([*features, target_col]))
+    engine = query_engine(help="DuckDB filters and samples the stored file without loading it.")
+    if engine == "duckdb":
+        # Only the selected columns of the matching (and sampled) rows are read from the stored file
+        filters = row_filters(schema)
+        load = lambda: select_rows(dataset, list(dict.fromkeys([*features, target_col])), filters, not_null=[target_col],
+                                   sample_rows=sample_size(n_rows))
+        # A reservoir sample and filtered rows are different training data from the pandas path
+        data_key = f"{data_key}:duckdb:{filters}"
+
+    # Model family; the choice is remembered per dataset
+    chosen_models = st.session_state.setdefault("ml_model", {})
+    model_options = ["auto", *compatible_models(encoding)]
+    model_choice = st.sidebar.selectbox(
+        "Model", options=model_options,
+        index=model_options.index(chosen_models.get(data_key, "auto")) if chosen_models.get(data_key, "auto") in model_options else 0,
+        format_func=lambda m: "Auto" if m == "auto" else MODEL_FAMILIES[m],
+    )
+    chosen_models[data_key] = model_choice
+    model_name = select_model(n_rows, encoding) if model_choice == "auto" else model_choice
+    sample_rows = sample_size(n_rows)
+    if sample_rows:
+        sampling = "a DuckDB reservoir sample" if engine == "duckdb" else "a stratified sample"
+        st.info(f"ℹ️ Large dataset ({n_rows:,} rows > {LARGE_DATA_ROWS:,}): training {MODEL_FAMILIES[model_name]} "
+                f"on {sampling} of {sample_rows:,} rows.")
+
+    # Estimated size of the encoded features, before anything is trained
+    with st.expander("🧮 Encoding memory footprint"):
+        footprints = encoding_footprints(data_key, load, target_col, features)
+        st.dataframe(footprints.style.format({"memory_mb": "{:.1f} MB"}), hide_index=True)
+
+    # Trained models are cached (and saved to models/) per data, target, features, encoding, model and params
+    key = training_key(data_key, target_col, features, params, encoding, model_name, sample_rows)
+    future = train_async(key, data_key, load, target_col, features, params, encoding, model_name, sample_rows)
+    wait([future], timeout=0.5)
+    if not future.done():
+        st.progress(training.progress(key) or 0.0, text=f"Training model ({training.elapsed(key):.0f}s)...")
+        time.sleep(0.5)
+        st.rerun()
     try:
-        X = data[features]
-        y = data[target_col]
-        X = pd.get_dummies(X)
-        y = pd.to_numeric(y, errors='coerce')
-        y = y.dropna()
-        X = X.loc[y.index]
+        result = future.result()
+    except ValueError as e:
+        st.error(f"❌ Not enough rows or mismatched column types: {e}")
+        training.discard(key)
+        return
     except Exception as e:
         st.error(f"❌ Data processing error: {e}")
+        training.discard(key)
         return
 
-    # Train/test split
-    try:
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        st.success("Train-test split successful!")
-    except ValueError as e:
-        st.error(f"❌ Not enough rows or mismatched column types: {e}")
-        return
+    from sklearn.metrics import classification_report
 
-    # Determine classification or regression
-    is_classification = y.nunique() <= 10 and y.dtype in [int, 'int64']
+    model, y_test, predictions = result.model, result.y_test, result.predictions
+    model_label = MODEL_FAMILIES[result.model_name]
+    metrics = evaluate(result)
 
     st.subheader("📊 Model Performance")
-    if is_classification:
-        model = RandomForestClassifier()
-        model.fit(X_train, y_train)
-        predictions = model.predict(X_test)
-
-        st.success("✅ Classification Model Trained (Random Forest)")
+    st.caption(f"Features encoded with {ENCODINGS[result.encoding]}: {len(result.feature_names)} columns, {result.encoded_mb:.1f} MB")
+    if result.is_classification:
+        st.success(f"✅ Classification Model Trained ({model_label})")
         st.text("📄 Classification Report:")
         st.text(classification_report(y_test, predictions))
-        st.metric("🔍 Accuracy", f"{accuracy_score(y_test, predictions) * 100:.2f}%")
+        st.metric("🔍 Accuracy", f"{metrics['accuracy'] * 100:.2f}%")
     else:
-        model = RandomForestRegressor()
-        model.fit(X_train, y_train)
-        predictions = model.predict(X_test)
-
-        st.success("✅ Regression Model Trained (Random Forest)")
-        mse = mean_squared_error(y_test, predictions)
-        st.metric("📉 Mean Squared Error", f"{mse:.2f}")
+        st.success(f"✅ Regression Model Trained ({model_label})")
+        st.metric("📉 Mean Squared Error", f"{metrics['mse']:.2f}")
 
     # Feature importance
+    # Permutation importance and SHAP values, sized to the time budget and cached with the model
     st.subheader("📌 Feature Importance")
-    importances = pd.Series(model.feature_importances_, index=X.columns).sort_values(ascending=False)
-    st.bar_chart(importances.head(10))
+    time_budget = st.sidebar.slider("Explanation Time Budget (s)", min_value=2, max_value=30, value=int(DEFAULT_TIME_BUDGET))
+    explanation_future = explain_async(key, result, float(time_budget))
+    wait([explanation_future], timeout=0.5)
+    if not explanation_future.done():
+        if hasattr(model, "feature_importances_"):
+            importances = pd.Series(model.feature_importances_, index=result.feature_names).sort_values(ascending=False)
+            st.bar_chart(importances.head(10))
+        st.info("⏳ Computing permutation importance...")
+        time.sleep(0.5)
+        st.rerun()
+    try:
+        explanation = explanation_future.result()
+    except Exception as e:
+        st.error(f"❌ Could not explain the model: {e}")
+        explanations.discard((key, float(time_budget)))
+    else:
+        st.caption(f"Permutation importance: drop in test score when each column is shuffled ({explanation.sample_rows:,} rows)")
+        st.bar_chart(explanation.permutation.set_index("feature")["importance"].head(10))
+        if explanation.shap is not None:
+            st.caption(f"SHAP: mean absolute contribution per encoded feature ({explanation.shap_rows:,} rows)")
+            st.bar_chart(explanation.shap.set_index("feature")["mean_abs_shap"].head(10))
+        for note in explanation.notes:
+            st.caption(f"ℹ️ {note}")
 
     # Prediction Preview
     st.subheader("🔍 Sample Predictions")
@@ -99,3 +170,43 @@ def ml_insights_page():
         "Predicted": predictions
     }).reset_index(drop=True)
     st.dataframe(pred_df.head(10))
+
+    # Fit/predict time and memory of every compatible model family
+    st.subheader("⚖️ Compare Models")
+    compare_key = f"compare:{key}"
+    requested = st.session_state.setdefault("ml_compare", set())
+    if st.button("Compare model families"):
+        requested.add(compare_key)
+    if compare_key in requested:
+        comparison = compare_async(key, data_key, load, target_col, features, params, encoding, sample_rows)
+        wait([comparison], timeout=0.5)
+        if not comparison.done():
+            st.info(f"⏳ Comparing models ({training.elapsed(compare_key):.0f}s)...")
+            time.sleep(0.5)
+            st.rerun()
+        try:
+            st.dataframe(comparison.result().style.format({
+                "fit_seconds": "{:.2f}s", "predict_seconds": "{:.3f}s", "peak_memory_mb": "{:.1f} MB", "score": "{:.3f}",
+            }), hide_index=True)
+        except Exception as e:
+            st.error(f"❌ Model comparison failed: {e}")
+            training.discard(compare_key)
+            requested.discard(compare_key)
+
+def row_filters(schema):
+    """Optional ``(column, op, value)`` filters on the training rows, applied by DuckDB during the scan."""
+    with st.expander("🔎 Filter training rows"):
+        filters = []
+        for i in range(st.number_input("Number of filters", min_value=0, max_value=5, value=0)):
+            col1, col2, col3 = st.columns([2, 1, 2])
+            column = col1.selectbox("Column", options=schema.columns, key=f"ml_filter_column_{i}")
+            op = col2.selectbox("Operator", options=FILTER_OPS, key=f"ml_filter_op_{i}")
+            value = col3.text_input("Value", key=f"ml_filter_value_{i}")
+            if value == "":
+                continue
+            # Checked against the column type here, so a bad value never reaches the training job
+            try:
+                filters.append((column, op, parse_filter_value(schema[column].dtype, value)))
+            except ValueError:
+                col3.error(f"'{value}' is not a valid {schema[column].dtype} value for {column}; filter ignored.")
+    return filters
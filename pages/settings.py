@@ -2,8 +2,12 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from utils import get_holidays, get_ip_info
+from utils.cache import get_cache
+from utils import perf
+from utils.perf import timed
 import pycountry
 
+@timed("page.settings")
 def settings_page():
     st.title("⚙️ Settings")
     st.sidebar.markdown("### Settings")
@@ -26,12 +30,60 @@ def settings_page():
     if st.button("Fetch Holidays"):
         try:
             holidays = get_holidays(country=selected_country, year=year)
-            if not holidays:
+            if holidays.empty:
                 st.warning("No holidays found for the selected country and year.")
             else:
-                st.table(holidays)
+                st.dataframe(holidays, hide_index=True)
         except Exception as e:
             st.error(f"Error fetching holidays: {e}")
 
     if st.button("Save Settings"):
         st.success("✅ Settings saved!")
+
+    cache_section()
+    diagnostics_section()
+
+def cache_section():
+    """Memory use and hit/miss/eviction counters of the shared cache."""
+    st.write("### Cache")
+    cache = get_cache()
+    col1, col2 = st.columns(2)
+    col1.metric("Memory", f"{cache.memory_bytes / 1024 ** 2:.1f} / {cache.memory_budget / 1024 ** 2:.0f} MB")
+    col2.metric("Spilled to disk", f"{cache.disk_bytes / 1024 ** 2:.1f} MB")
+    st.dataframe(cache.stats(), hide_index=True)
+    if st.button("Clear Caches"):
+        cache.clear()
+        st.success("✅ Caches cleared.")
+
+def diagnostics_section():
+    """Per-stage latency, tracemalloc snapshots and metric exports."""
+    st.write("### Diagnostics")
+    stats = perf.registry.stats()
+    if stats.empty:
+        st.info("No timings recorded yet. Use the other pages and come back.")
+    else:
+        st.dataframe(stats, hide_index=True)
+        stage = st.selectbox("Latency histogram", options=list(stats["stage"]))
+        st.bar_chart(perf.registry.histogram(stage))
+
+    tracing = st.toggle("Trace memory allocations (tracemalloc)", value=perf.traced_memory() != {},
+                        help="Adds noticeable overhead to every allocation while on.")
+    if tracing:
+        perf.start_tracing()
+        memory = perf.traced_memory()
+        col1, col2 = st.columns(2)
+        col1.metric("Traced memory", f"{memory['current_bytes'] / 1024 ** 2:.1f} MB")
+        col2.metric("Peak", f"{memory['peak_bytes'] / 1024 ** 2:.1f} MB")
+        if st.button("Take Memory Snapshot"):
+            st.dataframe(perf.memory_snapshot(), hide_index=True)
+    else:
+        perf.stop_tracing()
+
+    col1, col2, col3 = st.columns(3)
+    col1.download_button("Download JSON", perf.registry.to_json(), file_name="bpd-metrics.json",
+                         mime="application/json")
+    col2.download_button("Download Prometheus", perf.registry.to_prometheus(), file_name="bpd-metrics.prom",
+                         mime="text/plain")
+    if col3.button("Reset Timings"):
+        perf.registry.reset()
+        st.success("✅ Timings reset.")
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Data and model directories are read when utils modules are imported, so point them at a scratch directory first.
+_WORK_DIR = tempfile.mkdtemp(prefix="bpd-tests-")
+os.environ.setdefault("BPD_DATA_DIR", os.path.join(_WORK_DIR, "data"))
+os.environ.setdefault("BPD_MODELS_DIR", os.path.join(_WORK_DIR, "models"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
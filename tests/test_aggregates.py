@@ -0,0 +1,33 @@
+import pandas as pd
+import pytest
+
+from utils.aggregates import RevenueAggregates, get_aggregates
+from utils.sql import HAS_DUCKDB, revenue_aggregates
+
+FRAME = pd.DataFrame({
+    "Date": ["2024-01-01", "2024-01-01", "2024-01-03", "not a date", "2024-02-10"],
+    "Amount": [10.0, 5.5, 2.0, 7.0, None],
+})
+
+
+@pytest.mark.skipif(not HAS_DUCKDB, reason="duckdb is not installed")
+def test_engines_agree_on_iso_dates():
+    expected = RevenueAggregates.from_frame(FRAME, "Date", "Amount")
+    actual = revenue_aggregates(FRAME, "Date", "Amount")
+    pd.testing.assert_series_equal(actual.daily_sum, expected.daily_sum, check_names=False, check_freq=False,
+                                   check_index_type=False)
+    pd.testing.assert_series_equal(actual.daily_count, expected.daily_count, check_names=False,
+                                   check_freq=False, check_index_type=False, check_dtype=False)
+    assert actual.invalid_rows == expected.invalid_rows == 2
+
+
+def test_engines_are_cached_separately():
+    def load(columns):
+        return FRAME[columns]
+
+    pandas = get_aggregates("parity", "Date", "Amount", load)
+    other = get_aggregates("parity", "Date", "Amount", load, compute=lambda: RevenueAggregates(
+        pd.Series(dtype=float), pd.Series(dtype="int64")), engine="duckdb")
+    assert pandas.total == 17.5
+    assert other.empty
+    assert get_aggregates("parity", "Date", "Amount", load) is pandas
@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+
+from utils.backtest import backtest, cutoffs
+
+
+def test_cutoffs_are_spread_between_initial_and_last_period():
+    assert cutoffs(36, folds=4, initial=24) == [24, 28, 31, 35]
+    assert cutoffs(10, folds=8, initial=3) == [3, 4, 5, 6, 7, 8, 9]
+    assert cutoffs(4, initial=3) == [3]
+    assert cutoffs(3, initial=3) == []
+
+
+def test_rerun_reuses_cached_folds():
+    days = pd.date_range("2020-01-01", periods=36 * 30, freq="D")
+    df = pd.DataFrame({"ds": days, "y": np.arange(len(days), dtype=float) % 97})
+    first = backtest(df, engine="naive", horizon=3, folds=4)
+    second = backtest(df, engine="naive", horizon=3, folds=4)
+    assert first.folds == first.fitted_folds == 4
+    assert second.fitted_folds == 0
+    pd.testing.assert_frame_equal(first.predictions, second.predictions)
@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+
+from utils.cache import Cache, sizeof
+
+
+def test_sizeof_counts_array_buffers():
+    assert sizeof(np.zeros(1_000_000)) >= 8_000_000
+    assert sizeof({"a": np.zeros(1_000), "b": [np.zeros(1_000)] * 3}) >= 4 * 8_000
+
+
+def test_entries_over_the_memory_budget_are_evicted_lru(tmp_path):
+    cache = Cache(memory_budget_mb=1, spill_dir=str(tmp_path))
+    cache.namespace("plain")
+    cache.set("plain", "a", np.zeros(60_000))
+    cache.set("plain", "b", np.zeros(60_000))
+    cache.get("plain", "a")
+    cache.set("plain", "c", np.zeros(60_000))
+    assert cache.get("plain", "b") is None
+    assert cache.get("plain", "a") is not None and cache.get("plain", "c") is not None
+    assert cache.memory_bytes <= 1024 ** 2
+
+
+def test_spilled_entries_are_served_from_disk(tmp_path):
+    cache = Cache(memory_budget_mb=1, spill_dir=str(tmp_path))
+    cache.namespace("spilled", max_entries=1, spill=True)
+    cache.set("spilled", "a", np.arange(10.0))
+    cache.set("spilled", "b", np.arange(5.0))
+    assert cache.disk_bytes > 0
+    np.testing.assert_array_equal(cache.get("spilled", "a"), np.arange(10.0))
+    stats = cache.stats().set_index("namespace").loc["spilled"]
+    assert stats["spills"] >= 1 and stats["spill_hits"] == 1
+    cache.clear("spilled")
+    assert cache.get("spilled", "a") is None and cache.disk_bytes == 0
+    cache.close()
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = Cache(spill_dir=str(tmp_path))
+    cache.namespace("short", ttl=0.001)
+    cache.set("short", "a", 1)
+    time.sleep(0.01)
+    assert cache.get_or_set("short", "a", lambda: 2) == 2
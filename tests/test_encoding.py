@@ -0,0 +1,17 @@
+import pandas as pd
+
+from utils.encoding import NativeCategoricalEncoder
+
+
+def test_native_feature_names_follow_transform_order():
+    X = pd.DataFrame({"Region": ["north", "south", "north"], "Qty": [1, 2, 3]})
+    encoder = NativeCategoricalEncoder().fit(X)
+    assert list(encoder.transform(X).columns) == ["Region", "Qty"]
+    assert list(encoder.get_feature_names_out()) == ["Region", "Qty"]
+
+
+def test_native_transform_uses_fit_column_order():
+    X = pd.DataFrame({"Region": ["north", "south"], "Qty": [1, 2]})
+    encoder = NativeCategoricalEncoder().fit(X)
+    out = encoder.transform(X[["Qty", "Region"]])
+    assert list(out.columns) == list(encoder.get_feature_names_out())
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from utils.explain import HAS_SHAP, MIN_SAMPLE_ROWS, explain, rows_within
+from utils.ml import train
+
+
+def test_sample_shrinks_to_fit_the_budget():
+    assert rows_within(1.0, (0.0, 0.001), max_rows=2_000) == 1_000
+    assert rows_within(1.0, (0.0, 0.0), max_rows=2_000) == 2_000
+    assert rows_within(1.0, (2.0, 0.001), max_rows=2_000) == MIN_SAMPLE_ROWS
+
+
+def test_the_informative_feature_ranks_first():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({"signal": rng.normal(size=2_000), "noise": rng.normal(size=2_000),
+                         "region": rng.choice(["n", "s"], size=2_000)})
+    data["target"] = 3 * data["signal"] + rng.normal(scale=0.1, size=2_000)
+    result = train("explain-test", "explain-data", lambda: data, "target", ["signal", "noise", "region"],
+                   {"n_estimators": 20, "max_depth": 6})
+    explanation = explain(result, time_budget=2.0)
+    assert explanation.permutation["feature"].iloc[0] == "signal"
+    assert set(explanation.permutation["feature"]) == {"signal", "noise", "region"}
+    assert MIN_SAMPLE_ROWS <= explanation.sample_rows <= len(result.explain_X)
+    if not HAS_SHAP:
+        assert explanation.shap is None and explanation.notes
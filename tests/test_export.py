@@ -0,0 +1,42 @@
+import gzip
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from utils.export import PreparedExport, export_to_tempfile, write_export
+
+CHUNKS = [
+    pd.DataFrame({"Date": pd.to_datetime(["2024-01-01", "2024-01-02"]), "Amount": [1.5, None]}),
+    pd.DataFrame({"Date": pd.to_datetime(["2024-01-03"]), "Amount": [3.0]}),
+]
+EXPECTED = pd.concat(CHUNKS, ignore_index=True)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "csv.gz", "parquet", "xlsx"])
+def test_chunks_are_written_as_one_table(fmt, tmp_path):
+    pytest.importorskip("openpyxl" if fmt == "xlsx" else "pyarrow")
+    path = str(tmp_path / f"data.{fmt}")
+    progress = []
+    assert write_export(iter(CHUNKS), fmt, path, total_rows=3, progress=progress.append) == 3
+    assert progress[-1] == 1.0
+    if fmt == "csv":
+        frame = pd.read_csv(path, parse_dates=["Date"])
+    elif fmt == "csv.gz":
+        with gzip.open(path, "rt") as fh:
+            frame = pd.read_csv(io.StringIO(fh.read()), parse_dates=["Date"])
+    elif fmt == "parquet":
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_excel(path)
+    pd.testing.assert_frame_equal(frame, EXPECTED, check_dtype=False)
+
+
+def test_prepared_export_reads_lazily_and_removes_its_file():
+    path = export_to_tempfile(iter(CHUNKS), "csv")
+    prepared = PreparedExport("key", path)
+    read = prepared.reader()
+    assert read().startswith(b"Date,Amount")
+    del prepared
+    assert not os.path.exists(path)
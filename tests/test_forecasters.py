@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import forecasters
+from utils.forecasters import make_forecaster, select_engine
+
+
+def test_engine_follows_series_length_and_time_budget(monkeypatch):
+    monkeypatch.setattr(forecasters, "prophet_available", lambda: False)
+    assert select_engine(36) == "holt_winters"
+    assert select_engine(12) == "linear"
+    assert select_engine(2) == "naive"
+    monkeypatch.setattr(forecasters, "prophet_available", lambda: True)
+    assert select_engine(36, n_rows=1_000, time_budget=30) == "prophet"
+    assert select_engine(36, n_rows=10_000_000, time_budget=0.5) == "holt_winters"
+
+
+@pytest.mark.parametrize("engine", ["naive", "linear", "holt_winters"])
+def test_fast_engines_forecast_the_horizon(engine):
+    ds = pd.date_range("2020-01-01", periods=36, freq="MS")
+    df = pd.DataFrame({"ds": ds, "y": 100 + np.arange(36) + 10 * np.sin(np.arange(36) * np.pi / 6)})
+    forecast = make_forecaster(engine).fit(df).predict(6)
+    assert len(forecast) == 6
+    assert (forecast["ds"] > ds[-1]).all()
+    assert (forecast["yhat_lower"] <= forecast["yhat"]).all() and (forecast["yhat"] <= forecast["yhat_upper"]).all()
+
+
+def test_auto_picks_an_engine_from_the_data(monkeypatch):
+    monkeypatch.setattr(forecasters, "prophet_available", lambda: False)
+    df = pd.DataFrame({"ds": pd.date_range("2024-01-01", periods=4, freq="MS"), "y": [1.0, 2.0, 3.0, 4.0]})
+    assert make_forecaster("auto", df).name == "linear"
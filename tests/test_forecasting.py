@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from utils.forecasting import forecast_many, forecast_many_async
+
+
+def sales(groups=("a", "b"), months=30):
+    days = pd.date_range("2021-01-01", periods=months * 30, freq="D")
+    return pd.concat([
+        pd.DataFrame({"store": name, "date": days, "amount": np.arange(len(days)) % 31 + i})
+        for i, name in enumerate(groups)
+    ], ignore_index=True)
+
+
+def test_forecast_many_fits_every_series_in_worker_processes():
+    short = pd.DataFrame({"store": "short", "date": pd.date_range("2023-01-01", periods=3, freq="MS"), "amount": 1.0})
+    combined, stats = forecast_many(pd.concat([sales(), short]), "store", "date", "amount", 3, engine="naive",
+                                    max_workers=2)
+    assert sorted(stats["series"]) == ["a", "b", "short"]
+    assert stats.set_index("series").loc["short", "engine"] == "baseline"
+    assert combined.groupby("store").size().to_dict() == {"a": 3, "b": 3, "short": 3}
+
+
+def test_batch_forecast_runs_in_the_background_and_reports_progress():
+    data = sales()
+    future = forecast_many_async(("batch", "test"), lambda: data, "store", "date", "amount", 2, engine="naive")
+    combined, stats = future.result(timeout=120)
+    assert len(stats) == 2 and stats["error"].isna().all()
+    assert len(combined) == 4
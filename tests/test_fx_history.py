@@ -0,0 +1,52 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from utils import fx, fx_history
+from utils.fx import StaticRateSource, set_rate_source
+
+
+class FakeHistorySource:
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, base, start, end):
+        self.calls.append((start, end))
+        days = pd.date_range(start, end)
+        return pd.DataFrame({"date": days, "currency": "EUR", "rate": 0.9})
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = fx_history.RateStore(str(tmp_path / "rates.sqlite"))
+    monkeypatch.setattr(fx_history, "_store", store)
+    previous = fx.get_rate_source()
+    set_rate_source(StaticRateSource({"EUR": 0.5, "GBP": 0.25}))
+    yield store
+    set_rate_source(previous)
+
+
+def test_rate_on_falls_back_to_the_current_rate_without_a_date(store):
+    assert fx_history.rate_on(date(2024, 3, 1), "USD", "EUR") == (0.5, None)
+    assert fx_history.rate_on(date(2024, 3, 1), "EUR", "eur") == (1.0, None)
+
+
+def test_rate_on_uses_the_latest_stored_rate_on_or_before_the_day(store):
+    store.put(pd.DataFrame({"date": ["2024-02-28", "2024-02-29"], "currency": ["EUR", "EUR"], "rate": [0.8, 0.9]}),
+              date(2024, 2, 28), date(2024, 2, 29))
+    assert fx_history.rate_on(date(2024, 3, 2), "USD", "EUR") == (0.9, date(2024, 2, 29))
+    assert fx_history.rate_on(date(2024, 2, 27), "USD", "EUR") == (0.5, None)
+
+
+def test_asof_rates_use_the_current_rate_without_history(store):
+    assert list(fx_history.asof_rates(["2024-01-01", "2024-01-02"], "GBP")) == [0.25, 0.25]
+
+
+def test_ensure_history_only_fetches_days_outside_the_stored_range(store):
+    source = FakeHistorySource()
+    fx_history.ensure_history(date(2024, 1, 10), date(2024, 1, 20), source, store)
+    coverage = fx_history.ensure_history(date(2024, 1, 1), date(2024, 1, 25), source, store)
+    assert coverage == (date(2024, 1, 1), date(2024, 1, 25))
+    assert source.calls == [(date(2024, 1, 10), date(2024, 1, 20)), (date(2024, 1, 1), date(2024, 1, 9)),
+                            (date(2024, 1, 21), date(2024, 1, 25))]
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from utils import http
+from utils.holidays import HolidayCalendar, to_prophet_holidays
+
+
+def payload(year):
+    return {"response": {"holidays": [
+        {"date": {"iso": f"{year}-01-01"}, "name": "New Year's Day", "type": ["National holiday"]},
+        {"date": {"iso": f"{year}-03-10T02:00:00"}, "name": "Daylight Saving Time starts", "type": ["Clock change"]},
+    ]}}
+
+
+@pytest.fixture
+def calendar(tmp_path):
+    return HolidayCalendar("key", path=str(tmp_path / "holidays.sqlite"))
+
+
+def test_holidays_are_fetched_in_the_background_and_stored(calendar, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def get_json(url, params, ttl):
+        release.wait(5)
+        calls.append((params["country"], params["year"]))
+        return payload(params["year"])
+
+    monkeypatch.setattr(http, "get_json", get_json)
+    assert calendar.holidays("us", [2023, 2024]).empty
+    assert calendar.pending("US", [2023, 2024])
+    release.set()
+    calendar.request("US", [2023, 2024]).result(5)
+
+    national = calendar.holidays("US", [2023, 2024], types=("National holiday",))
+    assert sorted(calls) == [("US", 2023), ("US", 2024)]
+    assert national["date"].dt.strftime("%Y-%m-%d").tolist() == ["2023-01-01", "2024-01-01"]
+    assert calendar.request("US", [2023, 2024]) is None
+    assert len(to_prophet_holidays(calendar.holidays("US", 2024))) == 2
+
+
+def test_failed_fetch_raises_when_nothing_is_stored(calendar, monkeypatch):
+    def get_json(url, params, ttl):
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(http, "get_json", get_json)
+    with pytest.raises(ConnectionError):
+        calendar.holidays("GB", 2020, wait=True)
@@ -0,0 +1,18 @@
+from utils.http import CircuitBreaker, clamp_timeout
+
+
+def test_half_open_breaker_admits_a_single_probe():
+    breaker = CircuitBreaker(failure_threshold=2, reset_after=0.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_timeout_is_clamped_to_the_remaining_deadline():
+    assert clamp_timeout(10, 2.5) == 2.5
+    assert clamp_timeout((3.05, 10), 4) == (3.05, 4)
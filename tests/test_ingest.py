@@ -0,0 +1,39 @@
+import pytest
+
+from utils.ingest import HAS_PYARROW, read_csv_chunked
+
+
+def test_values_that_do_not_fit_the_sampled_type_are_counted():
+    lines = ["qty,date"] + [f"{i},2024-01-{i % 28 + 1:02d}" for i in range(200)] + ["oops,not a date", "3,2024-02-01"]
+    coerced = {}
+    frame = read_csv_chunked("\n".join(lines).encode(), chunksize=50, sample_rows=100, coerced=coerced)
+    assert len(frame) == 202
+    assert coerced == {"qty": 1, "date": 1}
+    assert frame["qty"].isna().sum() == 1
+    assert frame["date"].isna().sum() == 1
+
+
+def test_clean_file_reports_nothing():
+    coerced = {}
+    read_csv_chunked(b"qty,price\n1,2.5\n2,3.5\n", coerced=coerced)
+    assert coerced == {}
+
+
+@pytest.mark.skipif(not HAS_PYARROW, reason="pyarrow is not installed")
+def test_engines_agree_on_blank_cells():
+    lines = ["date,region,amount,note"] + [
+        f"2024-01-{i % 28 + 1:02d},{'north' if i % 2 else 'south'},{i}.5,text {i}" for i in range(300)
+    ] + [",,,", "2024-02-01,,NA,", "NULL,east,,N/A"]
+    data = "\n".join(lines).encode()
+    results = {}
+    for engine in ("c", "pyarrow"):
+        coerced = {}
+        frame = read_csv_chunked(data, chunksize=100, sample_rows=100, engine=engine, coerced=coerced)
+        results[engine] = frame, coerced
+    (c_frame, c_coerced), (arrow_frame, arrow_coerced) = results["c"], results["pyarrow"]
+    assert c_coerced == arrow_coerced == {}
+    assert c_frame.isna().sum().to_dict() == arrow_frame.isna().sum().to_dict() == {
+        "date": 2, "region": 2, "amount": 3, "note": 3}
+    assert c_frame.dtypes.to_dict() == arrow_frame.dtypes.to_dict()
+    assert "" not in c_frame["region"].cat.categories
+    assert list(c_frame["region"].cat.categories) == list(arrow_frame["region"].cat.categories)
@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from utils import reports
+from utils.reports import JobQueue, ReportWorkers, SMTPConfig, parse_flag, start_workers_from_secrets
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite"))
+
+
+def test_claimed_jobs_complete_fail_and_recover(queue):
+    once = queue.enqueue({"to": ["a@example.com"], "subject": "once"})
+    daily = queue.enqueue({"to": ["b@example.com"], "subject": "daily"}, schedule="daily")
+    assert queue.claim()[0] == once
+    assert queue.claim()[0] == daily
+    assert queue.claim() is None
+    queue.complete(once)
+    queue.fail(daily, "smtp down")
+    statuses = queue.jobs().set_index("id")
+    assert statuses.loc[once, "status"] == "done"
+    assert statuses.loc[daily, "status"] == "queued" and statuses.loc[daily, "attempts"] == 1
+
+    running = queue.enqueue({"to": ["c@example.com"], "subject": "crashed"})
+    queue.claim()  # daily is not due yet, so the new job is claimed
+    queue.recover()
+    assert queue.jobs().set_index("id").loc[running, "status"] == "queued"
+
+
+def test_replacement_workers_leave_running_jobs_alone(queue):
+    job = queue.enqueue({"to": ["a@example.com"], "subject": "in flight"})
+    queue.claim()
+    workers = ReportWorkers(SMTPConfig("localhost"), queue, threads=0).start(recover=False)
+    assert queue.jobs().set_index("id").loc[job, "status"] == "running"
+    workers.stop()
+
+
+def test_invalid_smtp_settings_do_not_raise():
+    secrets = {"SMTP_SERVER": "localhost", "SMTP_PORT": "58 7", "EMAIL": "me@example.com"}
+    assert start_workers_from_secrets(secrets) is None
+    assert start_workers_from_secrets({**secrets, "SMTP_PORT": "587", "SMTP_TLS": "maybe"}) is None
+    assert start_workers_from_secrets({}) is None
+    assert parse_flag("off") is False and parse_flag("Yes") is True
+
+
+def test_renders_of_different_attachments_do_not_wait_on_each_other(queue, monkeypatch):
+    workers = ReportWorkers(SMTPConfig("localhost"), queue, threads=0)
+    slow_started, release = threading.Event(), threading.Event()
+
+    def build(payload):
+        if payload["dataset"] == "slow":
+            slow_started.set()
+            release.wait(5)
+        return f"/tmp/{payload['dataset']}"
+
+    monkeypatch.setattr(reports.os.path, "exists", lambda path: True)
+    workers._rendered[("fast", "csv", "USD")] = ("/tmp/fast", time.monotonic())
+    monkeypatch.setattr(workers, "_build", build)
+    slow = threading.Thread(target=lambda: workers.render({"dataset": "slow", "format": "csv"}))
+    slow.start()
+    assert slow_started.wait(5)
+    assert workers.render({"dataset": "fast", "format": "csv"}) == "/tmp/fast"
+    release.set()
+    slow.join(5)
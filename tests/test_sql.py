@@ -0,0 +1,26 @@
+import pandas as pd
+import pytest
+
+from utils.sql import HAS_DUCKDB, parse_filter_value, select_rows
+
+
+def test_filter_values_are_parsed_to_the_column_type():
+    assert parse_filter_value(pd.Series([1]).dtype, " 3 ") == 3
+    assert parse_filter_value(pd.Series([1.5]).dtype, "2.5") == 2.5
+    assert parse_filter_value(pd.Series([True]).dtype, "False") is False
+    assert parse_filter_value(pd.Series(pd.to_datetime(["2024-01-01"])).dtype, "2024-02-01") == pd.Timestamp("2024-02-01")
+
+
+def test_values_that_do_not_fit_raise():
+    with pytest.raises(ValueError):
+        parse_filter_value(pd.Series([1]).dtype, "abc")
+    with pytest.raises(ValueError):
+        parse_filter_value(pd.Series([True]).dtype, "maybe")
+
+
+@pytest.mark.skipif(not HAS_DUCKDB, reason="duckdb is not installed")
+def test_select_rows_selects_a_repeated_column_once():
+    frame = pd.DataFrame({"a": [1, 2, None], "target": [0.5, 1.5, 2.5]})
+    rows = select_rows(frame, ["a", "target", "target"], not_null=["a"])
+    assert list(rows.columns) == ["a", "target"]
+    assert rows["target"].tolist() == [0.5, 1.5]
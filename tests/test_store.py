@@ -0,0 +1,22 @@
+import gc
+
+import pandas as pd
+
+from utils import store
+
+
+def test_frame_key_is_computed_once_per_frame(monkeypatch):
+    frame = pd.DataFrame({"a": [1, 2, 3]})
+    key = store.dataset_key(frame)
+    monkeypatch.setattr(store, "hash_frame", lambda df: "rehashed")
+    assert store.dataset_key(frame) == key
+    assert store.dataset_key(frame.copy()) == "rehashed"
+
+
+def test_frame_key_is_dropped_with_the_frame():
+    frame = pd.DataFrame({"a": [1, 2, 3]})
+    frame_id = id(frame)
+    store.dataset_key(frame)
+    del frame
+    gc.collect()
+    assert frame_id not in store._frame_keys
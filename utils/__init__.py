@@ -1,3 +1,36 @@
-from .currency_tools import convert_currency
-from .ipinfo_tools import get_ip_info, fetch_ip_info
-from .calendarific import get_holidays
+"""
+Helper functions shared by the pages.
+
+Re-exports are resolved on first access so that importing ``utils`` (as
+``app.py`` does before the first render) does not pull in pandas, requests
+or any other heavy dependency.
+"""
+import importlib
+
+_EXPORTS = {
+    "convert_currency": ".currency_tools",
+    "convert_columns": ".fx",
+    "convert_series": ".fx",
+    "get_rate": ".fx",
+    "get_ip_info": ".ipinfo_tools",
+    "get_ip_info_async": ".ipinfo_tools",
+    "fetch_ip_info": ".ipinfo_tools",
+    "ensure_ip_info": ".ipinfo_tools",
+    "get_holidays": ".calendarific",
+    "fetch_api_with_retry": ".http",
+    "get_filtered_data": ".validation",
+    "is_valid_dataset": ".validation",
+    "validate_profile": ".validation",
+    "get_profile": ".profile",
+    "profile_frame": ".profile",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,107 @@
+"""
+Cached revenue KPIs and period rollups.
+
+Revenue is reduced once to per-day sums and counts; KPIs and the
+day/week/month/quarter rollups are derived from that small daily series
+and cached per (dataset key, date column, revenue column) in the
+``aggregates`` namespace of the shared cache. Appending rows
+only reduces the new rows and adds them to the existing daily totals.
+"""
+import pandas as pd
+
+from .cache import get_cache, namespace
+from .perf import timed
+
+PERIODS = {"Daily": "D", "Weekly": "W", "Monthly": "M", "Quarterly": "Q"}
+MAX_CACHED = 32
+
+
+def _coerce(df: pd.DataFrame, date_col, revenue_col):
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    revenue = pd.to_numeric(df[revenue_col], errors="coerce")
+    valid = dates.notna() & revenue.notna()
+    return dates[valid], revenue[valid], int((~valid).sum())
+
+
+def period_sums(daily: pd.Series, freq="M") -> pd.Series:
+    """A daily Series summed per period, indexed by period start."""
+    series = daily.groupby(daily.index.to_period(freq)).sum()
+    series.index = series.index.to_timestamp()
+    return series
+
+
+class RevenueAggregates:
+    """Daily revenue sums and counts plus lazily built rollups."""
+
+    def __init__(self, daily_sum: pd.Series, daily_count: pd.Series, invalid_rows=0):
+        self.daily_sum = daily_sum
+        self.daily_count = daily_count
+        self.invalid_rows = invalid_rows
+        self._rollups = {}
+
+    @classmethod
+    @timed("aggregates.compute")
+    def from_frame(cls, df: pd.DataFrame, date_col, revenue_col):
+        dates, revenue, invalid = _coerce(df, date_col, revenue_col)
+        grouped = revenue.groupby(dates.dt.floor("D"))
+        return cls(grouped.sum(), grouped.count(), invalid)
+
+    @property
+    def count(self):
+        return int(self.daily_count.sum())
+
+    @property
+    def total(self):
+        return float(self.daily_sum.sum())
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else float("nan")
+
+    @property
+    def empty(self):
+        return self.count == 0
+
+    def rollup(self, freq="M") -> pd.Series:
+        """Revenue summed per period (``"D"``, ``"W"``, ``"M"`` or ``"Q"``), indexed by period start."""
+        if freq not in self._rollups:
+            self._rollups[freq] = period_sums(self.daily_sum, freq)
+        return self._rollups[freq]
+
+    def append(self, df: pd.DataFrame, date_col, revenue_col):
+        """New aggregates covering the existing rows plus ``df``."""
+        new = RevenueAggregates.from_frame(df, date_col, revenue_col)
+        daily_sum = self.daily_sum.add(new.daily_sum, fill_value=0)
+        daily_count = self.daily_count.add(new.daily_count, fill_value=0).astype("int64")
+        return RevenueAggregates(daily_sum, daily_count, self.invalid_rows + new.invalid_rows)
+
+
+NAMESPACE = namespace("aggregates", max_entries=MAX_CACHED, spill=True)
+
+
+def get_aggregates(dataset_key, date_col, revenue_col, load, compute=None, engine="pandas") -> RevenueAggregates:
+    """
+    Cached aggregates for a dataset, column pair and ``engine``. ``load`` is
+    called with the needed columns only on a cache miss; ``compute``
+    replaces loading and aggregating in pandas when given (e.g.
+    ``utils.sql.revenue_aggregates`` with ``engine="duckdb"``). Engines
+    parse non-ISO dates differently, so each keeps its own entry.
+    """
+    return get_cache().get_or_set(
+        NAMESPACE, (dataset_key, date_col, revenue_col, engine),
+        compute or (lambda: RevenueAggregates.from_frame(load([date_col, revenue_col]), date_col, revenue_col)),
+    )
+
+
+def append_rows(dataset_key, new_dataset_key, rows: pd.DataFrame):
+    """
+    Carry the pandas-engine aggregates of ``dataset_key`` over to
+    ``new_dataset_key`` with ``rows`` added. Other engines recompute, since
+    the new rows are coerced the pandas way.
+    """
+    cache = get_cache()
+    cached = [(k, v) for k, v in cache.items(NAMESPACE) if k[0] == dataset_key and k[3] == "pandas"]
+    for (_, date_col, revenue_col, engine), aggregates in cached:
+        if date_col in rows and revenue_col in rows:
+            cache.set(NAMESPACE, (new_dataset_key, date_col, revenue_col, engine),
+                      aggregates.append(rows, date_col, revenue_col))
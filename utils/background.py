@@ -0,0 +1,91 @@
+"""
+Deduplicated background jobs shared by every session in the server process.
+
+Jobs are keyed by a cache key: submitting a key that is already running
+returns the running future, and finished results are kept in a namespace
+of the shared cache (``utils.cache``) so another session (or the next
+rerun) picks them up without recomputing.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .cache import get_cache
+
+# Process pools are started from a threaded server: a forked child could inherit a lock (perf registry,
+# cache, logging) held by another thread and deadlock, so workers start from a clean interpreter instead.
+PROCESS_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class JobRegistry:
+    def __init__(self, name, max_workers=2, max_results=16, namespace=None, spill=False):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"bpd-{name}")
+        self.namespace = namespace or name
+        get_cache().namespace(self.namespace, max_entries=max_results, spill=spill)
+        self._running = {}
+        self._started = {}
+        self._progress = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Finished result for ``key``, or ``None``."""
+        return get_cache().get(self.namespace, key)
+
+    def put(self, key, value):
+        get_cache().set(self.namespace, key, value)
+
+    def submit(self, key, fn, *args, **kwargs) -> Future:
+        """
+        Run ``fn`` in the background unless ``key`` is already finished or
+        running. Failed jobs stay registered (so reruns show the error rather
+        than refitting in a loop) until ``discard`` is called.
+        """
+        result = self.get(key)
+        with self._lock:
+            if result is not None:
+                future = Future()
+                future.set_result(result)
+                return future
+            if key in self._running:
+                return self._running[key]
+            future = self._executor.submit(self._run, key, fn, *args, **kwargs)
+            self._running[key] = future
+            self._started[key] = time.monotonic()
+            return future
+
+    def _run(self, key, fn, *args, **kwargs):
+        result = fn(*args, **kwargs)
+        self.put(key, result)
+        with self._lock:
+            self._running.pop(key, None)
+            self._started.pop(key, None)
+            self._progress.pop(key, None)
+        return result
+
+    def set_progress(self, key, fraction):
+        with self._lock:
+            self._progress[key] = fraction
+
+    def progress(self, key):
+        """Last reported progress fraction for a running job, if any."""
+        with self._lock:
+            return self._progress.get(key)
+
+    def elapsed(self, key):
+        """Seconds since a running job was submitted."""
+        with self._lock:
+            started = self._started.get(key)
+        return time.monotonic() - started if started is not None else 0.0
+
+    def discard(self, key):
+        """Forget a failed or finished job so the next ``submit`` runs it again."""
+        get_cache().delete(self.namespace, key)
+        with self._lock:
+            future = self._running.get(key)
+            if future is not None and future.done():
+                self._running.pop(key)
+                self._started.pop(key, None)
+                self._progress.pop(key, None)
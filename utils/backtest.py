@@ -0,0 +1,148 @@
+"""
+Rolling-origin backtesting of the forecasting engines.
+
+The series is resampled to one value per ``freq`` period, then refitted at
+up to ``MAX_FOLDS`` cutoffs spread over its history; each fold forecasts
+``horizon`` periods past its cutoff and is scored against the actuals that
+exist. Folds are independent, so Prophet folds run in parallel across a
+process pool (the fast engines fit in milliseconds and run in-process).
+Fold forecasts are cached in the ``backtests`` namespace keyed on a
+fingerprint of the fold's training data and the model configuration: a
+rerun, a shorter display horizon or newly appended data only fits the
+folds it hasn't seen.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .background import PROCESS_CONTEXT, JobRegistry
+from .cache import get_cache, namespace
+from .forecasters import DEFAULT_FREQ, make_forecaster, season_length
+from .forecasting import FORECAST_COLUMNS, fit_model
+from .store import hash_frame
+
+MAX_FOLDS = 8
+DEFAULT_HORIZON = 12
+BACKTESTS = namespace("backtests", max_entries=512, spill=True)
+backtests = JobRegistry("backtest", max_workers=1, max_results=8, namespace="backtest_jobs")
+
+
+@dataclass
+class BacktestResult:
+    engine: str
+    predictions: pd.DataFrame  # cutoff, ds, step, y, yhat, yhat_lower, yhat_upper
+    folds: int
+    fitted_folds: int
+    seconds: float
+
+
+def period_series(df: pd.DataFrame, freq=DEFAULT_FREQ) -> pd.DataFrame:
+    """``ds``/``y`` frame with one summed value per ``freq`` period."""
+    series = df.set_index("ds")["y"].sort_index().resample(freq).sum()
+    return pd.DataFrame({"ds": series.index, "y": series.to_numpy(dtype=float)})
+
+
+def min_train_periods(freq=DEFAULT_FREQ) -> int:
+    return max(2 * season_length(freq), 3)
+
+
+def cutoffs(n_periods, folds=MAX_FOLDS, initial=3) -> list:
+    """
+    Training lengths for up to ``folds`` folds, evenly spread between
+    ``initial`` periods and one period short of the full series.
+    """
+    if n_periods - 1 < initial:
+        return []
+    return sorted({int(c) for c in np.linspace(initial, n_periods - 1, folds).round()})
+
+
+def _forecast_fold(train: pd.DataFrame, engine, params, freq, horizon):
+    """Fit on ``train`` and forecast ``horizon`` periods; runs in a worker process for Prophet."""
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    forecast = fit_model(train, engine, params, freq).predict(horizon)[FORECAST_COLUMNS]
+    return forecast.assign(step=np.arange(1, len(forecast) + 1))
+
+
+def backtest(df: pd.DataFrame, engine="auto", params=None, freq=DEFAULT_FREQ, horizon=DEFAULT_HORIZON,
+             folds=MAX_FOLDS, time_budget=2.0, max_workers=None, progress=None) -> BacktestResult:
+    """
+    Backtest ``engine`` on a ``ds``/``y`` frame. ``"auto"`` is resolved once
+    on the full series so every fold uses the same engine. ``progress`` is
+    called with the fraction of folds done.
+    """
+    series = period_series(df, freq)
+    cuts = cutoffs(len(series), folds, min_train_periods(freq))
+    if not cuts:
+        raise ValueError(f"Need at least {min_train_periods(freq) + 1} periods to backtest, got {len(series)}")
+    engine = make_forecaster(engine, series, freq, time_budget).name
+    params = params or {}
+    config = (engine, freq, horizon, tuple(sorted(params.items())))
+
+    started = time.perf_counter()
+    cache = get_cache()
+    forecasts, pending = {}, {}
+    for cut in cuts:
+        train = series.iloc[:cut]
+        key = (hash_frame(train), *config)
+        cached = cache.get(BACKTESTS, key)
+        if cached is None:
+            pending[cut] = (key, train)
+        else:
+            forecasts[cut] = cached
+
+    def finish(cut, forecast):
+        forecasts[cut] = cache.set(BACKTESTS, pending[cut][0], forecast)
+        if progress:
+            progress(len(forecasts) / len(cuts))
+
+    if engine == "prophet" and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count(), len(pending)),
+                                 mp_context=PROCESS_CONTEXT) as executor:
+            futures = {executor.submit(_forecast_fold, train, engine, params, freq, horizon): cut
+                       for cut, (_, train) in pending.items()}
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+    else:
+        for cut, (_, train) in pending.items():
+            finish(cut, _forecast_fold(train, engine, params, freq, horizon))
+
+    frames = [f.assign(cutoff=series["ds"].iloc[cut - 1]) for cut, f in sorted(forecasts.items())]
+    predictions = pd.concat(frames, ignore_index=True).merge(series, on="ds", how="inner")
+    predictions = predictions[["cutoff", "ds", "step", "y", "yhat", "yhat_lower", "yhat_upper"]]
+    return BacktestResult(engine, predictions, len(cuts), len(pending), time.perf_counter() - started)
+
+
+def horizon_metrics(predictions: pd.DataFrame, max_horizon=None) -> pd.DataFrame:
+    """
+    MAPE (%), RMSE and interval coverage per forecast step, up to
+    ``max_horizon`` steps. MAPE skips periods whose actual is zero.
+    """
+    if max_horizon is not None:
+        predictions = predictions[predictions["step"] <= max_horizon]
+    error = predictions["yhat"] - predictions["y"]
+    frame = predictions.assign(
+        ape=(error.abs() / predictions["y"].abs()).where(predictions["y"] != 0) * 100,
+        se=error ** 2,
+        covered=predictions["y"].between(predictions["yhat_lower"], predictions["yhat_upper"]),
+    )
+    metrics = frame.groupby("step").agg(folds=("cutoff", "size"), mape=("ape", "mean"), rmse=("se", "mean"),
+                                        coverage=("covered", "mean"))
+    metrics["rmse"] = np.sqrt(metrics["rmse"])
+    return metrics.reset_index()
+
+
+def backtest_key(df: pd.DataFrame, engine, params, freq=DEFAULT_FREQ, horizon=DEFAULT_HORIZON, folds=MAX_FOLDS,
+                 time_budget=2.0) -> tuple:
+    return (hash_frame(df[["ds", "y"]]), engine, freq, horizon, folds, time_budget, tuple(sorted((params or {}).items())))
+
+
+def backtest_async(key, df: pd.DataFrame, engine="auto", params=None, freq=DEFAULT_FREQ, horizon=DEFAULT_HORIZON,
+                   folds=MAX_FOLDS, time_budget=2.0):
+    """Future for ``backtest``, shared by every session asking for the same key; reports fold progress."""
+    return backtests.submit(key, backtest, df, engine, params, freq, horizon, folds, time_budget,
+                            progress=lambda fraction: backtests.set_progress(key, fraction))
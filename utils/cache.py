@@ -0,0 +1,350 @@
+"""
+Process-wide in-memory cache with a global memory budget.
+
+Every cache in the app (FX rate tables, aggregates, forecasts, fitted
+models, encoded features, explanations, ...) is a namespace of one shared
+``Cache``. Each namespace has its own entry limit and TTL; on top of that
+the total estimated size of all entries is kept under ``BPD_CACHE_MB``
+by evicting the least recently used entries first, whatever their
+namespace. Namespaces registered with ``spill=True`` move evicted entries
+to a size-bounded pickle tier on disk instead of dropping them, and load
+them back on the next hit. Hit, miss, eviction and spill counters are
+kept per namespace for the Settings page.
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.environ.get("BPD_DATA_DIR", "data")
+MEMORY_BUDGET_MB = float(os.environ.get("BPD_CACHE_MB", 512))
+DISK_BUDGET_MB = float(os.environ.get("BPD_CACHE_DISK_MB", 1024))
+SPILL_DIR = os.path.join(DATA_DIR, "cache", "spill")
+MAX_DEPTH = 8
+MAX_ITEMS = 1_000
+
+_MISSING = object()
+
+
+def _sum_sizes(values, count, depth) -> int:
+    """Sizes of ``values``; long collections are extrapolated from their first ``MAX_ITEMS`` items."""
+    total, seen = 0, 0
+    for value in values:
+        if seen == MAX_ITEMS:
+            return int(total * count / seen)
+        total += sizeof(value, depth)
+        seen += 1
+    return total
+
+
+def sizeof(value, _depth=0) -> int:
+    """
+    Estimated memory held by ``value`` in bytes, from the ``nbytes`` of the
+    frames and arrays it holds. Objects are walked through their attributes
+    (fitted estimators, dataclasses), so nothing is serialized to size it.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if hasattr(value, "indptr") and hasattr(value, "data"):
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if _depth >= MAX_DEPTH:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + _sum_sizes((x for item in value.items() for x in item), 2 * len(value), _depth + 1)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + _sum_sizes(value, len(value), _depth + 1)
+    if hasattr(value, "node_count") and isinstance(getattr(value, "value", None), np.ndarray):
+        # scikit-learn's Cython Tree: node records (~64 bytes each) plus the value array
+        return value.value.nbytes + 64 * int(value.node_count)
+    fields = getattr(value, "__dict__", None)
+    if isinstance(fields, dict):
+        return sys.getsizeof(value) + sizeof(fields, _depth + 1)
+    return sys.getsizeof(value)
+
+
+@dataclass
+class Namespace:
+    name: str
+    max_entries: int = 128
+    ttl: float = None
+    spill: bool = False
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    spills: int = 0
+    spill_hits: int = 0
+    entries: int = 0
+    bytes: int = 0
+    keys: OrderedDict = field(default_factory=OrderedDict, repr=False)
+
+
+@dataclass
+class _Entry:
+    value: object
+    size: int
+    expires: float
+
+
+class Cache:
+    def __init__(self, memory_budget_mb=MEMORY_BUDGET_MB, disk_budget_mb=DISK_BUDGET_MB, spill_dir=SPILL_DIR):
+        self.memory_budget = int(memory_budget_mb * 1024 ** 2)
+        self.disk_budget = int(disk_budget_mb * 1024 ** 2)
+        # Spilled files belong to this process only; they are not a persistent cache.
+        self.spill_dir = os.path.join(spill_dir, str(os.getpid()))
+        self._namespaces = {}
+        self._entries = OrderedDict()  # (namespace, key) -> _Entry, least recently used first
+        self._spilled = OrderedDict()  # (namespace, key) -> (path, size, expires)
+        self._spilling = {}  # (namespace, key) -> _Entry being written to disk outside the lock
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+
+    def namespace(self, name, max_entries=128, ttl=None, spill=False) -> Namespace:
+        """Register (or reconfigure) a namespace."""
+        with self._lock:
+            ns = self._namespaces.get(name)
+            if ns is None:
+                ns = self._namespaces[name] = Namespace(name, max_entries, ttl, spill)
+            else:
+                ns.max_entries, ns.ttl, ns.spill = max_entries, ttl, spill
+            return ns
+
+    def _ns(self, name) -> Namespace:
+        return self._namespaces.get(name) or self.namespace(name)
+
+    def get(self, name, key, default=None):
+        full_key = (name, key)
+        with self._lock:
+            ns = self._ns(name)
+            entry = self._entries.get(full_key)
+            if entry is not None and entry.expires < time.monotonic():
+                self._drop(ns, full_key)
+                ns.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(full_key)
+                ns.keys.move_to_end(key)
+                ns.hits += 1
+                return entry.value
+            entry = self._spilling.get(full_key)
+            if entry is not None and entry.expires >= time.monotonic():
+                ns.hits += 1
+                return entry.value
+            spilled = self._spilled.get(full_key)
+            if spilled is None:
+                ns.misses += 1
+                return default
+            self._discard_spilled(full_key, remove=False)
+        # The spilled file is read outside the lock, like it is written
+        value = self._unspill(spilled)
+        with self._lock:
+            if value is _MISSING:
+                ns.misses += 1
+                ns.expirations += spilled[2] < time.monotonic()
+                return default
+            ns.hits += 1
+            ns.spill_hits += 1
+        expires = spilled[2]
+        ttl = 0 if expires == float("inf") else max(expires - time.monotonic(), 0.001)
+        return self.set(name, key, value, ttl=ttl)
+
+    def set(self, name, key, value, ttl=None, size=None):
+        size = sizeof(value) if size is None else size
+        spills = []
+        with self._lock:
+            ns = self._ns(name)
+            ttl = ns.ttl if ttl is None else ttl
+            full_key = (name, key)
+            if full_key in self._entries:
+                self._drop(ns, full_key)
+            self._discard_spilled(full_key)
+            self._spilling.pop(full_key, None)
+            expires = time.monotonic() + ttl if ttl else float("inf")
+            self._entries[full_key] = _Entry(value, size, expires)
+            ns.keys[key] = None
+            ns.entries += 1
+            ns.bytes += size
+            self._bytes += size
+            while ns.entries > ns.max_entries:
+                self._evict((name, next(iter(ns.keys))), spills)
+            while self._bytes > self.memory_budget and len(self._entries) > 1:
+                self._evict(next(iter(self._entries)), spills)
+        # Evicted entries are pickled without holding the lock, so readers never wait on a large write
+        for spill_key, entry in spills:
+            self._spill(spill_key, entry)
+        return value
+
+    def get_or_set(self, name, key, compute, ttl=None):
+        """Cached value for ``key``, calling ``compute()`` on a miss (outside the lock)."""
+        value = self.get(name, key, _MISSING)
+        if value is _MISSING:
+            value = self.set(name, key, compute(), ttl)
+        return value
+
+    def items(self, name) -> list:
+        """In-memory (key, value) pairs of a namespace, least recently used first."""
+        with self._lock:
+            return [(key, self._entries[(name, key)].value) for key in self._ns(name).keys]
+
+    def delete(self, name, key):
+        with self._lock:
+            if (name, key) in self._entries:
+                self._drop(self._ns(name), (name, key))
+            self._discard_spilled((name, key))
+            self._spilling.pop((name, key), None)
+
+    def clear(self, name=None):
+        with self._lock:
+            for full_key in [k for k in self._entries if name is None or k[0] == name]:
+                self._drop(self._ns(full_key[0]), full_key)
+            for full_key in [k for k in self._spilled if name is None or k[0] == name]:
+                self._discard_spilled(full_key)
+            for full_key in [k for k in self._spilling if name is None or k[0] == name]:
+                self._spilling.pop(full_key)
+
+    def stats(self) -> pd.DataFrame:
+        """Per-namespace counters and sizes."""
+        with self._lock:
+            rows = [{
+                "namespace": ns.name,
+                "entries": ns.entries,
+                "memory_mb": ns.bytes / 1024 ** 2,
+                "spilled": sum(1 for k in self._spilled if k[0] == ns.name),
+                "hits": ns.hits,
+                "misses": ns.misses,
+                "hit_rate": ns.hits / (ns.hits + ns.misses) if ns.hits + ns.misses else None,
+                "evictions": ns.evictions,
+                "expirations": ns.expirations,
+                "spills": ns.spills,
+                "spill_hits": ns.spill_hits,
+            } for ns in self._namespaces.values()]
+        return pd.DataFrame(rows)
+
+    @property
+    def memory_bytes(self):
+        return self._bytes
+
+    @property
+    def disk_bytes(self):
+        return self._disk_bytes
+
+    # Internals; callers hold the lock.
+
+    def _drop(self, ns, full_key):
+        entry = self._entries.pop(full_key)
+        ns.keys.pop(full_key[1], None)
+        ns.entries -= 1
+        ns.bytes -= entry.size
+        self._bytes -= entry.size
+        return entry
+
+    def _evict(self, full_key, spills):
+        ns = self._ns(full_key[0])
+        entry = self._drop(ns, full_key)
+        ns.evictions += 1
+        if ns.spill and entry.expires > time.monotonic():
+            # Still served from memory until the write below finishes
+            self._spilling[full_key] = entry
+            spills.append((full_key, entry))
+
+    def _spill_dir(self, full_key):
+        digest = hashlib.sha256(repr(full_key).encode()).hexdigest()
+        return os.path.join(self.spill_dir, full_key[0]), digest
+
+    def _spill(self, full_key, entry):
+        """Pickle an evicted entry to disk; called without the lock held."""
+        directory, prefix = self._spill_dir(full_key)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, path = tempfile.mkstemp(dir=directory, prefix=f"{prefix}-", suffix=".pkl")
+            with os.fdopen(fd, "wb") as fh:
+                pickle.dump(entry.value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(path)
+        except Exception:
+            with self._lock:
+                if self._spilling.get(full_key) is entry:
+                    del self._spilling[full_key]
+            return
+        with self._lock:
+            if self._spilling.get(full_key) is not entry:
+                # Set again or deleted while it was being written
+                _remove(path)
+                return
+            del self._spilling[full_key]
+            self._discard_spilled(full_key)
+            self._spilled[full_key] = (path, size, entry.expires)
+            self._disk_bytes += size
+            self._ns(full_key[0]).spills += 1
+            while self._disk_bytes > self.disk_budget and self._spilled:
+                self._discard_spilled(next(iter(self._spilled)))
+
+    def _unspill(self, spilled):
+        """Load and remove a spilled file; called without the lock held."""
+        path, _, expires = spilled
+        try:
+            if expires < time.monotonic():
+                return _MISSING
+            with open(path, "rb") as fh:
+                return pickle.load(fh)
+        except Exception:
+            return _MISSING
+        finally:
+            _remove(path)
+
+    def _discard_spilled(self, full_key, remove=True):
+        spilled = self._spilled.pop(full_key, None)
+        if spilled is None:
+            return
+        self._disk_bytes -= spilled[1]
+        if remove:
+            _remove(spilled[0])
+
+    def close(self):
+        """Drop everything and remove this process's spill directory."""
+        with self._lock:
+            self.clear()
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> Cache:
+    """The shared cache, created on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            import atexit
+
+            _cache = Cache()
+            atexit.register(_cache.close)
+        return _cache
+
+
+def namespace(name, max_entries=128, ttl=None, spill=False) -> str:
+    """Register a namespace on the shared cache and return its name."""
+    get_cache().namespace(name, max_entries, ttl, spill)
+    return name
@@ -1,43 +1,32 @@
-import requests
 import pandas as pd
 import streamlit as st
 from datetime import datetime
+from .holidays import get_calendar
+
+def calendar():
+    """The shared holiday calendar for the app's Calendarific key."""
+    return get_calendar(st.secrets.get("CALENDARIFIC_API_KEY"))
 
 def get_public_holidays(api_key: str, country: str, year: int):
     """Fetch public holidays for a given country and year using Calendarific API."""
-    url = f"https://calendarific.com/api/v2/holidays?api_key={api_key}&country={country}&year={year}"
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            holidays = response.json().get("response", {}).get("holidays", [])
-            return pd.DataFrame([{
-                "name": h["name"],
-                "date": h["date"]["iso"],
-                "type": ", ".join(h["type"])
-            } for h in holidays])
-        else:
-            return pd.DataFrame()
+        return get_calendar(api_key).holidays(country, year, wait=True)
     except Exception as e:
         return pd.DataFrame()
 
-@st.cache_data
 def get_holidays(country=None, year=None):
     """
-    Fetch public holidays for a given country and year using the Calendarific API.
+    Public holidays for a country and year as a DataFrame, served from the
+    local holiday store and fetched from Calendarific only when missing.
     """
-    country = country or st.session_state["ipinfo"].get("country", "US")
+    country = country or st.session_state.get("ipinfo", {}).get("country", "US")
     year = year or datetime.now().year
-    api_key = st.secrets.get("CALENDARIFIC_API_KEY")
-    if not api_key:
+    if not st.secrets.get("CALENDARIFIC_API_KEY"):
         st.error("Missing Calendarific API key in secrets.")
-        return []
+        return pd.DataFrame()
 
-    url = "https://calendarific.com/api/v2/holidays"
-    params = {"api_key": api_key, "country": country, "year": year}
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response.json().get("response", {}).get("holidays", [])
+        return calendar().holidays(country, year, wait=True)
     except Exception as e:
         st.error(f"Failed to fetch holidays: {e}")
-        return []
+        return pd.DataFrame()
@@ -1,4 +1,10 @@
 import streamlit as st
+from .fx import get_rate
 
-def convert_currency(value, to_currency):
-    # ...existing code...
\ No newline at end of file
+def convert_currency(value, to_currency, from_currency="USD"):
+    """Convert a single amount using the cached rate table."""
+    try:
+        return value * get_rate(from_currency, to_currency)
+    except Exception as e:
+        st.error(f"Error converting currency: {e}")
+        return value
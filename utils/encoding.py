@@ -0,0 +1,204 @@
+"""
+Feature encoders for ML Insights.
+
+``pd.get_dummies`` builds a dense one-hot frame that explodes on
+high-cardinality columns (customer IDs, product names). These encoders
+keep the matrix compact instead:
+
+- ``onehot_sparse``: one-hot into a scipy CSR matrix
+- ``ordinal``: one integer code per category
+- ``target``: cross-fitted target encoding (one column per feature)
+- ``hashing``: hashed one-hot for high-cardinality columns, sparse one-hot
+  for the rest
+- ``native``: pandas categoricals for HistGradientBoosting's native
+  categorical support
+
+Encoders are fitted on the training split only so target statistics do
+not leak into the test set. ``estimate_footprints`` predicts each
+option's memory use from column cardinalities before anything is built.
+"""
+import numpy as np
+import pandas as pd
+
+ENCODINGS = {
+    "onehot_sparse": "Sparse one-hot",
+    "ordinal": "Ordinal",
+    "target": "Target encoding",
+    "hashing": "Hashing (high-cardinality)",
+    "native": "Native categorical (HistGradientBoosting)",
+}
+HIGH_CARDINALITY = 50
+HASH_FEATURES = 2 ** 10
+NATIVE_MAX_CATEGORIES = 255
+
+
+def split_columns(X: pd.DataFrame):
+    """Numeric and categorical feature names."""
+    numeric = [c for c in X.columns if pd.api.types.is_numeric_dtype(X[c]) and not pd.api.types.is_bool_dtype(X[c])]
+    categorical = [c for c in X.columns if c not in numeric]
+    return numeric, categorical
+
+
+def _as_text(X):
+    # Encoders need one consistent type per column; missing values become their own category.
+    return pd.DataFrame(X).astype("string").fillna("<missing>").astype(object)
+
+
+class HashingEncoder:
+    """Hashes ``column=value`` tokens of every column into ``n_features`` sparse columns."""
+
+    def __init__(self, n_features=HASH_FEATURES):
+        self.n_features = n_features
+
+    def fit(self, X, y=None):
+        self.columns_ = list(pd.DataFrame(X).columns)
+        return self
+
+    def transform(self, X):
+        from sklearn.feature_extraction import FeatureHasher
+
+        X = _as_text(X)
+        tokens = [(f"{col}=" + X[col]).tolist() for col in X.columns]
+        return FeatureHasher(n_features=self.n_features, input_type="string").transform(zip(*tokens))
+
+    def fit_transform(self, X, y=None):
+        return self.fit(X, y).transform(X)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array([f"hash_{i}" for i in range(self.n_features)], dtype=object)
+
+    def get_params(self, deep=True):
+        return {"n_features": self.n_features}
+
+    def set_params(self, **params):
+        for name, value in params.items():
+            setattr(self, name, value)
+        return self
+
+
+class NativeCategoricalEncoder:
+    """
+    Turns categorical columns into pandas categoricals with the categories
+    seen in training; columns with more than 255 categories (HistGradientBoosting's
+    limit) become integer codes instead.
+    """
+
+    def fit(self, X, y=None):
+        numeric, categorical = split_columns(X)
+        self.feature_names_in_ = list(X.columns)
+        self.numeric_ = numeric
+        self.categories_ = {}
+        self.codes_ = {}
+        for col in categorical:
+            values = _as_text(X[[col]])[col]
+            categories = pd.Index(values.unique())
+            if len(categories) <= NATIVE_MAX_CATEGORIES:
+                self.categories_[col] = categories
+            else:
+                self.codes_[col] = categories
+        return self
+
+    def transform(self, X):
+        out = pd.DataFrame(index=X.index)
+        for col in self.feature_names_in_:
+            if col in self.categories_:
+                out[col] = pd.Categorical(_as_text(X[[col]])[col], categories=self.categories_[col])
+            elif col in self.codes_:
+                out[col] = self.codes_[col].get_indexer(_as_text(X[[col]])[col]).astype("int32")
+            else:
+                out[col] = X[col]
+        return out
+
+    def fit_transform(self, X, y=None):
+        return self.fit(X, y).transform(X)
+
+    def get_feature_names_out(self, input_features=None):
+        # Same order as the columns ``transform`` emits
+        return np.array(self.feature_names_in_, dtype=object)
+
+
+def build_encoder(X: pd.DataFrame, method="onehot_sparse", task="regression"):
+    """Unfitted encoder for the feature frame ``X``; ``task`` sets the target encoder's target type."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, OrdinalEncoder, TargetEncoder
+
+    if method == "native":
+        return NativeCategoricalEncoder()
+
+    numeric, categorical = split_columns(X)
+    text = FunctionTransformer(_as_text, feature_names_out="one-to-one")
+    onehot = OneHotEncoder(handle_unknown="ignore", sparse_output=True)
+    transformers = [("numeric", "passthrough", numeric)] if numeric else []
+
+    if method == "onehot_sparse":
+        transformers.append(("onehot", _chain(text, onehot), categorical))
+    elif method == "ordinal":
+        ordinal = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)
+        transformers.append(("ordinal", _chain(text, ordinal), categorical))
+    elif method == "target":
+        target_type = "continuous" if task == "regression" else "auto"
+        transformers.append(("target", _chain(text, TargetEncoder(target_type=target_type)), categorical))
+    elif method == "hashing":
+        high = [c for c in categorical if X[c].nunique() > HIGH_CARDINALITY]
+        low = [c for c in categorical if c not in high]
+        if low:
+            transformers.append(("onehot", _chain(text, onehot), low))
+        if high:
+            transformers.append(("hashing", HashingEncoder(), high))
+    else:
+        raise ValueError(f"Unknown encoding: {method}")
+
+    return ColumnTransformer(transformers, sparse_threshold=1.0 if method in ("onehot_sparse", "hashing") else 0.0,
+                             verbose_feature_names_out=False)
+
+
+def _chain(*steps):
+    from sklearn.pipeline import make_pipeline
+
+    return make_pipeline(*steps)
+
+
+def encode(X_train: pd.DataFrame, X_test: pd.DataFrame, y_train, method="onehot_sparse", task="regression"):
+    """Fit the encoder on the training split and transform both splits."""
+    encoder = build_encoder(X_train, method, task)
+    Xt_train = encoder.fit_transform(X_train, y_train)
+    Xt_test = encoder.transform(X_test)
+    return encoder, Xt_train, Xt_test, list(encoder.get_feature_names_out())
+
+
+def nbytes(matrix) -> int:
+    """Memory held by an encoded matrix (CSR, ndarray or DataFrame)."""
+    if hasattr(matrix, "indptr"):
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    if isinstance(matrix, pd.DataFrame):
+        return int(matrix.memory_usage(deep=True).sum())
+    return np.asarray(matrix).nbytes
+
+
+def estimate_footprints(X: pd.DataFrame, n_classes=1) -> pd.DataFrame:
+    """
+    Predicted encoded size of ``X`` for dense ``get_dummies`` and each
+    encoding, from row count and cardinalities only.
+    """
+    rows = len(X)
+    numeric, categorical = split_columns(X)
+    cardinality = X[categorical].nunique(dropna=False) if categorical else pd.Series(dtype=int)
+    high = cardinality[cardinality > HIGH_CARDINALITY]
+    csr_entry = 8 + 4  # float64 value + int32 column index
+    numeric_dense = rows * len(numeric) * 8
+
+    estimates = {
+        "dense_onehot": (len(numeric) + int(cardinality.sum()), numeric_dense + rows * int(cardinality.sum())),
+        "onehot_sparse": (len(numeric) + int(cardinality.sum()), rows * (len(numeric) + len(categorical)) * csr_entry),
+        "ordinal": (len(numeric) + len(categorical), rows * (len(numeric) + len(categorical)) * 8),
+        "target": (len(numeric) + len(categorical) * n_classes, rows * (len(numeric) + len(categorical) * n_classes) * 8),
+        "hashing": (
+            len(numeric) + int(cardinality.drop(high.index).sum()) + (HASH_FEATURES if len(high) else 0),
+            rows * (len(numeric) + len(categorical)) * csr_entry,
+        ),
+        "native": (len(numeric) + len(categorical), numeric_dense + rows * len(categorical) * 2),
+    }
+    labels = {"dense_onehot": "Dense one-hot (get_dummies)", **ENCODINGS}
+    return pd.DataFrame(
+        [{"encoding": labels[k], "columns": cols, "memory_mb": size / 1024 ** 2} for k, (cols, size) in estimates.items()]
+    )
@@ -0,0 +1,203 @@
+"""
+Model explanations for ML Insights.
+
+Permutation importance is computed on the raw feature columns (through the
+encoder + model pipeline) over a bounded sample of test rows, with the
+repeats spread across cores. Tree models also get mean absolute SHAP values
+from ``shap.TreeExplainer`` against a small background sample when the
+optional ``shap`` package is installed.
+
+Both steps are sized to fit a time budget: a short timing probe estimates
+the cost per row and the sample is shrunk until the estimate fits.
+Results are cached in memory and saved next to the model in ``models/``,
+so reruns and restarts do not recompute them.
+"""
+import importlib.util
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .background import JobRegistry
+from .perf import timed
+
+HAS_SHAP = importlib.util.find_spec("shap") is not None
+
+MAX_SAMPLE_ROWS = 2_000
+MIN_SAMPLE_ROWS = 50
+SHAP_MAX_ROWS = 500
+BACKGROUND_ROWS = 100
+PERMUTATION_REPEATS = 5
+DEFAULT_TIME_BUDGET = 5.0
+TOP_FEATURES = 20
+
+explanations = JobRegistry("explain", max_workers=1, max_results=16, namespace="explanations")
+
+
+@dataclass
+class Explanation:
+    permutation: pd.DataFrame
+    shap: pd.DataFrame = None
+    sample_rows: int = 0
+    shap_rows: int = 0
+    seconds: float = 0.0
+    notes: list = field(default_factory=list)
+
+
+def explanation_path(key, time_budget) -> str:
+    from .ml import MODELS_DIR
+
+    return os.path.join(MODELS_DIR, f"{key}.explain-{time_budget:g}s.joblib")
+
+
+def rows_within(budget, cost, max_rows, min_rows=MIN_SAMPLE_ROWS) -> int:
+    """
+    Largest sample (between ``min_rows`` and ``max_rows``) expected to
+    finish in ``budget`` seconds, for a ``cost`` of (fixed seconds, seconds per row).
+    """
+    overhead, per_row = cost
+    if per_row <= 0:
+        return max_rows
+    return int(max(min_rows, min(max_rows, (budget - overhead) / per_row)))
+
+
+def _head(X, rows):
+    return X.iloc[:rows] if hasattr(X, "iloc") else X[:rows]
+
+
+def _probe(fn, X, rows=MIN_SAMPLE_ROWS):
+    """Fixed and per-row seconds of ``fn``, from timing it on ``rows // 4`` and ``rows`` rows of ``X``."""
+    timings = []
+    for n in (max(1, rows // 4), rows):
+        started = time.perf_counter()
+        fn(_head(X, n))
+        timings.append((min(n, X.shape[0]), time.perf_counter() - started))
+    (n1, t1), (n2, t2) = timings
+    per_row = max(t2 - t1, 0.0) / (n2 - n1) if n2 > n1 else t2 / max(1, n2)
+    return max(t1 - per_row * n1, 0.0), per_row
+
+
+def _scaled(cost, factor):
+    return cost[0] * factor, cost[1] * factor
+
+
+def permutation_importance_frame(pipeline, X: pd.DataFrame, y, time_budget=DEFAULT_TIME_BUDGET,
+                                 repeats=PERMUTATION_REPEATS):
+    """
+    Mean and standard deviation of the score drop when each raw column is
+    shuffled, on as many rows as the budget allows. Returns the frame and
+    the number of rows used.
+    """
+    from sklearn.inspection import permutation_importance
+
+    # One scoring pass per column and repeat, plus the baseline.
+    passes = X.shape[1] * repeats + 1
+    cost = _scaled(_probe(pipeline.predict, X), passes)
+    rows = rows_within(time_budget, cost, min(len(X), MAX_SAMPLE_ROWS))
+    sample, y_sample = X.iloc[:rows], y.iloc[:rows]
+    result = permutation_importance(pipeline, sample, y_sample, n_repeats=repeats, n_jobs=-1, random_state=42)
+    frame = pd.DataFrame({
+        "feature": X.columns,
+        "importance": result.importances_mean,
+        "std": result.importances_std,
+    }).sort_values("importance", ascending=False, ignore_index=True)
+    return frame, rows
+
+
+def _mean_abs_shap(values) -> np.ndarray:
+    # Classifiers return one array per class (older shap) or a trailing class axis.
+    if isinstance(values, list):
+        return np.abs(np.stack(values)).mean(axis=(0, 1))
+    values = np.abs(np.asarray(values))
+    return values.mean(axis=(0, 2)) if values.ndim == 3 else values.mean(axis=0)
+
+
+def _dense(X):
+    return X.toarray() if hasattr(X, "toarray") else X
+
+
+def shap_frame(model, encoder, X: pd.DataFrame, feature_names, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Mean absolute tree-SHAP value per encoded feature, using
+    ``BACKGROUND_ROWS`` rows of ``X`` as the background distribution.
+    Returns the top ``TOP_FEATURES`` and the number of rows explained.
+    """
+    import shap
+
+    encoded = encoder.transform(X)
+    background = _dense(_head(encoded, BACKGROUND_ROWS))
+    explainer = shap.TreeExplainer(model, data=background, feature_perturbation="interventional")
+
+    def shap_values(rows):
+        return explainer.shap_values(_dense(rows), check_additivity=False)
+
+    rows = rows_within(time_budget, _probe(shap_values, encoded, rows=20), min(encoded.shape[0], SHAP_MAX_ROWS), min_rows=20)
+    frame = pd.DataFrame({"feature": feature_names, "mean_abs_shap": _mean_abs_shap(shap_values(_head(encoded, rows)))})
+    return frame.sort_values("mean_abs_shap", ascending=False, ignore_index=True).head(TOP_FEATURES), rows
+
+
+@timed("ml.explain")
+def explain(result, time_budget=DEFAULT_TIME_BUDGET) -> Explanation:
+    """
+    Explain a ``utils.ml.TrainingResult``. Permutation importance gets about
+    two thirds of ``time_budget`` and SHAP the rest.
+    """
+    if result.explain_X is None:
+        raise ValueError("This model was trained before explanations were available; retrain it to explain it.")
+    started = time.perf_counter()
+    notes = []
+    permutation, sample_rows = permutation_importance_frame(
+        result.pipeline, result.explain_X, result.explain_y, time_budget * 2 / 3
+    )
+
+    shap_values, shap_rows = None, 0
+    if not HAS_SHAP:
+        notes.append("Install the `shap` package for SHAP values.")
+    elif result.model_name == "sgd":
+        notes.append("SHAP values are only computed for tree models.")
+    else:
+        remaining = max(1.0, time_budget - (time.perf_counter() - started))
+        try:
+            shap_values, shap_rows = shap_frame(result.model, result.encoder, result.explain_X,
+                                                result.feature_names, remaining)
+        except Exception as e:
+            notes.append(f"SHAP values unavailable for this model: {e}")
+    return Explanation(permutation, shap_values, sample_rows, shap_rows, time.perf_counter() - started, notes)
+
+
+def load_explanation(key, time_budget):
+    import joblib
+
+    path = explanation_path(key, time_budget)
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception:
+        return None
+
+
+def _explain_and_save(key, result, time_budget):
+    import joblib
+
+    explanation = explain(result, time_budget)
+    path = explanation_path(key, time_budget)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    joblib.dump(explanation, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    return explanation
+
+
+def explain_async(key, result, time_budget=DEFAULT_TIME_BUDGET):
+    """
+    Future for the explanation of the model trained under ``key``; reuses a
+    running or finished job, then a saved explanation, before computing.
+    """
+    job_key = (key, time_budget)
+    if explanations.get(job_key) is None:
+        saved = load_explanation(key, time_budget)
+        if saved is not None:
+            explanations.put(job_key, saved)
+    return explanations.submit(job_key, _explain_and_save, key, result, time_budget)
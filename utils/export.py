@@ -0,0 +1,171 @@
+"""
+Streaming export to CSV, gzip CSV, Excel and Parquet.
+
+Exports are written chunk by chunk into a temporary file, so building a
+download never holds more than one chunk plus the writer's buffers in
+memory: CSV chunks are appended to the (optionally gzipped) file, Excel
+uses xlsxwriter's ``constant_memory`` mode that flushes each row to disk,
+and Parquet writes one row group per chunk with ``pyarrow.parquet.ParquetWriter``.
+Nothing is serialized until a format is actually requested.
+"""
+import gzip
+import os
+import tempfile
+import weakref
+
+import pandas as pd
+
+from .perf import timed
+
+FORMATS = {
+    "csv": ("CSV", ".csv", "text/csv"),
+    "csv.gz": ("CSV (gzip)", ".csv.gz", "application/gzip"),
+    "xlsx": ("Excel", ".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("Parquet", ".parquet", "application/vnd.apache.parquet"),
+}
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def convert_chunks(chunks, currency, column="Amount", from_currency="USD"):
+    """Add a ``Converted`` column with ``column`` in ``currency`` to each chunk."""
+    from .fx import convert_series
+
+    for chunk in chunks:
+        if currency != from_currency:
+            chunk = chunk.assign(Converted=convert_series(chunk[column], currency, from_currency))
+        yield chunk
+
+
+def _write_csv(chunks, path, compress=False):
+    opener = gzip.open if compress else open
+    with opener(path, "wt", newline="", encoding="utf-8") as fh:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(fh, index=False, header=i == 0)
+            yield len(chunk)
+
+
+def _excel_values(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Plain Python values with missing entries as ``None`` (blank cells)."""
+    chunk = chunk.copy()
+    for col in chunk.columns:
+        if isinstance(chunk[col].dtype, pd.DatetimeTZDtype):
+            chunk[col] = chunk[col].dt.tz_localize(None)
+    values = chunk.astype(object)
+    return values.where(chunk.notna(), None)
+
+
+def _write_excel(chunks, path, sheet_name="Sheet1"):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "nan_inf_to_errors": True,
+        "default_date_format": "yyyy-mm-dd hh:mm:ss",
+    })
+    try:
+        sheet = workbook.add_worksheet(sheet_name)
+        row = 0
+        for chunk in chunks:
+            if row == 0:
+                sheet.write_row(0, 0, [str(c) for c in chunk.columns])
+                row = 1
+            if row + len(chunk) > EXCEL_MAX_ROWS:
+                raise ValueError(f"Excel sheets hold at most {EXCEL_MAX_ROWS:,} rows; export as CSV or Parquet instead.")
+            for values in _excel_values(chunk).itertuples(index=False, name=None):
+                sheet.write_row(row, 0, values)
+                row += 1
+            yield len(chunk)
+    finally:
+        workbook.close()
+
+
+def _write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if writer is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                writer = pq.ParquetWriter(path, table.schema, compression="snappy")
+            else:
+                table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+            yield len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+WRITERS = {
+    "csv": _write_csv,
+    "csv.gz": lambda chunks, path: _write_csv(chunks, path, compress=True),
+    "xlsx": _write_excel,
+    "parquet": _write_parquet,
+}
+
+
+@timed("export.write")
+def write_export(chunks, fmt, path, total_rows=None, progress=None) -> int:
+    """
+    Write an iterable of DataFrame chunks to ``path`` in ``fmt`` (a key of
+    ``FORMATS``) and return the number of rows written. ``progress`` is
+    called with the fraction done when ``total_rows`` is known.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    written = 0
+    for rows in WRITERS[fmt](chunks, path):
+        written += rows
+        if progress and total_rows:
+            progress(min(written / total_rows, 1.0))
+    return written
+
+
+def export_to_tempfile(chunks, fmt, total_rows=None, progress=None) -> str:
+    """Write the export into a new temporary file and return its path; the caller removes it."""
+    fd, path = tempfile.mkstemp(prefix="bpd-export-", suffix=FORMATS[fmt][1])
+    os.close(fd)
+    try:
+        write_export(chunks, fmt, path, total_rows, progress)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+class PreparedExport:
+    """
+    An export file kept for download. The file is removed when the object
+    is garbage collected, e.g. with the session state holding it when the
+    session ends, or at interpreter exit.
+    """
+
+    def __init__(self, key, path):
+        self.key = key
+        self.path = path
+        self._finalizer = weakref.finalize(self, remove_export, path)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def reader(self):
+        """Callable returning the file's bytes, so a download is only read when requested."""
+        path = self.path
+
+        def read():
+            with open(path, "rb") as fh:
+                return fh.read()
+
+        return read
+
+    def remove(self):
+        self._finalizer()
+
+
+def remove_export(path):
+    try:
+        os.unlink(path)
+    except (FileNotFoundError, TypeError):
+        pass
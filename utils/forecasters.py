@@ -0,0 +1,251 @@
+"""
+Forecasting engines sharing one interface.
+
+Every engine takes a ``ds``/``y`` frame in ``fit`` and returns ``ds``,
+``yhat``, ``yhat_lower`` and ``yhat_upper`` from ``predict``. Besides
+Prophet there are three fast engines that fit in milliseconds on a series
+resampled to ``freq``: a seasonal naive baseline, additive Holt-Winters
+(parameters grid-searched in one vectorized NumPy pass) and a linear trend
+with seasonal dummies. ``make_forecaster("auto", ...)`` picks an engine
+from the series length and a time budget.
+"""
+import importlib.util
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FREQ = "MS"
+INTERVAL_WIDTH = 0.8
+SEASON_LENGTHS = {"D": 7, "B": 5, "W": 52, "M": 12, "Q": 4}
+
+
+def season_length(freq) -> int:
+    """Periods per seasonal cycle for a pandas frequency string."""
+    return SEASON_LENGTHS.get(freq.upper().lstrip("0123456789")[:1], 1)
+
+
+class Forecaster:
+    name = "base"
+
+    def __init__(self, freq=DEFAULT_FREQ, interval_width=INTERVAL_WIDTH):
+        self.freq = freq
+        self.season = season_length(freq)
+        self.z = NormalDist().inv_cdf((1 + interval_width) / 2)
+
+    def _prepare(self, df: pd.DataFrame):
+        series = df.set_index("ds")["y"].sort_index().resample(self.freq).sum()
+        self.history_ = series
+        return series.to_numpy(dtype=float)
+
+    def fit(self, df: pd.DataFrame):
+        raise NotImplementedError
+
+    def _forecast(self, periods):
+        """Point forecasts and standard errors for the next ``periods`` steps."""
+        raise NotImplementedError
+
+    def predict(self, periods, include_history=False) -> pd.DataFrame:
+        yhat, se = self._forecast(periods)
+        ds = pd.date_range(self.history_.index[-1], periods=periods + 1, freq=self.freq)[1:]
+        frame = pd.DataFrame({"ds": ds, "yhat": yhat, "yhat_lower": yhat - self.z * se, "yhat_upper": yhat + self.z * se})
+        if include_history:
+            spread = self.z * self.sigma_
+            fitted = pd.DataFrame({
+                "ds": self.history_.index,
+                "yhat": self.fitted_,
+                "yhat_lower": self.fitted_ - spread,
+                "yhat_upper": self.fitted_ + spread,
+            })
+            frame = pd.concat([fitted, frame], ignore_index=True)
+        return frame
+
+    def plot(self, forecast: pd.DataFrame):
+        import matplotlib.pyplot as plt
+
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.plot(self.history_.index, self.history_.values, "k.", label="Actual")
+        ax.plot(forecast["ds"], forecast["yhat"], color="#0072B2", label="Forecast")
+        ax.fill_between(forecast["ds"], forecast["yhat_lower"], forecast["yhat_upper"], color="#0072B2", alpha=0.2)
+        ax.set_xlabel("ds")
+        ax.set_ylabel("y")
+        ax.legend()
+        return fig
+
+
+class SeasonalNaiveForecaster(Forecaster):
+    """Repeats the last observed season (or the last value for short series)."""
+    name = "naive"
+
+    def fit(self, df):
+        y = self._prepare(df)
+        m = self.season if len(y) > self.season else 1
+        self.m_ = m
+        self.last_ = y[-m:]
+        fitted = np.concatenate([np.full(m, np.nan), y[:-m]])
+        residuals = (y - fitted)[m:]
+        self.sigma_ = float(np.std(residuals)) if len(residuals) > 1 else 0.0
+        self.fitted_ = np.where(np.isnan(fitted), y, fitted)
+        return self
+
+    def _forecast(self, periods):
+        h = np.arange(periods)
+        return self.last_[h % self.m_], self.sigma_ * np.sqrt(h // self.m_ + 1)
+
+
+class HoltWintersForecaster(Forecaster):
+    """
+    Additive Holt-Winters. Smoothing parameters are chosen by one-step SSE
+    over a grid, running the recursion for every grid point at once.
+    """
+    name = "holt_winters"
+    grid = np.array([0.05, 0.2, 0.4, 0.6, 0.8])
+
+    def fit(self, df):
+        y = self._prepare(df)
+        n, m = len(y), self.season
+        seasonal = n >= 2 * m and m > 1
+        if not seasonal:
+            m = 1
+        gammas = self.grid[:4] if seasonal else np.array([0.0])
+        alpha, beta, gamma = (a.ravel() for a in np.meshgrid(self.grid, self.grid[:4], gammas, indexing="ij"))
+        p = len(alpha)
+
+        if seasonal:
+            level = np.full(p, y[:m].mean())
+            trend = np.full(p, (y[m:2 * m].mean() - y[:m].mean()) / m)
+            season = np.tile(y[:m] - y[:m].mean(), (p, 1))
+        else:
+            level = np.full(p, y[0])
+            trend = np.full(p, y[1] - y[0] if n > 1 else 0.0)
+            season = np.zeros((p, 1))
+
+        sse = np.zeros(p)
+        fitted = np.empty((p, n))
+        for t in range(n):
+            s = season[:, t % m]
+            fitted[:, t] = level + trend + s
+            sse += (y[t] - fitted[:, t]) ** 2
+            new_level = alpha * (y[t] - s) + (1 - alpha) * (level + trend)
+            trend = beta * (new_level - level) + (1 - beta) * trend
+            season[:, t % m] = gamma * (y[t] - new_level) + (1 - gamma) * s
+            level = new_level
+
+        best = int(np.argmin(sse))
+        self.m_, self.n_ = m, n
+        self.level_, self.trend_, self.season_ = level[best], trend[best], season[best]
+        self.alpha_ = alpha[best]
+        self.fitted_ = fitted[best]
+        self.sigma_ = float(np.sqrt(sse[best] / max(n - 1, 1)))
+        return self
+
+    def _forecast(self, periods):
+        h = np.arange(1, periods + 1)
+        yhat = self.level_ + h * self.trend_ + self.season_[(self.n_ + h - 1) % self.m_]
+        se = self.sigma_ * np.sqrt(1 + (h - 1) * self.alpha_ ** 2)
+        return yhat, se
+
+
+class LinearTrendForecaster(Forecaster):
+    """Least-squares linear trend plus seasonal dummies."""
+    name = "linear"
+
+    def _design(self, t):
+        columns = [np.ones_like(t, dtype=float), t.astype(float)]
+        if self.m_ > 1:
+            columns += [(t % self.m_ == k).astype(float) for k in range(1, self.m_)]
+        return np.column_stack(columns)
+
+    def fit(self, df):
+        y = self._prepare(df)
+        n = len(y)
+        self.m_ = self.season if n >= self.season + 3 else 1
+        self.n_ = n
+        X = self._design(np.arange(n))
+        self.coef_, *_ = np.linalg.lstsq(X, y, rcond=None)
+        self.fitted_ = X @ self.coef_
+        dof = max(n - X.shape[1], 1)
+        self.sigma_ = float(np.sqrt(((y - self.fitted_) ** 2).sum() / dof))
+        return self
+
+    def _forecast(self, periods):
+        yhat = self._design(np.arange(self.n_, self.n_ + periods)) @ self.coef_
+        return yhat, np.full(periods, self.sigma_)
+
+
+class ProphetForecaster(Forecaster):
+    """Prophet behind the shared interface; fitted on the raw, unresampled rows."""
+    name = "prophet"
+
+    def __init__(self, freq=DEFAULT_FREQ, interval_width=INTERVAL_WIDTH, **params):
+        super().__init__(freq, interval_width)
+        self.params = params
+        self.interval_width = interval_width
+
+    def fit(self, df):
+        from prophet import Prophet
+
+        self.model_ = Prophet(interval_width=self.interval_width, **self.params)
+        self.model_.fit(df)
+        self.history_ = df.set_index("ds")["y"]
+        return self
+
+    def predict(self, periods, include_history=False):
+        future = self.model_.make_future_dataframe(periods=periods, freq=self.freq, include_history=include_history)
+        return self.model_.predict(future)
+
+    def plot(self, forecast):
+        return self.model_.plot(forecast)
+
+    def plot_components(self, forecast):
+        return self.model_.plot_components(forecast)
+
+
+ENGINES = {
+    "naive": SeasonalNaiveForecaster,
+    "holt_winters": HoltWintersForecaster,
+    "linear": LinearTrendForecaster,
+    "prophet": ProphetForecaster,
+}
+
+
+def prophet_available() -> bool:
+    return importlib.util.find_spec("prophet") is not None
+
+
+def estimated_prophet_seconds(n_points) -> float:
+    """Rough Prophet fit cost: fixed cmdstan overhead plus a per-row term."""
+    return 1.5 + n_points / 20_000
+
+
+def count_periods(df: pd.DataFrame, freq=DEFAULT_FREQ) -> int:
+    """Number of ``freq`` periods spanned by a ``ds``/``y`` frame."""
+    return len(df.set_index("ds").resample(freq).size())
+
+
+def select_engine(n_periods, n_rows=None, freq=DEFAULT_FREQ, time_budget=2.0) -> str:
+    """
+    Pick the most capable engine for a series of ``n_periods`` resampled
+    periods (``n_rows`` raw rows) that should fit within ``time_budget`` seconds.
+    """
+    m = season_length(freq)
+    n_rows = n_rows or n_periods
+    if prophet_available() and n_periods >= 2 * m and estimated_prophet_seconds(n_rows) <= time_budget:
+        return "prophet"
+    if n_periods >= 2 * m or (m == 1 and n_periods >= 3):
+        return "holt_winters"
+    if n_periods >= 3:
+        return "linear"
+    return "naive"
+
+
+def make_forecaster(engine, df=None, freq=DEFAULT_FREQ, time_budget=2.0, prophet_params=None):
+    """
+    Build a forecaster by name. ``"auto"`` runs ``select_engine`` on the
+    length of ``df`` with ``time_budget`` seconds.
+    """
+    if engine == "auto":
+        engine = select_engine(count_periods(df, freq), len(df), freq, time_budget)
+    if engine == "prophet":
+        return ProphetForecaster(freq, **(prophet_params or {}))
+    return ENGINES[engine](freq)
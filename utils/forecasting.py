@@ -0,0 +1,148 @@
+"""
+Forecast model fitting with a cross-session model cache.
+
+Fitted models (any engine from ``forecasters``) are keyed on a fingerprint
+of the ``ds``/``y`` frame, the selected columns, the engine and its
+hyperparameters, and are fitted on a background worker pool. Changing only the horizon reuses the fitted model and just
+re-runs ``make_future_dataframe``/``predict``.
+
+``forecast_many`` fits one model per group of a frame across a process
+pool, falling back to a seasonal naive baseline for series too short to fit.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .background import PROCESS_CONTEXT, JobRegistry
+from .cache import get_cache, namespace
+from .forecasters import DEFAULT_FREQ, SeasonalNaiveForecaster, make_forecaster
+from .perf import timed
+from .store import hash_frame
+
+MAX_PREDICTIONS = 32
+MIN_FIT_POINTS = 10
+FORECAST_COLUMNS = ["ds", "yhat", "yhat_lower", "yhat_upper"]
+
+models = JobRegistry("forecast", max_workers=2, max_results=16, namespace="forecast_models")
+PREDICTIONS = namespace("forecasts", max_entries=MAX_PREDICTIONS, spill=True)
+
+
+def model_key(df: pd.DataFrame, date_col, value_col, engine, params, freq=DEFAULT_FREQ, time_budget=2.0,
+              holidays=None) -> tuple:
+    """Cache key for a model fitted on ``df`` (columns ``ds``/``y``) and optional Prophet ``holidays``."""
+    holidays_key = None if holidays is None else hash_frame(holidays)
+    return (hash_frame(df[["ds", "y"]]), date_col, value_col, engine, freq, time_budget,
+            tuple(sorted(params.items())), holidays_key)
+
+
+@timed("forecast.fit")
+def fit_model(df: pd.DataFrame, engine="prophet", params=None, freq=DEFAULT_FREQ, time_budget=2.0, holidays=None):
+    """
+    Fit a forecaster; ``params`` are Prophet hyperparameters and ``holidays``
+    a ``Prophet(holidays=...)`` frame, both ignored by the fast engines.
+    """
+    if holidays is not None:
+        params = {**(params or {}), "holidays": holidays}
+    forecaster = make_forecaster(engine, df, freq, time_budget, prophet_params=params)
+    return forecaster.fit(df)
+
+
+def fit_model_async(key, df: pd.DataFrame, engine="prophet", params=None, freq=DEFAULT_FREQ, time_budget=2.0,
+                    holidays=None):
+    """Future for the fitted model, shared with any session fitting the same key."""
+    return models.submit(key, fit_model, df, engine, params, freq, time_budget, holidays)
+
+
+def predict(key, model, periods) -> pd.DataFrame:
+    """History fit plus ``periods`` steps ahead, cached per model and horizon."""
+    return get_cache().get_or_set(PREDICTIONS, (key, periods), timed("forecast.predict")(lambda: model.predict(periods, include_history=True)))
+
+
+def baseline_forecast(df: pd.DataFrame, periods, freq=DEFAULT_FREQ) -> pd.DataFrame:
+    return SeasonalNaiveForecaster(freq).fit(df).predict(periods)
+
+
+def _fit_series(group, df, periods, freq, engine, params, min_points):
+    """Forecast one series; runs in a worker process."""
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    started = time.perf_counter()
+    error, forecast = None, None
+    try:
+        if len(df) < min_points:
+            engine = "baseline"
+            forecast = baseline_forecast(df, periods, freq)
+        else:
+            model = fit_model(df, engine, params, freq)
+            engine = model.name
+            forecast = model.predict(periods)[FORECAST_COLUMNS]
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        try:
+            engine = "baseline"
+            forecast = baseline_forecast(df, periods, freq)
+        except Exception:
+            engine, forecast = "failed", None
+    stats = {
+        "series": group,
+        "engine": engine,
+        "points": len(df),
+        "fit_seconds": time.perf_counter() - started,
+        "error": error,
+    }
+    return group, forecast, stats
+
+
+def forecast_many(data: pd.DataFrame, group_col, date_col, value_col, periods, freq=DEFAULT_FREQ,
+                  engine="prophet", params=None, min_points=MIN_FIT_POINTS, max_workers=None, progress=None):
+    """
+    Forecast every ``group_col`` series of ``data`` in parallel with ``engine``
+    (``"auto"`` picks one per series).
+
+    Returns the combined forecast (with a ``group_col`` column) and a frame
+    of per-series engine, point count, fit time and error. ``progress`` is
+    called with the fraction of series finished.
+    """
+    frame = pd.DataFrame({
+        group_col: data[group_col],
+        "ds": pd.to_datetime(data[date_col], errors="coerce"),
+        "y": pd.to_numeric(data[value_col], errors="coerce"),
+    }).dropna()
+    # One row per date keeps the payload shipped to each worker small.
+    series = frame.groupby([group_col, "ds"], observed=True, sort=True)["y"].sum().reset_index()
+    groups = [(name, g[["ds", "y"]].reset_index(drop=True)) for name, g in series.groupby(group_col, observed=True)]
+
+    forecasts, stats = [], []
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), mp_context=PROCESS_CONTEXT) as executor:
+        futures = [
+            executor.submit(_fit_series, name, g, periods, freq, engine, params or {}, min_points)
+            for name, g in groups
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            group, forecast, row = future.result()
+            if forecast is not None:
+                forecasts.append(forecast.assign(**{group_col: group}))
+            stats.append(row)
+            if progress:
+                progress(done / len(futures))
+
+    combined = pd.concat(forecasts, ignore_index=True) if forecasts else pd.DataFrame(columns=[group_col, *FORECAST_COLUMNS])
+    combined = combined[[group_col, *FORECAST_COLUMNS]]
+    return combined, pd.DataFrame(stats, columns=["series", "engine", "points", "fit_seconds", "error"])
+
+
+def _forecast_loaded(load, *args, **kwargs):
+    return forecast_many(load(), *args, **kwargs)
+
+
+def forecast_many_async(key, load, group_col, date_col, value_col, periods, freq=DEFAULT_FREQ, engine="prophet",
+                        params=None):
+    """
+    Future for ``forecast_many`` on the frame returned by ``load``, run on
+    the forecast worker and shared by every session asking for ``key``;
+    reports the fraction of series finished.
+    """
+    return models.submit(key, _forecast_loaded, load, group_col, date_col, value_col, periods, freq, engine, params,
+                         progress=lambda fraction: models.set_progress(key, fraction))
@@ -0,0 +1,274 @@
+"""
+Historical exchange rates and as-of conversion.
+
+Daily rates against USD are kept in a local SQLite store
+(``data/fx/rates.sqlite``) that is filled in bulk from the
+exchangerate.host time-series endpoint, up to ``MAX_SPAN_DAYS`` days per
+request. The store only grows at its ends, so a range is downloaded once.
+It is filled by a background job: pages render with what is stored (or
+the current rate) and pick up new history on a later rerun. Amounts are
+converted at the rate of their own date with one ``pd.merge_asof`` over
+the rows: each row takes the latest rate on or before its date, which
+also covers weekends and forecast dates past the last published rate.
+Cross rates are derived from the USD table. When no history is available
+(not downloaded yet, offline, or a file/static rate source is in use)
+conversion falls back to the current rate from ``utils.fx``.
+"""
+import logging
+import os
+import sqlite3
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from .background import JobRegistry
+from .cache import get_cache, namespace
+from .fx import DEFAULT_BASE, RATE_TTL_SECONDS, HttpRateSource, get_rate, get_rate_source
+
+DATA_DIR = os.environ.get("BPD_DATA_DIR", "data")
+DB_PATH = os.path.join(DATA_DIR, "fx", "rates.sqlite")
+STORE_BASE = "USD"
+MAX_SPAN_DAYS = 365
+HISTORY = namespace("fx_history", max_entries=64, ttl=RATE_TTL_SECONDS)
+fills = JobRegistry("fx_history", max_workers=1, max_results=32, namespace="fx_history_fills")
+
+logger = logging.getLogger(__name__)
+
+
+class HttpHistorySource:
+    """Daily rates from api.exchangerate.host, one request per span of days."""
+
+    url = "https://api.exchangerate.host/timeseries"
+
+    def fetch(self, base, start, end) -> pd.DataFrame:
+        from .http import get_json
+
+        payload = get_json(self.url, params={"base": base, "start_date": start.isoformat(), "end_date": end.isoformat()})
+        rows = [(day, code.upper(), float(rate)) for day, rates in (payload.get("rates") or {}).items()
+                for code, rate in rates.items()]
+        if not rows:
+            raise ValueError(f"No exchange rates returned for {start} to {end}")
+        frame = pd.DataFrame(rows, columns=["date", "currency", "rate"])
+        frame["date"] = pd.to_datetime(frame["date"])
+        return frame
+
+
+class RateStore:
+    """Daily rates per ``STORE_BASE`` in SQLite, plus the day ranges already fetched."""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rates (date TEXT, currency TEXT, rate REAL, PRIMARY KEY (date, currency))"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS fetched (start TEXT, end TEXT)")
+        return self._conn
+
+    def put(self, frame: pd.DataFrame, start, end):
+        """Insert a ``date``/``currency``/``rate`` frame and record ``start``..``end`` as fetched."""
+        rows = zip(pd.to_datetime(frame["date"]).dt.strftime("%Y-%m-%d"), frame["currency"].str.upper(),
+                   frame["rate"].astype(float))
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("INSERT OR REPLACE INTO rates (date, currency, rate) VALUES (?, ?, ?)", rows)
+            conn.execute("INSERT INTO fetched (start, end) VALUES (?, ?)", (start.isoformat(), end.isoformat()))
+            conn.commit()
+
+    def coverage(self):
+        """``(first, last)`` fetched day, or ``None`` if nothing was fetched yet."""
+        with self._lock:
+            first, last = self._connect().execute("SELECT MIN(start), MAX(end) FROM fetched").fetchone()
+        if first is None:
+            return None
+        return pd.Timestamp(first).date(), pd.Timestamp(last).date()
+
+    def history(self, currencies, end=None) -> pd.DataFrame:
+        """Rates of ``currencies`` on every stored day up to ``end``, one column per currency."""
+        currencies = sorted({c.upper() for c in currencies} - {STORE_BASE})
+        sql = f"SELECT date, currency, rate FROM rates WHERE currency IN ({', '.join('?' * len(currencies))})"
+        params = list(currencies)
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(end.isoformat())
+        with self._lock:
+            frame = pd.read_sql_query(sql, self._connect(), params=params) if currencies else None
+        if frame is None or frame.empty:
+            return pd.DataFrame(columns=currencies, index=pd.DatetimeIndex([], name="date"), dtype=float)
+        table = frame.pivot(index="date", columns="currency", values="rate")
+        table.index = pd.to_datetime(table.index)
+        return table.reindex(columns=currencies)
+
+    def clear(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM rates")
+            conn.execute("DELETE FROM fetched")
+            conn.commit()
+
+
+_store = None
+
+
+def get_rate_store() -> RateStore:
+    global _store
+    if _store is None:
+        _store = RateStore()
+    return _store
+
+
+def history_source():
+    """History comes from the live API only; file and static rate sources have no history."""
+    return HttpHistorySource() if isinstance(get_rate_source(), HttpRateSource) else None
+
+
+def _spans(start, end, backwards=False):
+    days = timedelta(days=MAX_SPAN_DAYS - 1)
+    if backwards:
+        while end >= start:
+            yield max(start, end - days), end
+            end = end - days - timedelta(days=1)
+    else:
+        while start <= end:
+            yield start, min(end, start + days)
+            start = start + days + timedelta(days=1)
+
+
+def ensure_history(start, end, source=None, store=None):
+    """
+    Fetch the days between ``start`` and ``end`` (dates, capped at today)
+    the store doesn't have yet. Gaps are filled outwards from the stored
+    range and stop at the first failed span, so the stored range stays
+    contiguous. Returns the stored range afterwards.
+    """
+    source = source or history_source()
+    store = store or get_rate_store()
+    end = min(end, pd.Timestamp.today().date())
+    if source is None or start > end:
+        return store.coverage()
+    coverage = store.coverage()
+    if coverage is None:
+        gaps = [(start, end, True)]
+    else:
+        first, last = coverage
+        gaps = [(start, first - timedelta(days=1), True), (last + timedelta(days=1), end, False)]
+    for gap_start, gap_end, backwards in gaps:
+        for span_start, span_end in _spans(gap_start, gap_end, backwards):
+            store.put(source.fetch(STORE_BASE, span_start, span_end), span_start, span_end)
+    return store.coverage()
+
+
+def _fill(start, end):
+    try:
+        return ensure_history(start, end) or ()
+    except Exception as e:
+        logger.warning("Historical exchange rates unavailable: %s", e)
+        return get_rate_store().coverage() or ()
+
+
+def history_version():
+    """Stored day range; changes whenever a download lands, so it can key caches of converted output."""
+    return get_rate_store().coverage()
+
+
+def request_history(start, end):
+    """
+    Fill the store for ``start``..``end`` in the background and return the
+    job's future. Jobs are shared across sessions and retried once a day
+    after a failure; reruns never wait on the API.
+    """
+    if history_source() is None:
+        return None
+    start, end = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+    today = pd.Timestamp.today().date()
+    return fills.submit((start, min(end, today), today), _fill, start, end)
+
+
+def history_pending(start, end) -> bool:
+    """Whether rates for ``start``..``end`` are still being downloaded."""
+    future = request_history(start, end)
+    return future is not None and not future.done()
+
+
+def rate_history(from_currency, to_currency, start, end) -> pd.DataFrame:
+    """
+    ``date``/``rate`` frame of units of ``to_currency`` per ``from_currency``
+    on every stored day up to ``end``; empty until the store has rates for
+    the pair. Missing days are requested in the background.
+    """
+    start, end = pd.Timestamp(start).date(), pd.Timestamp(end).date()
+    if from_currency.upper() == to_currency.upper():
+        return pd.DataFrame({"date": pd.to_datetime([start]).astype("datetime64[ns]"), "rate": [1.0]})
+    request_history(start, end)
+
+    def load():
+        table = get_rate_store().history([from_currency, to_currency], end)
+        table[STORE_BASE] = 1.0
+        rates = (table[to_currency.upper()] / table[from_currency.upper()]).dropna()
+        return pd.DataFrame({"date": rates.index.astype("datetime64[ns]"), "rate": rates.to_numpy(dtype=float)})
+
+    # The stored range is part of the key, so a finished download is picked up on the next rerun
+    store = get_rate_store()
+    key = (get_rate_source().key, from_currency.upper(), to_currency.upper(), start, end, store.coverage())
+    return get_cache().get_or_set(HISTORY, key, load)
+
+
+def rate_on(day, from_currency, to_currency) -> tuple:
+    """
+    ``(rate, rate date)`` in effect on ``day``. Without a stored rate on or
+    before ``day`` this is the current rate and the date is ``None``.
+    """
+    if from_currency.upper() == to_currency.upper():
+        return 1.0, None
+    rates = rate_history(from_currency, to_currency, day, day)
+    known = rates[rates["date"] <= pd.Timestamp(day)]
+    if known.empty:
+        return get_rate(from_currency, to_currency), None
+    return float(known["rate"].iloc[-1]), known["date"].iloc[-1].date()
+
+
+def asof_rates(dates, to_currency, from_currency=DEFAULT_BASE) -> np.ndarray:
+    """
+    Rate for each of ``dates``: the latest on or before it, found with one
+    ``merge_asof``. Dates before the first known rate take that rate;
+    unparseable dates take the most recent one. Without any stored history
+    every date takes the current rate.
+    """
+    dates = pd.Series(pd.to_datetime(dates, errors="coerce")).reset_index(drop=True)
+    factor = np.ones(len(dates))
+    if from_currency.upper() == to_currency.upper():
+        return factor
+    rates = rate_history(from_currency, to_currency, dates.min(), dates.max()) if dates.notna().any() else None
+    if rates is None or rates.empty:
+        factor[:] = get_rate(from_currency, to_currency)
+        return factor
+    rows = pd.DataFrame({"date": dates.astype("datetime64[ns]"), "row": np.arange(len(dates))}).dropna()
+    joined = pd.merge_asof(rows.sort_values("date"), rates, on="date", direction="backward")
+    factor[:] = rates["rate"].iloc[-1]
+    factor[joined["row"].to_numpy()] = joined["rate"].fillna(rates["rate"].iloc[0]).to_numpy()
+    return factor
+
+
+def convert_asof(df: pd.DataFrame, date_col, columns, to_currency, from_currency=DEFAULT_BASE) -> pd.DataFrame:
+    """Return a copy of ``df`` with ``columns`` converted at the rate of each row's ``date_col``."""
+    columns = list(columns)
+    df = df.copy()
+    if from_currency.upper() != to_currency.upper():
+        factor = asof_rates(df[date_col], to_currency, from_currency)
+        df[columns] = df[columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float) * factor[:, None]
+    return df
+
+
+def convert_series_asof(series: pd.Series, to_currency, from_currency=DEFAULT_BASE) -> pd.Series:
+    """Convert a date-indexed Series at the rate of each index date."""
+    if from_currency.upper() == to_currency.upper():
+        return series
+    return series * asof_rates(series.index, to_currency, from_currency)
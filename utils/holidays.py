@@ -0,0 +1,226 @@
+"""
+Public holiday calendar backed by Calendarific.
+
+Every (country, year) is fetched at most once per ``REFRESH_SECONDS`` and
+stored in SQLite (``data/holidays.sqlite``), so holidays survive restarts;
+lookups are also kept in the ``holidays`` namespace of the shared cache.
+``prefetch`` fills a range of countries and years concurrently, and
+``request`` runs it as a background job, so reruns never wait on the API.
+``holidays`` returns one typed frame of what is stored for any set of
+countries and years, and ``to_prophet_holidays`` reshapes it into the
+``holiday``/``ds`` frame ``Prophet(holidays=...)`` expects.
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from .background import JobRegistry
+from .cache import get_cache, namespace
+
+DATA_DIR = os.environ.get("BPD_DATA_DIR", "data")
+HOLIDAYS_PATH = os.path.join(DATA_DIR, "holidays.sqlite")
+CALENDARIFIC_URL = "https://calendarific.com/api/v2/holidays"
+REFRESH_SECONDS = 30 * 24 * 3600
+MAX_WORKERS = 8
+NATIONAL_TYPES = ("National holiday",)
+COLUMNS = ["date", "name", "type", "country", "year"]
+NAMESPACE = namespace("holidays", max_entries=64, ttl=3600)
+fetches = JobRegistry("holidays", max_workers=1, max_results=64, namespace="holiday_fetches")
+
+
+def normalize_country(country) -> str:
+    """ISO 3166 alpha-2 code for a country name or code (``"United States"``, ``"USA"``, ``"us"`` -> ``"US"``)."""
+    text = str(country).strip()
+    try:
+        import pycountry
+
+        return pycountry.countries.lookup(text).alpha_2
+    except (ImportError, LookupError):
+        return text.upper()
+
+
+def parse_holidays(payload: dict, country, year) -> pd.DataFrame:
+    """Calendarific response body -> frame with ``COLUMNS``."""
+    rows = [
+        {
+            # ISO dates may carry a time for observances (e.g. DST changes); keep the day.
+            "date": h["date"]["iso"][:10],
+            "name": h["name"],
+            "type": ", ".join(h.get("type") or []),
+            "country": country,
+            "year": year,
+        }
+        for h in (payload.get("response") or {}).get("holidays", [])
+    ]
+    return _typed(pd.DataFrame(rows, columns=COLUMNS))
+
+
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    return df.astype({"name": "string", "type": "category", "country": "category", "year": "int16"}).assign(
+        date=pd.to_datetime(df["date"], errors="coerce")
+    )
+
+
+def _as_lists(countries, years):
+    """Accept a single country or year wherever lists are expected."""
+    return [countries] if isinstance(countries, str) else countries, [years] if isinstance(years, int) else years
+
+
+class HolidayCalendar:
+    def __init__(self, api_key, path=HOLIDAYS_PATH, max_workers=MAX_WORKERS, refresh_seconds=REFRESH_SECONDS):
+        self.api_key = api_key
+        self.path = path
+        self.max_workers = max_workers
+        self.refresh_seconds = refresh_seconds
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS holidays (country TEXT, year INTEGER, date TEXT, name TEXT, type TEXT);"
+                "CREATE INDEX IF NOT EXISTS holidays_country_year ON holidays (country, year);"
+                "CREATE TABLE IF NOT EXISTS fetched (country TEXT, year INTEGER, fetched_at REAL,"
+                " PRIMARY KEY (country, year));"
+            )
+        return self._conn
+
+    def missing(self, countries, years) -> list:
+        """(country, year) pairs not stored yet or older than ``refresh_seconds``."""
+        countries, years = _as_lists(countries, years)
+        wanted = {(normalize_country(c), int(y)) for c in countries for y in years}
+        cutoff = time.time() - self.refresh_seconds
+        with self._lock:
+            fresh = set(self._connect().execute(
+                "SELECT country, year FROM fetched WHERE fetched_at >= ?", (cutoff,)
+            ).fetchall())
+        return sorted(wanted - fresh)
+
+    def fetch(self, country, year) -> pd.DataFrame:
+        """One (country, year) from the API, stored before returning."""
+        from .http import get_json
+
+        if not self.api_key:
+            raise ValueError("Missing Calendarific API key")
+        # ttl=0: the calendar store is the cache, so skip the HTTP response cache.
+        payload = get_json(CALENDARIFIC_URL, params={"api_key": self.api_key, "country": country, "year": year}, ttl=0)
+        frame = parse_holidays(payload, country, year)
+        rows = frame.assign(date=frame["date"].dt.strftime("%Y-%m-%d"))[["country", "year", "date", "name", "type"]]
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM holidays WHERE country = ? AND year = ?", (country, year))
+            conn.executemany("INSERT INTO holidays VALUES (?, ?, ?, ?, ?)",
+                             rows.astype(object).itertuples(index=False, name=None))
+            conn.execute("INSERT OR REPLACE INTO fetched VALUES (?, ?, ?)", (country, year, time.time()))
+            conn.commit()
+        get_cache().clear(NAMESPACE)
+        return frame
+
+    def prefetch(self, countries, years) -> dict:
+        """
+        Fetch every missing (country, year) concurrently. Returns the errors
+        by pair; pairs that fail are retried on the next call.
+        """
+        pairs = self.missing(countries, years)
+        if not pairs:
+            return {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pairs)), thread_name_prefix="bpd-holidays") as pool:
+            futures = {pool.submit(self.fetch, country, year): (country, year) for country, year in pairs}
+            for future, pair in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    errors[pair] = e
+        return errors
+
+    def request(self, countries, years):
+        """
+        Prefetch the missing pairs in the background and return the job's
+        future (resolving to ``prefetch``'s errors), or ``None`` when
+        everything is stored. Jobs are shared across sessions and retried
+        once a day after a failure.
+        """
+        pairs = self.missing(countries, years)
+        if not pairs:
+            return None
+        key = (self.path, self.api_key, tuple(pairs), time.strftime("%Y-%m-%d"))
+        return fetches.submit(key, self.prefetch, sorted({c for c, _ in pairs}), sorted({y for _, y in pairs}))
+
+    def pending(self, countries, years) -> bool:
+        """Whether holidays for ``countries`` and ``years`` are still being downloaded."""
+        future = self.request(countries, years)
+        return future is not None and not future.done()
+
+    def stored(self, countries, years) -> pd.DataFrame:
+        """Holidays already in the store, without touching the API."""
+        countries, years = _as_lists(countries, years)
+        codes = tuple(sorted({normalize_country(c) for c in countries}))
+        years = tuple(sorted({int(y) for y in years}))
+        return get_cache().get_or_set(NAMESPACE, (self.path, codes, years), lambda: self._read(codes, years))
+
+    def _read(self, codes, years) -> pd.DataFrame:
+        query = (
+            f"SELECT date, name, type, country, year FROM holidays WHERE country IN ({','.join('?' * len(codes))})"
+            f" AND year IN ({','.join('?' * len(years))}) ORDER BY date, name"
+        )
+        with self._lock:
+            rows = self._connect().execute(query, (*codes, *years)).fetchall()
+        return _typed(pd.DataFrame(rows, columns=COLUMNS))
+
+    def holidays(self, countries, years, types=None, wait=False) -> pd.DataFrame:
+        """
+        Typed holidays (``date``, ``name``, ``type``, ``country``, ``year``)
+        stored for every country and year; missing ones are requested in the
+        background, or waited for with ``wait``. ``types`` keeps holidays
+        whose Calendarific type contains one of the given labels. Raises if
+        nothing is stored and fetching failed.
+        """
+        countries, years = _as_lists(countries, years)
+        future = self.request(countries, years)
+        if future is not None and wait:
+            future.result()
+        errors = future.result() if future is not None and future.done() else {}
+        frame = self.stored(countries, years)
+        if frame.empty and errors:
+            raise next(iter(errors.values()))
+        if types:
+            frame = frame[frame["type"].astype(str).str.contains("|".join(types), regex=True)]
+        return frame.reset_index(drop=True)
+
+
+def to_prophet_holidays(holidays: pd.DataFrame, lower_window=0, upper_window=0) -> pd.DataFrame:
+    """``holiday``/``ds``/window frame for ``Prophet(holidays=...)``, one row per holiday date."""
+    return pd.DataFrame({
+        "holiday": holidays["name"].astype(str),
+        "ds": holidays["date"],
+        "lower_window": lower_window,
+        "upper_window": upper_window,
+    }).dropna(subset=["ds"]).drop_duplicates(["holiday", "ds"]).reset_index(drop=True)
+
+
+_calendars = {}
+_calendars_lock = threading.Lock()
+
+
+def get_calendar(api_key) -> HolidayCalendar:
+    """Shared calendar for ``api_key``."""
+    with _calendars_lock:
+        if api_key not in _calendars:
+            _calendars[api_key] = HolidayCalendar(api_key)
+        return _calendars[api_key]
+
+
+def history_years(dates: pd.Series, periods=0, freq="MS") -> range:
+    """Years covered by ``dates`` plus a ``periods``-long horizon after the last one."""
+    dates = pd.to_datetime(dates, errors="coerce").dropna()
+    if dates.empty:
+        return range(0)
+    end = dates.max() + pd.tseries.frequencies.to_offset(freq) * periods
+    return range(dates.min().year, end.year + 1)
@@ -0,0 +1,268 @@
+"""
+Shared HTTP client for the third-party APIs (IPInfo, Calendarific, exchangerate.host).
+
+One pooled ``requests.Session`` with bounded timeouts, retries with
+exponential backoff and full jitter, a per-host circuit breaker and a
+SQLite response cache with per-endpoint TTLs that survives restarts.
+Every request is also bounded by an overall deadline, so a slow API
+cannot hold a Streamlit rerun for more than a few seconds; once a host's
+breaker opens, calls fail fast (or serve a stale cached response).
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .perf import timed
+
+DATA_DIR = os.environ.get("BPD_DATA_DIR", "data")
+CACHE_PATH = os.path.join(DATA_DIR, "cache", "http.sqlite")
+
+DEFAULT_TIMEOUT = (3.05, 6)
+DEFAULT_DEADLINE = 10.0
+DEFAULT_RETRIES = 2
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Seconds a successful response is served from the cache, per host.
+ENDPOINT_TTLS = {
+    "calendarific.com": 7 * 24 * 3600,
+    "api.exchangerate.host": 3600,
+    "ipinfo.io": 24 * 3600,
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a host's circuit breaker is open and nothing is cached."""
+
+
+class RetryableStatusError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures; half-opens after
+    ``reset_after`` seconds, when a single probe request is let through and
+    everything else keeps failing fast until the probe succeeds or fails.
+    """
+
+    def __init__(self, failure_threshold=5, reset_after=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.reset_after:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                # A failed probe re-opens the breaker for another cool-down
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class ResponseCache:
+    """JSON responses in SQLite, keyed by a hash of the request."""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires REAL, body TEXT)"
+            )
+        return self._conn
+
+    def get(self, key, allow_stale=False):
+        with self._lock:
+            row = self._connect().execute("SELECT expires, body FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[0] < time.time() and not allow_stale):
+            return None
+        return json.loads(row[1])
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, expires, body) VALUES (?, ?, ?)",
+                (key, time.time() + ttl, json.dumps(value)),
+            )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute("DELETE FROM responses")
+            self._connect().commit()
+
+
+def endpoint_ttl(url) -> float:
+    host = urlsplit(url).hostname or ""
+    return next((ttl for suffix, ttl in ENDPOINT_TTLS.items() if host.endswith(suffix)), 0)
+
+
+def request_key(url, params=None) -> str:
+    """Cache key; hashed so API keys in the query string are not stored in clear text."""
+    payload = json.dumps([url, sorted((params or {}).items())], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def backoff_delay(attempt, base=0.25, cap=4.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def clamp_timeout(timeout, remaining):
+    """``timeout`` (seconds or a ``(connect, read)`` pair) limited to the ``remaining`` deadline."""
+    if isinstance(timeout, tuple):
+        return tuple(min(t, remaining) for t in timeout)
+    return min(timeout, remaining)
+
+
+class ApiClient:
+    def __init__(self, cache=None, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 deadline=DEFAULT_DEADLINE, pool_size=20):
+        self.cache = cache or ResponseCache()
+        self.timeout = timeout
+        self.retries = retries
+        self.deadline = deadline
+        self.pool_size = pool_size
+        self._session = None
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def breaker(self, url) -> CircuitBreaker:
+        host = urlsplit(url).hostname or ""
+        with self._lock:
+            return self._breakers.setdefault(host, CircuitBreaker())
+
+    def get_json(self, url, params=None, headers=None, ttl=None, retries=None, timeout=None):
+        """
+        GET ``url`` and return the decoded JSON body.
+
+        Fresh cached responses are returned without a request (``ttl``
+        defaults to the endpoint's entry in ``ENDPOINT_TTLS``; 0 disables
+        caching). Connection errors, timeouts and 429/5xx responses are
+        retried with backoff until ``retries`` or the client deadline runs
+        out; other HTTP errors raise immediately. If every attempt fails, a
+        stale cached response is returned when there is one.
+        """
+        import requests
+
+        ttl = endpoint_ttl(url) if ttl is None else ttl
+        retries = self.retries if retries is None else retries
+        key = request_key(url, params)
+        if ttl:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            stale = self.cache.get(key, allow_stale=True)
+            if stale is not None:
+                return stale
+            raise CircuitOpenError(f"{urlsplit(url).hostname} is unavailable; retrying later")
+
+        started = time.monotonic()
+        last_error = requests.Timeout(f"{urlsplit(url).hostname} did not answer within {self.deadline:.0f}s")
+        for attempt in range(retries + 1):
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            try:
+                with timed(f"http.{urlsplit(url).hostname}"):
+                    response = self.session.get(url, params=params, headers=headers,
+                                                timeout=clamp_timeout(timeout or self.timeout, remaining))
+                if response.status_code in RETRY_STATUSES:
+                    raise RetryableStatusError(f"{response.status_code} from {urlsplit(url).hostname}")
+                response.raise_for_status()
+                data = response.json()
+            except (requests.ConnectionError, requests.Timeout, RetryableStatusError) as e:
+                breaker.record_failure()
+                last_error = e
+                delay = backoff_delay(attempt)
+                if attempt == retries or time.monotonic() - started + delay > self.deadline:
+                    break
+                time.sleep(delay)
+                continue
+            except Exception:
+                # The host answered (e.g. a 4xx or a malformed body): it is up, so a half-open probe succeeded
+                breaker.record_success()
+                raise
+            breaker.record_success()
+            if ttl:
+                self.cache.set(key, data, ttl)
+            return data
+
+        stale = self.cache.get(key, allow_stale=True)
+        if stale is not None:
+            return stale
+        raise last_error
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> ApiClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = ApiClient()
+        return _client
+
+
+def get_json(url, params=None, headers=None, ttl=None, retries=None, timeout=None):
+    """``ApiClient.get_json`` on the shared client."""
+    return get_client().get_json(url, params=params, headers=headers, ttl=ttl, retries=retries, timeout=timeout)
+
+
+def fetch_api_with_retry(url, headers=None, retries=3):
+    """
+    Attempts to call the given API URL up to `retries` times.
+    Returns JSON response or None on failure.
+    """
+    try:
+        return get_json(url, headers=headers, retries=retries - 1)
+    except Exception:
+        return None
@@ -0,0 +1,214 @@
+"""
+Chunked CSV ingestion with compact dtype inference.
+
+A sample of the file decides what each column should become (downcast
+integers, categoricals for low-cardinality text, parsed datetimes) and the
+rest of the file is streamed in chunks that are converted as they arrive,
+so the object-heavy frame a plain ``pd.read_csv`` produces never exists.
+Values later in the file that don't fit the sampled type (text in a
+numeric or date column) are read as missing; they are counted per column
+and reported rather than dropped silently.
+"""
+import importlib.util
+import io
+import logging
+import os
+import warnings
+from collections import Counter
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .perf import timed
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+CHUNK_ROWS = 100_000
+SAMPLE_ROWS = 10_000
+CATEGORY_RATIO = 0.5
+DATE_HINTS = ("date", "time", "day", "month", "period")
+# pandas' default missing-value markers, passed to both engines so they agree on what is null
+NULL_VALUES = ("", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>",
+               "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null")
+
+logger = logging.getLogger(__name__)
+
+
+def memory_usage_mb(df: pd.DataFrame) -> float:
+    """Deep in-memory size of a frame in megabytes."""
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def _looks_like_dates(name, values: pd.Series) -> bool:
+    if values.empty:
+        return False
+    if not any(hint in str(name).lower() for hint in DATE_HINTS):
+        # Cheap pre-check so free text is not run through the date parser.
+        if not values.astype(str).str.match(r"^\s*\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}").mean() > 0.9:
+            return False
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(values, errors="coerce")
+    return parsed.notna().mean() > 0.9
+
+
+def infer_dtypes(sample: pd.DataFrame, category_ratio=CATEGORY_RATIO) -> dict:
+    """
+    Map each column of ``sample`` to one of ``"integer"``, ``"float"``,
+    ``"bool"``, ``"datetime"``, ``"category"`` or ``"string"``.
+    """
+    kinds = {}
+    for col in sample.columns:
+        series = sample[col]
+        values = series.dropna()
+        if pd.api.types.is_bool_dtype(series):
+            kinds[col] = "bool"
+        elif pd.api.types.is_integer_dtype(series):
+            kinds[col] = "integer"
+        elif pd.api.types.is_float_dtype(series):
+            integral = not values.empty and (values % 1 == 0).all()
+            kinds[col] = "integer" if integral else "float"
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            kinds[col] = "datetime"
+        elif _looks_like_dates(col, values):
+            kinds[col] = "datetime"
+        elif not values.empty and values.nunique() <= max(1, len(values) * category_ratio):
+            kinds[col] = "category"
+        else:
+            kinds[col] = "string"
+    return kinds
+
+
+def _convert_chunk(chunk: pd.DataFrame, kinds: dict, downcast_floats=False, coerced=None) -> pd.DataFrame:
+    """Convert ``chunk`` to ``kinds``, adding values that became missing to the ``coerced`` counts."""
+    for col, kind in kinds.items():
+        if col not in chunk:
+            continue
+        series = raw = chunk[col]
+        if kind == "integer":
+            series = pd.to_numeric(series, errors="coerce")
+            if series.notna().all():
+                series = pd.to_numeric(series, downcast="integer")
+        elif kind == "float":
+            series = pd.to_numeric(series, errors="coerce", downcast="float" if downcast_floats else None)
+        elif kind == "datetime":
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                series = pd.to_datetime(series, errors="coerce")
+        elif kind == "category":
+            series = series.astype("category")
+        elif kind == "string" and HAS_PYARROW:
+            series = series.astype("string[pyarrow]")
+        if coerced is not None and kind in ("integer", "float", "datetime"):
+            lost = int((raw.notna() & series.isna()).sum())
+            if lost:
+                coerced[col] += lost
+        chunk[col] = series
+    return chunk
+
+
+def _combine(chunks, kinds) -> pd.DataFrame:
+    if not chunks:
+        return pd.DataFrame(columns=list(kinds))
+    for col, kind in kinds.items():
+        if kind != "category" or len(chunks) == 1:
+            continue
+        categories = union_categoricals([c[col] for c in chunks], ignore_order=True).categories
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _open(source):
+    """Return a binary handle, whether it must be closed, and its total size."""
+    if isinstance(source, (str, os.PathLike)):
+        handle = open(source, "rb")
+        return handle, True, os.fstat(handle.fileno()).st_size
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    source.seek(0, io.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    return source, False, size
+
+
+def _read_with_pandas(handle, kinds, chunksize, downcast_floats, report, coerced):
+    chunks = []
+    for chunk in pd.read_csv(handle, chunksize=chunksize, low_memory=False, na_values=NULL_VALUES,
+                             keep_default_na=False):
+        chunks.append(_convert_chunk(chunk, kinds, downcast_floats, coerced))
+        report(handle.tell())
+    return chunks
+
+
+def _read_with_pyarrow(handle, kinds, chunksize, downcast_floats, report, coerced):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    # Numeric columns stay numeric in Arrow; everything else is read as text
+    # and converted the same way as the pandas engine.
+    column_types = {
+        col: pa.float64() if kind in ("integer", "float") else pa.string()
+        for col, kind in kinds.items() if kind != "bool"
+    }
+    reader = pa_csv.open_csv(
+        handle,
+        read_options=pa_csv.ReadOptions(block_size=8 << 20),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, null_values=list(NULL_VALUES),
+                                              strings_can_be_null=True),
+    )
+    chunks = []
+    for batch in reader:
+        for start in range(0, batch.num_rows, chunksize):
+            piece = batch.slice(start, chunksize).to_pandas()
+            chunks.append(_convert_chunk(piece, kinds, downcast_floats, coerced))
+        report(handle.tell())
+    return chunks
+
+
+@timed("ingest.read_csv")
+def read_csv_chunked(source, chunksize=CHUNK_ROWS, sample_rows=SAMPLE_ROWS, engine="c",
+                     downcast_floats=False, progress=None, coerced=None) -> pd.DataFrame:
+    """
+    Read a CSV path, bytes or file-like object into a compact DataFrame.
+
+    ``engine`` is ``"c"`` or ``"pyarrow"``; the pyarrow reader falls back to
+    the C parser if it rejects the file. ``progress`` is called with the
+    fraction of the input consumed so far. Floats are only downcast to
+    float32 when ``downcast_floats`` is set, since that loses precision on
+    large monetary amounts. Values that don't fit a column's sampled type
+    are read as missing and logged; pass a dict as ``coerced`` to receive
+    their count per column.
+    """
+    handle, owned, size = _open(source)
+    try:
+        kinds = infer_dtypes(pd.read_csv(handle, nrows=sample_rows, na_values=NULL_VALUES, keep_default_na=False))
+
+        def report(position):
+            if progress and size:
+                progress(min(position / size, 1.0))
+
+        counts = Counter()
+        if engine == "pyarrow" and HAS_PYARROW:
+            import pyarrow as pa
+
+            handle.seek(0)
+            try:
+                chunks = _read_with_pyarrow(handle, kinds, chunksize, downcast_floats, report, counts)
+            except pa.ArrowInvalid:
+                handle.seek(0)
+                counts.clear()
+                chunks = _read_with_pandas(handle, kinds, chunksize, downcast_floats, report, counts)
+        else:
+            handle.seek(0)
+            chunks = _read_with_pandas(handle, kinds, chunksize, downcast_floats, report, counts)
+        report(size)
+        if counts:
+            logger.warning("Values read as missing because they don't fit the sampled column type: %s",
+                           dict(counts))
+        if coerced is not None:
+            coerced.update(counts)
+        return _combine(chunks, kinds)
+    finally:
+        if owned:
+            handle.close()
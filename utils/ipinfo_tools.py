@@ -1,9 +1,39 @@
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="bpd-ipinfo")
+
+def fetch_ip_info(token):
+    """Fetch IP information using the IPInfo API. Makes no Streamlit calls, so it is safe off the script thread."""
+    from .http import get_json
+
+    return get_json("https://ipinfo.io", params={"token": token})
 
 def get_ip_info():
-    # Function to get IP information
-    pass
+    try:
+        return fetch_ip_info(st.secrets["ipinfo_token"])
+    except Exception as e:
+        st.error(f"Error fetching IP info: {e}")
+        return {}
+
+def get_ip_info_async():
+    """Start the IP lookup on a background thread and return its future."""
+    try:
+        token = st.secrets["ipinfo_token"]
+    except Exception:
+        token = None
+    return _executor.submit(fetch_ip_info, token)
 
-def fetch_ip_info():
-    # Function to fetch IP information
-    pass
\ No newline at end of file
+def ensure_ip_info():
+    """
+    Kick off the IP lookup once per session without blocking the first render,
+    and move the result into st.session_state["ipinfo"] once it has arrived.
+    """
+    if "ipinfo" not in st.session_state:
+        st.session_state["ipinfo"] = {}
+        st.session_state["ipinfo_future"] = get_ip_info_async()
+    future = st.session_state.get("ipinfo_future")
+    if future is not None and future.done():
+        st.session_state["ipinfo"] = {} if future.exception() else future.result()
+        del st.session_state["ipinfo_future"]
+    return st.session_state["ipinfo"]
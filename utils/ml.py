@@ -0,0 +1,331 @@
+"""
+ML Insights training with caching and persistence.
+
+Encoded feature matrices are cached per (dataset, target, features,
+encoding) and trained models per (dataset, target, features, encoding,
+params). Features are encoded with one of the compact encoders in
+``utils.encoding``, fitted on the training split only. Training runs on a
+background worker using every core and grows the model in stages so the
+page can show real progress. Finished models are saved to ``models/`` and
+reloaded from there on the next visit.
+
+Three model families are available: random forests, histogram gradient
+boosting and linear SGD models. Above ``LARGE_DATA_ROWS`` rows the
+"auto" choice switches to one of the two scalable families and trains on a
+stratified subsample of ``SAMPLE_ROWS`` rows.
+"""
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .background import JobRegistry
+from .cache import get_cache, namespace
+from .perf import measure_peak, timed
+
+MODELS_DIR = os.environ.get("BPD_MODELS_DIR", "models")
+MAX_ENCODED = 8
+TRAINING_STAGES = 5
+DEFAULT_ENCODING = "onehot_sparse"
+LARGE_DATA_ROWS = 200_000
+SAMPLE_ROWS = 100_000
+
+MODEL_FAMILIES = {
+    "random_forest": "Random Forest",
+    "hist_gradient_boosting": "Gradient Boosting (histogram)",
+    "sgd": "Linear (SGD)",
+}
+# Parameter grown with warm_start to train in stages; SGD fits in one go.
+STAGE_PARAMS = {"random_forest": "n_estimators", "hist_gradient_boosting": "max_iter"}
+SPARSE_ENCODINGS = {"onehot_sparse", "hashing"}
+
+training = JobRegistry("ml", max_workers=1, max_results=8, namespace="ml_models", spill=True)
+ENCODED = namespace("ml_features", max_entries=MAX_ENCODED, spill=True)
+FOOTPRINTS = namespace("ml_footprints", max_entries=MAX_ENCODED)
+
+
+@dataclass
+class EncodedFeatures:
+    encoder: object
+    X_train: object
+    X_test: object
+    y_train: pd.Series
+    y_test: pd.Series
+    feature_names: list
+    task: str
+    X_test_raw: pd.DataFrame = None
+
+
+@dataclass
+class TrainingResult:
+    model: object
+    task: str
+    feature_names: list
+    y_test: pd.Series
+    predictions: object
+    encoder: object = None
+    encoding: str = DEFAULT_ENCODING
+    encoded_mb: float = 0.0
+    model_name: str = "random_forest"
+    sample_rows: int = None
+    # Raw test rows kept for explanations (see utils.explain)
+    explain_X: pd.DataFrame = None
+    explain_y: pd.Series = None
+
+    @property
+    def is_classification(self):
+        return self.task == "classification"
+
+    @property
+    def pipeline(self):
+        """Encoder and model as one sklearn ``Pipeline`` that accepts the raw feature columns."""
+        from sklearn.pipeline import Pipeline
+
+        return Pipeline([("encode", self.encoder), ("model", self.model)])
+
+
+def training_key(dataset_key, target, features, params, encoding=DEFAULT_ENCODING,
+                 model_name="random_forest", sample_rows=None) -> str:
+    payload = json.dumps(
+        [dataset_key, target, sorted(features), sorted(params.items()), encoding, model_name, sample_rows], default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def compatible_models(encoding):
+    """
+    Model families that accept ``encoding``'s output: gradient boosting
+    needs dense input, and only gradient boosting understands native
+    categoricals.
+    """
+    if encoding == "native":
+        return ["hist_gradient_boosting"]
+    if encoding in SPARSE_ENCODINGS:
+        return ["random_forest", "sgd"]
+    return list(MODEL_FAMILIES)
+
+
+def select_model(n_rows, encoding=DEFAULT_ENCODING):
+    """Random forest for small data; the fastest compatible family above ``LARGE_DATA_ROWS``."""
+    candidates = compatible_models(encoding)
+    if n_rows <= LARGE_DATA_ROWS and "random_forest" in candidates:
+        return "random_forest"
+    return "hist_gradient_boosting" if "hist_gradient_boosting" in candidates else "sgd"
+
+
+def sample_size(n_rows):
+    """Rows to train on in large-data mode, or ``None`` to use everything."""
+    return SAMPLE_ROWS if n_rows > LARGE_DATA_ROWS else None
+
+
+def is_classification_target(y: pd.Series) -> bool:
+    return y.nunique() <= 10 and pd.api.types.is_integer_dtype(y)
+
+
+def _task(y: pd.Series) -> str:
+    return "classification" if is_classification_target(y) else "regression"
+
+
+def _target(data: pd.DataFrame, target) -> pd.Series:
+    return pd.to_numeric(data[target], errors="coerce").dropna()
+
+
+def stratified_sample(X: pd.DataFrame, y: pd.Series, n_rows, task):
+    """
+    ``n_rows`` rows of ``X``/``y``, stratified on the target for
+    classification so rare classes keep their share.
+    """
+    from sklearn.model_selection import train_test_split
+
+    if n_rows is None or len(y) <= n_rows:
+        return X, y
+    counts = y.value_counts()
+    stratify = y if task == "classification" and counts.min() >= 2 and len(counts) <= n_rows else None
+    X, _, y, _ = train_test_split(X, y, train_size=n_rows, stratify=stratify, random_state=42)
+    return X, y
+
+
+@timed("ml.encode")
+def encode_features(dataset_key, data: pd.DataFrame, target, features, encoding=DEFAULT_ENCODING,
+                    sample_rows=None) -> EncodedFeatures:
+    """
+    Optionally subsample to ``sample_rows``, split off 20% for testing, then
+    encode ``features`` with ``encoding`` fitted on the training rows only.
+    Rows with a missing target are dropped. Cached per dataset, target,
+    features, encoding and sample size.
+    """
+    from sklearn.model_selection import train_test_split
+
+    from .encoding import encode
+
+    key = (dataset_key, target, tuple(features), encoding, sample_rows)
+    cached = get_cache().get(ENCODED, key)
+    if cached is not None:
+        return cached
+    y = _target(data, target)
+    task = _task(y)
+    X, y = stratified_sample(data.loc[y.index, features], y, sample_rows, task)
+    stratify = y if task == "classification" and y.value_counts().min() >= 2 else None
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, stratify=stratify, random_state=42)
+    encoder, Xt_train, Xt_test, names = encode(X_train, X_test, y_train, encoding, task)
+    return get_cache().set(ENCODED, key, EncodedFeatures(encoder, Xt_train, Xt_test, y_train, y_test, names, task, X_test))
+
+
+def encoding_footprints(dataset_key, load, target, features) -> pd.DataFrame:
+    """Estimated memory of each encoding for these features (see ``encoding.estimate_footprints``), cached."""
+    from .encoding import estimate_footprints
+
+    def estimate():
+        data = load()
+        y = _target(data, target)
+        n_classes = y.nunique() if _task(y) == "classification" and y.nunique() > 2 else 1
+        return estimate_footprints(data.loc[y.index, features], n_classes=n_classes)
+
+    return get_cache().get_or_set(FOOTPRINTS, (dataset_key, target, tuple(features)), estimate)
+
+
+def model_path(key) -> str:
+    return os.path.join(MODELS_DIR, f"{key}.joblib")
+
+
+def load_model(key):
+    """Previously trained result for ``key`` from ``models/``, or ``None``."""
+    import joblib
+
+    path = model_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return joblib.load(path)
+    except Exception:
+        return None
+
+
+def save_model(key, result: TrainingResult):
+    import joblib
+
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    tmp_path = f"{model_path(key)}.tmp"
+    joblib.dump(result, tmp_path)
+    os.replace(tmp_path, model_path(key))
+
+
+def make_model(task, model_name, params):
+    """
+    Unfitted estimator for ``model_name``. Forests and gradient boosting use
+    ``warm_start`` so they can be grown in stages; ``n_estimators`` maps to
+    boosting iterations. The SGD model scales its inputs first and ignores
+    the tree parameters.
+    """
+    classification = task == "classification"
+    if model_name == "hist_gradient_boosting":
+        from sklearn.ensemble import HistGradientBoostingClassifier, HistGradientBoostingRegressor
+
+        estimator = HistGradientBoostingClassifier if classification else HistGradientBoostingRegressor
+        return estimator(max_iter=params.get("n_estimators", 100), max_depth=params.get("max_depth"),
+                         categorical_features="from_dtype", warm_start=True, random_state=42)
+    if model_name == "sgd":
+        from sklearn.linear_model import SGDClassifier, SGDRegressor
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        sgd = SGDClassifier(loss="log_loss", random_state=42) if classification else SGDRegressor(random_state=42)
+        # with_mean=False keeps sparse encodings sparse.
+        return make_pipeline(StandardScaler(with_mean=False), sgd)
+    if model_name == "random_forest":
+        from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+        estimator = RandomForestClassifier if classification else RandomForestRegressor
+        return estimator(**params, warm_start=True, n_jobs=-1, random_state=42)
+    raise ValueError(f"Unknown model: {model_name}")
+
+
+def _fit_staged(key, model, model_name, X, y):
+    stage_param = STAGE_PARAMS.get(model_name)
+    if stage_param is None:
+        model.fit(X, y)
+        training.set_progress(key, 1.0)
+        return model
+    # Grow the model in stages; with warm_start each stage only fits the new trees.
+    total = getattr(model, stage_param)
+    for stage in range(1, TRAINING_STAGES + 1):
+        setattr(model, stage_param, max(1, round(total * stage / TRAINING_STAGES)))
+        model.fit(X, y)
+        training.set_progress(key, stage / TRAINING_STAGES)
+    return model
+
+
+@timed("ml.train")
+def train(key, dataset_key, load, target, features, params, encoding=DEFAULT_ENCODING,
+          model_name="random_forest", sample_rows=None) -> TrainingResult:
+    """Load, split, encode and fit the model, reporting progress per stage."""
+    from .encoding import nbytes
+    from .explain import MAX_SAMPLE_ROWS
+
+    if model_name not in compatible_models(encoding):
+        raise ValueError(f"{MODEL_FAMILIES[model_name]} cannot be trained on {encoding} features")
+    encoded = encode_features(dataset_key, load(), target, features, encoding, sample_rows)
+    model = _fit_staged(key, make_model(encoded.task, model_name, params), model_name, encoded.X_train, encoded.y_train)
+
+    result = TrainingResult(
+        model, encoded.task, encoded.feature_names, encoded.y_test, model.predict(encoded.X_test),
+        encoder=encoded.encoder, encoding=encoding,
+        encoded_mb=(nbytes(encoded.X_train) + nbytes(encoded.X_test)) / 1024 ** 2,
+        model_name=model_name, sample_rows=sample_rows,
+        explain_X=encoded.X_test_raw.iloc[:MAX_SAMPLE_ROWS], explain_y=encoded.y_test.iloc[:MAX_SAMPLE_ROWS],
+    )
+    save_model(key, result)
+    return result
+
+
+def compare_models(dataset_key, load, target, features, params, encoding=DEFAULT_ENCODING,
+                   sample_rows=None) -> pd.DataFrame:
+    """
+    Fit every compatible model family on the same encoded split and report
+    fit/predict seconds, peak traced memory and test score (accuracy or R²).
+    Memory is measured with ``tracemalloc``, so it covers Python and NumPy
+    allocations made while fitting.
+    """
+    encoded = encode_features(dataset_key, load(), target, features, encoding, sample_rows)
+    rows = []
+    for model_name in compatible_models(encoding):
+        model = make_model(encoded.task, model_name, params)
+        # Scoped measurement: doesn't reset the peak Settings shows or stop tracing a user turned on
+        with measure_peak() as memory:
+            started = time.perf_counter()
+            model.fit(encoded.X_train, encoded.y_train)
+            fit_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            model.predict(encoded.X_test)
+            predict_seconds = time.perf_counter() - started
+        rows.append({
+            "model": MODEL_FAMILIES[model_name],
+            "fit_seconds": fit_seconds,
+            "predict_seconds": predict_seconds,
+            "peak_memory_mb": memory["peak_bytes"] / 1024 ** 2,
+            "score": model.score(encoded.X_test, encoded.y_test),
+        })
+    return pd.DataFrame(rows)
+
+
+def compare_async(key, dataset_key, load, target, features, params, encoding=DEFAULT_ENCODING, sample_rows=None):
+    """``compare_models`` on the training worker, deduplicated under ``compare:<key>``."""
+    return training.submit(f"compare:{key}", compare_models, dataset_key, load, target, features, params,
+                           encoding, sample_rows)
+
+
+def train_async(key, dataset_key, load, target, features, params, encoding=DEFAULT_ENCODING,
+                model_name="random_forest", sample_rows=None):
+    """
+    Future for the trained result. Reuses a running or finished job, then a
+    model saved in ``models/``, and only trains when neither exists.
+    """
+    if training.get(key) is None:
+        saved = load_model(key)
+        if saved is not None:
+            training.put(key, saved)
+    return training.submit(key, train, key, dataset_key, load, target, features, params, encoding,
+                           model_name, sample_rows)
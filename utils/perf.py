@@ -0,0 +1,243 @@
+"""
+Lightweight performance instrumentation.
+
+``timed("stage")`` works as a context manager or decorator and records the
+wall time of a named stage (``dashboard.aggregates``, ``http.ipinfo.io``,
+``forecast.fit``, ...) into a process-wide registry: a Prometheus-style
+cumulative histogram plus a bounded deque of recent samples for
+percentiles. ``tracemalloc`` snapshots are available on demand once
+tracing is started (from Settings, or ``BPD_TRACEMALLOC=1`` at startup).
+Everything can be exported as JSON or Prometheus text.
+"""
+import json
+import math
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import ContextDecorator, contextmanager
+
+import numpy as np
+import pandas as pd
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+MAX_SAMPLES = 1024
+METRIC = "bpd_stage_seconds"
+
+
+class StageStats:
+    def __init__(self, buckets=BUCKETS, max_samples=MAX_SAMPLES):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, seconds, error=False):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.errors += bool(error)
+        self.samples.append(seconds)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) pairs, as Prometheus expects."""
+        running, out = 0, []
+        for bound, count in zip(self.buckets, self.bucket_counts):
+            running += count
+            out.append((bound, running))
+        return out
+
+    def percentiles(self, qs=(50, 95, 99)):
+        if not self.samples:
+            return [None] * len(qs)
+        return list(np.percentile(np.fromiter(self.samples, float), qs))
+
+
+class Registry:
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.observe(seconds, error)
+
+    def timed(self, stage):
+        return _Timer(self, stage)
+
+    def stats(self) -> pd.DataFrame:
+        """One row per stage: count, errors, total/mean/p50/p95/p99/max seconds."""
+        with self._lock:
+            rows = []
+            for stage, s in sorted(self._stages.items()):
+                p50, p95, p99 = s.percentiles()
+                rows.append({
+                    "stage": stage, "count": s.count, "errors": s.errors, "total_s": s.total,
+                    "mean_s": s.total / s.count, "p50_s": p50, "p95_s": p95, "p99_s": p99, "max_s": s.max,
+                })
+        return pd.DataFrame(rows, columns=["stage", "count", "errors", "total_s", "mean_s", "p50_s", "p95_s",
+                                           "p99_s", "max_s"])
+
+    def histogram(self, stage) -> pd.Series:
+        """Observations per bucket (non-cumulative) for one stage, indexed by upper bound label."""
+        with self._lock:
+            s = self._stages.get(stage)
+            if s is None:
+                return pd.Series(dtype="int64")
+            labels = [f"≤{b:g}s" if b != math.inf else "> 30s" for b in s.buckets]
+            return pd.Series(s.bucket_counts, index=labels)
+
+    def to_json(self) -> str:
+        payload = {
+            "stages": self.stats().to_dict(orient="records"),
+            "memory": traced_memory(),
+        }
+        with self._lock:
+            for row in payload["stages"]:
+                row["buckets"] = {("+Inf" if b == math.inf else b): c for b, c in self._stages[row["stage"]].cumulative()}
+        return json.dumps(payload, indent=2, default=str)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition of the per-stage histograms."""
+        lines = [f"# HELP {METRIC} Wall time of instrumented stages.", f"# TYPE {METRIC} histogram"]
+        with self._lock:
+            for stage, s in sorted(self._stages.items()):
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                for bound, count in s.cumulative():
+                    le = "+Inf" if bound == math.inf else f"{bound:g}"
+                    lines.append(f'{METRIC}_bucket{{stage="{label}",le="{le}"}} {count}')
+                lines.append(f'{METRIC}_sum{{stage="{label}"}} {s.total:.6f}')
+                lines.append(f'{METRIC}_count{{stage="{label}"}} {s.count}')
+        memory = traced_memory()
+        if memory:
+            lines += ["# TYPE bpd_traced_memory_bytes gauge",
+                      f"bpd_traced_memory_bytes {memory['current_bytes']}",
+                      "# TYPE bpd_traced_memory_peak_bytes gauge",
+                      f"bpd_traced_memory_peak_bytes {memory['peak_bytes']}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+        self._starts = threading.local()
+
+    def __enter__(self):
+        self._starts.__dict__.setdefault("stack", []).append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        started = self._starts.stack.pop()
+        # st.stop()/st.rerun() raise BaseException subclasses; those are control flow, not errors.
+        self.registry.observe(self.stage, time.perf_counter() - started, error=isinstance(exc, Exception))
+        return False
+
+
+registry = Registry()
+
+
+def timed(stage):
+    """Time a block or function under ``stage`` in the shared registry."""
+    return registry.timed(stage)
+
+
+# tracemalloc is process-global and shared by user tracing (Settings) and scoped
+# measurements. A measurement resets the tracer's peak, so the peak seen so far is
+# first folded into every other reader's running peak.
+_tracing_lock = threading.Lock()
+_user_peak = None  # [highest peak] while user tracing is on, else None
+_scopes = []  # one [highest peak] per running measure_peak()
+
+
+def _fold_peak():
+    peak = tracemalloc.get_traced_memory()[1]
+    for cell in filter(None, [_user_peak, *_scopes]):
+        cell[0] = max(cell[0], peak)
+
+
+def start_tracing(frames=1):
+    global _user_peak
+    with _tracing_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        if _user_peak is None:
+            _user_peak = [0]
+
+
+def stop_tracing():
+    """Stop user tracing; the tracer keeps running until running measurements finish."""
+    global _user_peak
+    with _tracing_lock:
+        _user_peak = None
+        if not _scopes and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def traced_memory() -> dict:
+    """Current and peak traced memory, or ``{}`` when user tracing is off."""
+    with _tracing_lock:
+        if _user_peak is None:
+            return {}
+        current, peak = tracemalloc.get_traced_memory()
+        return {"current_bytes": current, "peak_bytes": max(peak, _user_peak[0])}
+
+
+@contextmanager
+def measure_peak():
+    """
+    Yield a dict whose ``peak_bytes`` is set on exit to the peak memory
+    allocated inside the block. Neither the peak reported by
+    ``traced_memory`` nor the user's tracing setting is disturbed.
+    """
+    cell, result = [0], {"peak_bytes": 0}
+    with _tracing_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _fold_peak()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        _scopes.append(cell)
+    try:
+        yield result
+    finally:
+        with _tracing_lock:
+            _scopes.remove(cell)
+            result["peak_bytes"] = max(max(cell[0], tracemalloc.get_traced_memory()[1]) - baseline, 0)
+            if not _scopes and _user_peak is None:
+                tracemalloc.stop()
+
+
+def memory_snapshot(top=15) -> pd.DataFrame:
+    """Largest allocation sites (file:line) currently held, from a tracemalloc snapshot."""
+    if not tracemalloc.is_tracing():
+        return pd.DataFrame(columns=["location", "size_mb", "blocks"])
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    stats = snapshot.statistics("lineno")[:top]
+    return pd.DataFrame([{
+        "location": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+        "size_mb": s.size / 1024 ** 2,
+        "blocks": s.count,
+    } for s in stats], columns=["location", "size_mb", "blocks"])
+
+
+if os.environ.get("BPD_TRACEMALLOC") == "1":
+    start_tracing()
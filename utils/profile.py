@@ -0,0 +1,194 @@
+"""
+One-pass dataset profiling.
+
+A dataset is profiled once, when it is uploaded: column kinds, null
+counts, cardinality, min/max, which columns hold dates and which numeric
+columns look like revenue. The statistics are computed frame-wide
+(``isna().sum()``, ``nunique()``, ``min()``/``max()``) over at most
+``SAMPLE_ROWS`` uniformly sampled rows. Profiles of stored datasets are
+written as JSON next to the Arrow file and kept in the ``profiles``
+namespace of the shared cache, so pages read column choices from the
+profile instead of rescanning the data on every rerun.
+"""
+import json
+import os
+import tempfile
+import warnings
+from dataclasses import asdict, dataclass, field
+
+import pandas as pd
+
+from .cache import get_cache, namespace
+from .ingest import CATEGORY_RATIO, _looks_like_dates
+from .perf import timed
+from .store import DatasetHandle, dataset_key, dataset_len, get_store, sample_dataset
+
+SAMPLE_ROWS = 100_000
+PROFILES = namespace("profiles", max_entries=256)
+REVENUE_HINTS = ("revenue", "amount", "sales", "total", "price", "value", "income")
+NUMERIC_KINDS = ("integer", "float")
+CATEGORICAL_KINDS = ("category", "string", "bool")
+
+
+@dataclass
+class ColumnProfile:
+    name: str
+    dtype: str
+    kind: str  # integer, float, bool, datetime, category or string
+    nulls: int
+    distinct: int
+    min: object = None
+    max: object = None
+
+
+@dataclass
+class DatasetProfile:
+    n_rows: int
+    profiled_rows: int
+    columns: list = field(default_factory=list)
+    date_columns: list = field(default_factory=list)
+    revenue_columns: list = field(default_factory=list)
+
+    def __getitem__(self, name) -> ColumnProfile:
+        return next(column for column in self.columns if column.name == name)
+
+    @property
+    def sampled(self) -> bool:
+        return self.profiled_rows < self.n_rows
+
+    def names(self, *kinds) -> list:
+        return [column.name for column in self.columns if column.kind in kinds]
+
+    @property
+    def numeric_columns(self) -> list:
+        return self.names(*NUMERIC_KINDS)
+
+    @property
+    def categorical_columns(self) -> list:
+        return self.names(*CATEGORICAL_KINDS)
+
+    def null_fraction(self, name) -> float:
+        return self[name].nulls / self.profiled_rows if self.profiled_rows else 0.0
+
+    def table(self) -> pd.DataFrame:
+        """One row per column, for display."""
+        frame = pd.DataFrame([asdict(column) for column in self.columns])
+        frame.insert(4, "null_pct", frame["nulls"] / max(self.profiled_rows, 1) * 100)
+        return frame
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data) -> "DatasetProfile":
+        return cls(**{**data, "columns": [ColumnProfile(**column) for column in data["columns"]]})
+
+
+def _kind(series: pd.Series, non_null, distinct) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "integer"
+    if pd.api.types.is_float_dtype(series):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return "category"
+    if _looks_like_dates(series.name, series.dropna().head(1_000)):
+        return "datetime"
+    return "category" if non_null and distinct <= max(1, non_null * CATEGORY_RATIO) else "string"
+
+
+def _scalar(value):
+    """JSON-safe form of a min/max value."""
+    if value is None or pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if hasattr(value, "item") else value
+
+
+def _revenue_rank(column: ColumnProfile, n_rows) -> tuple:
+    name = str(column.name).lower()
+    hint = next((i for i, h in enumerate(REVENUE_HINTS) if h in name), len(REVENUE_HINTS))
+    # Integer columns with a distinct value per row are usually identifiers
+    identifier = column.kind == "integer" and column.distinct >= n_rows - column.nulls
+    return hint, identifier, column.kind != "float", column.nulls
+
+
+@timed("profile.compute")
+def profile_frame(df: pd.DataFrame, n_rows=None, sample_rows=SAMPLE_ROWS, seed=0) -> DatasetProfile:
+    """
+    Profile ``df`` (already a sample of ``n_rows`` rows, if given); frames
+    longer than ``sample_rows`` are sampled first.
+    """
+    n_rows = len(df) if n_rows is None else n_rows
+    if len(df) > sample_rows:
+        df = df.sample(sample_rows, random_state=seed)
+    nulls = df.isna().sum()
+    distinct = df.nunique(dropna=True)
+    kinds = {col: _kind(df[col], len(df) - nulls[col], distinct[col]) for col in df.columns}
+
+    ordered = [col for col, kind in kinds.items() if kind in (*NUMERIC_KINDS, "datetime")]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        # Text dates are parsed once here, so their range is comparable
+        ordered_frame = df[ordered].apply(
+            lambda s: pd.to_datetime(s, errors="coerce") if kinds[s.name] == "datetime" else s
+        ) if ordered else pd.DataFrame()
+    mins, maxs = ordered_frame.min(), ordered_frame.max()
+
+    columns = [
+        ColumnProfile(
+            name=col, dtype=str(df[col].dtype), kind=kinds[col], nulls=int(nulls[col]), distinct=int(distinct[col]),
+            min=_scalar(mins.get(col)), max=_scalar(maxs.get(col)),
+        )
+        for col in df.columns
+    ]
+    numeric = [column for column in columns if column.kind in NUMERIC_KINDS and column.nulls < len(df)]
+    return DatasetProfile(
+        n_rows=n_rows,
+        profiled_rows=len(df),
+        columns=columns,
+        date_columns=[column.name for column in columns if column.kind == "datetime"],
+        revenue_columns=[column.name for column in sorted(numeric, key=lambda c: _revenue_rank(c, len(df)))],
+    )
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return DatasetProfile.from_dict(json.load(f))
+    except (FileNotFoundError, ValueError, TypeError, KeyError):
+        return None
+
+
+def _write(path, profile: DatasetProfile):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(profile.to_dict(), f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def get_profile(dataset, sample_rows=SAMPLE_ROWS) -> DatasetProfile:
+    """
+    Profile of a session dataset. Stored datasets are profiled once and the
+    result saved beside the data; only the sampled rows are materialized.
+    """
+    def compute():
+        if not isinstance(dataset, DatasetHandle):
+            return profile_frame(dataset, sample_rows=sample_rows)
+        path = get_store().profile_path(dataset.key)
+        profile = _read(path)
+        if profile is None:
+            profile = profile_frame(sample_dataset(dataset, sample_rows), dataset_len(dataset), sample_rows)
+            _write(path, profile)
+        return profile
+
+    return get_cache().get_or_set(PROFILES, dataset_key(dataset), compute)
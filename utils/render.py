@@ -0,0 +1,112 @@
+"""
+Rendering helpers that keep chart and table payloads bounded.
+
+Series are downsampled to about as many points as a chart has pixels
+before they are sent to the browser: ``lttb`` (largest triangle three
+buckets) keeps the visual shape of a line, ``minmax`` keeps every bucket's
+extremes so spikes survive. Tables are shown a page at a time through
+``page_bounds``/``load_dataset(offset=...)``. Matplotlib figures are
+rendered once to PNG and kept in the ``figures`` namespace of the shared
+cache, so reruns reuse the image instead of redrawing.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from .cache import get_cache, namespace
+
+MAX_POINTS = 1_500
+PAGE_SIZES = (50, 100, 500, 1_000)
+FIGURES = namespace("figures", max_entries=64)
+
+
+def lttb_indices(x, y, n_out) -> np.ndarray:
+    """Positions of the ``n_out`` points LTTB keeps from ``x``/``y`` (sorted by ``x``, no NaNs)."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # First and last points are always kept; the rest is split into n_out - 2 buckets.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out) -> np.ndarray:
+    """Positions of the minimum and maximum of each of ``n_out // 2`` equal buckets, in order."""
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+    picks = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+        bucket = y[start:stop]
+        picks += [start + int(bucket.argmin()), start + int(bucket.argmax())]
+    return np.unique(picks)
+
+
+def _x_values(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8
+    if pd.api.types.is_numeric_dtype(index):
+        return index.to_numpy()
+    return np.arange(len(index))
+
+
+def downsample(series: pd.Series, max_points=MAX_POINTS, method="lttb") -> pd.Series:
+    """
+    ``series`` reduced to at most ``max_points`` points with ``method``
+    (``"lttb"`` or ``"minmax"``). The index may be numeric or datetime; it
+    is sorted and missing values are dropped first.
+    """
+    series = series.dropna().sort_index()
+    if len(series) <= max_points:
+        return series
+    if method == "minmax":
+        positions = minmax_indices(series.to_numpy(), max_points)
+    elif method == "lttb":
+        positions = lttb_indices(_x_values(series.index), series.to_numpy(), max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return series.iloc[positions]
+
+
+def page_bounds(n_rows, page, page_size) -> tuple:
+    """``(offset, rows, pages)`` for 1-based ``page``, clamped to the data."""
+    pages = max(1, -(-n_rows // page_size))
+    page = min(max(1, page), pages)
+    offset = (page - 1) * page_size
+    return offset, min(page_size, max(0, n_rows - offset)), pages
+
+
+def figure_png(key, draw, dpi=100, ttl=None) -> bytes:
+    """
+    PNG bytes of the Matplotlib figure ``draw()`` returns, rendered once per
+    ``key`` and cached (for ``ttl`` seconds, if given); the figure is closed
+    after rendering.
+    """
+    def render():
+        import matplotlib.pyplot as plt
+
+        fig = draw()
+        try:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+            return buffer.getvalue()
+        finally:
+            plt.close(fig)
+
+    return get_cache().get_or_set(FIGURES, key, render, ttl)
@@ -0,0 +1,415 @@
+"""
+Background email reports.
+
+Report jobs live in a SQLite queue (``data/jobs.sqlite``) so they survive
+restarts. Worker threads claim due jobs, render the attachment with the
+streaming export engine and deliver it through a per-thread SMTP
+connection that stays logged in across messages. Failed sends are retried
+with exponential backoff; jobs with a ``daily`` or ``weekly`` schedule are
+re-queued for their next run after each delivery.
+
+For local testing, point the SMTP settings at a stand-in server such as
+``python -m aiosmtpd -n -l localhost:8025`` with ``use_tls=False`` and no
+credentials.
+"""
+import json
+import logging
+import os
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from email.message import EmailMessage
+
+import pandas as pd
+
+DATA_DIR = os.environ.get("BPD_DATA_DIR", "data")
+QUEUE_PATH = os.path.join(DATA_DIR, "jobs.sqlite")
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_CAP_SECONDS = 3600
+MESSAGES_PER_CONNECTION = 100
+RENDER_TTL_SECONDS = 3600
+POLL_SECONDS = 1.0
+SCHEDULES = {"daily": 24 * 3600, "weekly": 7 * 24 * 3600}
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts, base=RETRY_BASE_SECONDS, cap=RETRY_CAP_SECONDS) -> float:
+    """Exponential backoff with jitter for the ``attempts``-th failure."""
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class JobQueue:
+    """Persistent queue of report jobs with claim / complete / fail semantics."""
+
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL,"
+                " status TEXT NOT NULL DEFAULT 'queued', schedule TEXT, run_at REAL NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, created REAL, updated REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, run_at)")
+        return self._conn
+
+    def enqueue(self, payload: dict, run_at=None, schedule=None) -> int:
+        if schedule is not None and schedule not in SCHEDULES:
+            raise ValueError(f"Unknown schedule: {schedule}")
+        now = time.time()
+        with self._lock:
+            cursor = self._connect().execute(
+                "INSERT INTO jobs (payload, schedule, run_at, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (json.dumps(payload), schedule, run_at or now, now, now),
+            )
+            return cursor.lastrowid
+
+    def claim(self):
+        """Mark the oldest due job as running and return ``(id, payload, schedule)``, or ``None``."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, payload, schedule FROM jobs WHERE status = 'queued' AND run_at <= ?"
+                    " ORDER BY run_at, id LIMIT 1", (now,)
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?", (now, row[0]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return None if row is None else (row[0], json.loads(row[1]), row[2])
+
+    def complete(self, job_id, schedule=None):
+        """Finish a job; scheduled jobs are queued again for their next run."""
+        now = time.time()
+        with self._lock:
+            if schedule:
+                self._connect().execute(
+                    "UPDATE jobs SET status = 'queued', run_at = ?, attempts = 0, last_error = NULL, updated = ?"
+                    " WHERE id = ?", (now + SCHEDULES[schedule], now, job_id),
+                )
+            else:
+                self._connect().execute("UPDATE jobs SET status = 'done', updated = ? WHERE id = ?", (now, job_id))
+
+    def fail(self, job_id, error):
+        """Record a failure; retry with backoff until ``MAX_ATTEMPTS`` is reached."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            (attempts,) = conn.execute("SELECT attempts + 1 FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            status = "failed" if attempts >= MAX_ATTEMPTS else "queued"
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, run_at = ?, last_error = ?, updated = ? WHERE id = ?",
+                (status, attempts, now + retry_delay(attempts), str(error), now, job_id),
+            )
+
+    def cancel(self, job_id):
+        with self._lock:
+            self._connect().execute(
+                "UPDATE jobs SET status = 'cancelled', updated = ? WHERE id = ? AND status != 'running'",
+                (time.time(), job_id),
+            )
+
+    def recover(self):
+        """Requeue jobs left ``running`` by a process that stopped mid-send."""
+        with self._lock:
+            self._connect().execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+
+    def jobs(self, limit=50) -> pd.DataFrame:
+        """Most recent jobs for display."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT id, payload, status, schedule, run_at, attempts, last_error FROM jobs"
+                " ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        frame = pd.DataFrame(rows, columns=["id", "payload", "status", "schedule", "run_at", "attempts", "last_error"])
+        payloads = frame.pop("payload").map(json.loads)
+        frame.insert(1, "to", payloads.map(lambda p: p.get("to")))
+        frame.insert(2, "subject", payloads.map(lambda p: p.get("subject")))
+        frame["run_at"] = pd.to_datetime(frame["run_at"], unit="s")
+        return frame
+
+
+@dataclass(frozen=True)
+class SMTPConfig:
+    host: str
+    port: int = 587
+    sender: str = ""
+    username: str = None
+    password: str = None
+    use_tls: bool = True
+
+    @classmethod
+    def from_secrets(cls, secrets):
+        """Settings from the app secrets (``EMAIL``, ``EMAIL_PASSWORD``, ``SMTP_SERVER``, ``SMTP_PORT``, optional ``SMTP_TLS``)."""
+        return cls(
+            host=secrets["SMTP_SERVER"],
+            port=int(secrets["SMTP_PORT"]),
+            sender=secrets["EMAIL"],
+            username=secrets.get("EMAIL"),
+            password=secrets.get("EMAIL_PASSWORD"),
+            use_tls=parse_flag(secrets.get("SMTP_TLS", True)),
+        )
+
+
+def parse_flag(value) -> bool:
+    """A boolean setting given as a bool, number or string such as ``"false"`` or ``"yes"``."""
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in ("1", "true", "yes", "on"):
+            return True
+        if text in ("0", "false", "no", "off", ""):
+            return False
+        raise ValueError(f"Not a boolean setting: {value!r}")
+    return bool(value)
+
+
+class SMTPPool:
+    """
+    One logged-in SMTP connection per thread, reused for up to
+    ``MESSAGES_PER_CONNECTION`` messages and reopened if the server drops it.
+    """
+
+    def __init__(self, config: SMTPConfig, timeout=30):
+        self.config = config
+        self.timeout = timeout
+        self.logins = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        server = smtplib.SMTP(self.config.host, self.config.port, timeout=self.timeout)
+        if self.config.use_tls:
+            server.starttls()
+        if self.config.username and self.config.password:
+            server.login(self.config.username, self.config.password)
+        with self._lock:
+            self.logins += 1
+        return server
+
+    def _connection(self):
+        local = self._local
+        if getattr(local, "server", None) is None or local.sent >= MESSAGES_PER_CONNECTION:
+            self.close()
+            local.server, local.sent = self._open(), 0
+        return local.server
+
+    def send(self, msg: EmailMessage, recipients):
+        """Send ``msg`` to every address in ``recipients`` in one transaction."""
+        for attempt in range(2):
+            server = self._connection()
+            try:
+                server.send_message(msg, to_addrs=list(recipients))
+                self._local.sent += 1
+                return
+            except smtplib.SMTPServerDisconnected:
+                # Idle connections get dropped by the server; reconnect once.
+                self._local.server = None
+                if attempt:
+                    raise
+
+    def close(self):
+        """Close this thread's connection, if any."""
+        server = getattr(self._local, "server", None)
+        self._local.server = None
+        if server is not None:
+            try:
+                server.quit()
+            except smtplib.SMTPException:
+                server.close()
+
+
+def build_message(config: SMTPConfig, payload: dict, attachment_path, filename) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = config.sender
+    # Batched recipients only go in the envelope, so they don't see each other's addresses.
+    msg["To"] = payload["to"][0] if len(payload["to"]) == 1 else "undisclosed-recipients:;"
+    msg["Subject"] = payload["subject"]
+    msg.set_content(payload.get("body", ""))
+    with open(attachment_path, "rb") as fh:
+        msg.add_attachment(fh.read(), maintype="application", subtype="octet-stream", filename=filename)
+    return msg
+
+
+class ReportWorkers:
+    """
+    Threads that drain a ``JobQueue``. Attachments are rendered once per
+    (dataset, format, currency) and reused for an hour by every job that
+    needs them.
+    """
+
+    def __init__(self, config: SMTPConfig, queue=None, threads=2, poll_seconds=POLL_SECONDS):
+        self.config = config
+        self.queue = queue or JobQueue()
+        self.pool = SMTPPool(config)
+        self.poll_seconds = poll_seconds
+        self._threads = [threading.Thread(target=self._loop, name=f"bpd-report-{i}", daemon=True)
+                         for i in range(threads)]
+        self._stop = threading.Event()
+        self._rendered = {}
+        self._render_lock = threading.Lock()
+        self._building = {}  # one lock per attachment key, so only builds of the same attachment wait
+
+    def start(self, recover=True):
+        """
+        Start the threads. ``recover`` requeues jobs left running by a
+        previous process; workers replacing others in this process pass
+        ``False``, since the old threads may still be sending those jobs.
+        """
+        if recover:
+            self.queue.recover()
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        with self._render_lock:
+            for path, _ in self._rendered.values():
+                _remove(path)
+            self._rendered.clear()
+
+    def _build(self, payload) -> str:
+        from .export import convert_chunks, export_to_tempfile
+        from .store import get_store, iter_dataset
+
+        handle = get_store().get(payload["dataset"])
+        if handle is None:
+            raise FileNotFoundError(f"Dataset {payload['dataset']} is no longer stored")
+        chunks = convert_chunks(iter_dataset(handle), payload.get("currency", "USD"))
+        return export_to_tempfile(chunks, payload["format"])
+
+    def render(self, payload) -> str:
+        """Path of the attachment for ``payload``, building it on first use."""
+        key = (payload["dataset"], payload["format"], payload.get("currency", "USD"))
+        with self._render_lock:
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            with self._render_lock:
+                path, rendered_at = self._rendered.get(key, (None, 0))
+            if path and os.path.exists(path) and time.monotonic() - rendered_at < RENDER_TTL_SECONDS:
+                return path
+            if path:
+                _remove(path)
+            path = self._build(payload)
+            with self._render_lock:
+                self._rendered[key] = (path, time.monotonic())
+            return path
+
+    def run_once(self) -> bool:
+        """Process one due job; ``False`` when there was nothing to do."""
+        from .export import FORMATS
+
+        claimed = self.queue.claim()
+        if claimed is None:
+            return False
+        job_id, payload, schedule = claimed
+        try:
+            path = self.render(payload)
+            filename = f"smart_insights_data{FORMATS[payload['format']][1]}"
+            self.pool.send(build_message(self.config, payload, path, filename), payload["to"])
+        except Exception as e:
+            self.queue.fail(job_id, e)
+        else:
+            self.queue.complete(job_id, schedule)
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                busy = self.run_once()
+            except Exception:
+                busy = False
+            if not busy:
+                # Log out while idle instead of holding the connection open.
+                self.pool.close()
+                self._stop.wait(self.poll_seconds)
+        self.pool.close()
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+_queue = None
+_workers = None
+_workers_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    global _queue
+    with _workers_lock:
+        if _queue is None:
+            _queue = JobQueue()
+        return _queue
+
+
+def ensure_workers(config: SMTPConfig, threads=2) -> ReportWorkers:
+    """Start the shared report workers once per process (restarting them if the SMTP settings change)."""
+    global _workers
+    queue = get_queue()
+    with _workers_lock:
+        if _workers is None or _workers.config != config:
+            restart = _workers is not None
+            if restart:
+                _workers.stop(timeout=5)
+            # Jobs the old threads still hold finish on those threads; requeuing them would send them twice
+            _workers = ReportWorkers(config, queue, threads).start(recover=not restart)
+        return _workers
+
+
+def start_workers_from_secrets(secrets, threads=2):
+    """
+    Start the report workers at app startup when SMTP settings are present,
+    so scheduled jobs already in the queue run after a restart. Returns the
+    workers, or ``None`` when email isn't configured or the settings are invalid.
+    """
+    try:
+        config = SMTPConfig.from_secrets(secrets)
+    except (KeyError, FileNotFoundError):
+        return None
+    except ValueError as e:
+        logger.warning("Email reports disabled, invalid SMTP settings: %s", e)
+        return None
+    return ensure_workers(config, threads)
+
+
+def enqueue_report(dataset_key, recipients, subject, body="", fmt="xlsx", currency="USD", schedule=None,
+                   batch_size=50) -> list:
+    """
+    Queue a report for ``recipients``. Recipients are grouped into jobs of
+    up to ``batch_size`` addresses, each sent as one message. Returns the job ids.
+    """
+    recipients = [r.strip() for r in recipients if r and r.strip()]
+    if not recipients:
+        raise ValueError("At least one recipient is required")
+    queue = get_queue()
+    return [
+        queue.enqueue({
+            "dataset": dataset_key, "to": recipients[i:i + batch_size], "subject": subject,
+            "body": body, "format": fmt, "currency": currency,
+        }, schedule=schedule)
+        for i in range(0, len(recipients), batch_size)
+    ]
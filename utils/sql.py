@@ -0,0 +1,149 @@
+"""
+Optional DuckDB query engine over stored datasets.
+
+Stored datasets are Arrow IPC files; DuckDB scans them through a
+``pyarrow.dataset`` so only the columns a query names are read
+(projection pushdown) and filters are applied during the scan (predicate
+pushdown). Aggregations run out of core: DuckDB streams the file and
+spills to ``data/duckdb`` when a query needs more than ``BPD_DUCKDB_MEMORY``,
+so Dashboard KPIs and ML Insights samples work on datasets larger than RAM.
+Everything here returns the same types as the pandas path, so pages can
+switch engines without changing what they render.
+"""
+import importlib.util
+import os
+
+import pandas as pd
+
+from .aggregates import RevenueAggregates
+from .store import DatasetHandle
+
+HAS_DUCKDB = importlib.util.find_spec("duckdb") is not None
+
+DATA_DIR = os.environ.get("BPD_DATA_DIR", "data")
+SPILL_DIR = os.path.join(DATA_DIR, "duckdb")
+MEMORY_LIMIT = os.environ.get("BPD_DUCKDB_MEMORY", "1GB")
+ENGINES = {"pandas": "pandas", "duckdb": "DuckDB"}
+FILTER_OPS = ("=", "!=", "<", "<=", ">", ">=")
+
+
+def available_engines() -> list:
+    return [name for name in ENGINES if name != "duckdb" or HAS_DUCKDB]
+
+
+def quote(name) -> str:
+    """SQL identifier for a column name."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def connect(memory_limit=MEMORY_LIMIT):
+    """New in-memory DuckDB connection with a memory limit and a spill directory."""
+    import duckdb
+
+    os.makedirs(SPILL_DIR, exist_ok=True)
+    return duckdb.connect(config={"memory_limit": memory_limit, "temp_directory": SPILL_DIR})
+
+
+def _register(con, dataset, name="data"):
+    if isinstance(dataset, DatasetHandle):
+        import pyarrow.dataset as ds
+
+        con.register(name, ds.dataset(dataset.path, format="ipc"))
+    else:
+        con.register(name, dataset)
+    return name
+
+
+def query(dataset, sql, params=None) -> pd.DataFrame:
+    """Run ``sql`` against the dataset registered as the ``data`` view."""
+    con = connect()
+    try:
+        _register(con, dataset)
+        return con.execute(sql, params or []).df()
+    finally:
+        con.close()
+
+
+def revenue_aggregates(dataset, date_col, revenue_col) -> RevenueAggregates:
+    """
+    ``RevenueAggregates`` computed in one SQL pass over two columns. Values
+    that don't cast to a timestamp or number are counted as invalid rows,
+    like ``pd.to_datetime``/``pd.to_numeric`` with ``errors="coerce"``.
+    """
+    daily = query(dataset, f"""
+        WITH typed AS (
+            SELECT TRY_CAST({quote(date_col)} AS TIMESTAMP) AS ts, TRY_CAST({quote(revenue_col)} AS DOUBLE) AS amount
+            FROM data
+        )
+        SELECT date_trunc('day', ts) AS day,
+               SUM(amount) FILTER (WHERE ts IS NOT NULL AND amount IS NOT NULL) AS revenue,
+               COUNT(*) FILTER (WHERE ts IS NOT NULL AND amount IS NOT NULL) AS rows,
+               COUNT(*) FILTER (WHERE ts IS NULL OR amount IS NULL) AS invalid
+        FROM typed
+        GROUP BY day
+        ORDER BY day
+    """)
+    invalid = int(daily["invalid"].sum())
+    daily = daily[daily["rows"] > 0].set_index(pd.DatetimeIndex(daily.loc[daily["rows"] > 0, "day"]))
+    daily.index.name = None
+    return RevenueAggregates(daily["revenue"].astype(float), daily["rows"].astype("int64"), invalid)
+
+
+def parse_filter_value(dtype, value):
+    """
+    ``value`` (text from a widget) as the Python type a column of ``dtype``
+    compares against, so DuckDB never has to cast a bound VARCHAR. Raises
+    ``ValueError`` when it doesn't fit the column.
+    """
+    text = str(value).strip()
+    if pd.api.types.is_bool_dtype(dtype):
+        if text.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(f"expected true or false, got {value!r}")
+        return text.lower() in ("true", "1")
+    if pd.api.types.is_integer_dtype(dtype):
+        number = float(text)
+        return int(number) if number.is_integer() else number
+    if pd.api.types.is_numeric_dtype(dtype):
+        return float(text)
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        timestamp = pd.Timestamp(text)
+        if pd.isna(timestamp):
+            raise ValueError(f"expected a date, got {value!r}")
+        return timestamp.to_pydatetime()
+    return value
+
+
+def _where(filters) -> tuple:
+    clauses, params = [], []
+    for column, op, value in filters or []:
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        clauses.append(f"{quote(column)} {op} ?")
+        params.append(value)
+    return clauses, params
+
+
+def select_rows(dataset, columns, filters=None, not_null=(), sample_rows=None, seed=42) -> pd.DataFrame:
+    """
+    ``columns`` of the rows matching ``filters`` (``(column, op, value)``
+    triples, ANDed; values are bound as parameters) with no NULL in
+    ``not_null``, optionally a reproducible reservoir sample of
+    ``sample_rows`` rows. Only the selected columns and rows are
+    materialized; a column listed twice is selected once.
+    """
+    columns = list(dict.fromkeys(columns))
+    clauses, params = _where(filters)
+    clauses += [f"{quote(column)} IS NOT NULL" for column in not_null]
+    sql = f"SELECT {', '.join(quote(c) for c in columns)} FROM data"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    if sample_rows:
+        # The sample clause binds to the filtered subquery, not the raw table.
+        sql = f"SELECT * FROM ({sql}) USING SAMPLE reservoir({int(sample_rows)} ROWS) REPEATABLE ({int(seed)})"
+    return query(dataset, sql, params)
+
+
+def count_rows(dataset, filters=None) -> int:
+    clauses, params = _where(filters)
+    sql = "SELECT COUNT(*) AS n FROM data" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+    return int(query(dataset, sql, params)["n"].iloc[0])
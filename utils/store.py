@@ -0,0 +1,206 @@
+"""
+Content-addressed on-disk dataset store.
+
+Uploaded datasets are written once as uncompressed Arrow IPC files named by
+the SHA-256 of their content, so identical uploads share one file and
+sessions only keep a small ``DatasetHandle``. Reads memory-map the file and
+materialize just the requested columns.
+"""
+import hashlib
+import os
+import tempfile
+import weakref
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .cache import get_cache, namespace
+
+DATA_DIR = os.environ.get("BPD_DATA_DIR", "data")
+HASH_BLOCK = 1 << 20
+CHUNK_ROWS = 50_000
+SCHEMAS = namespace("schemas", max_entries=256)
+_frame_keys = {}  # id of an in-memory session frame -> its content hash, dropped when the frame is collected
+
+
+@dataclass(frozen=True)
+class DatasetHandle:
+    """Reference to a stored dataset; cheap to keep in session state."""
+    key: str
+    path: str
+    columns: tuple
+    n_rows: int
+
+
+def hash_file(fileobj) -> str:
+    """SHA-256 of a binary file-like object, read in blocks from the start."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(HASH_BLOCK), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame's values, column names and dtypes."""
+    digest = hashlib.sha256()
+    digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class DatasetStore:
+    def __init__(self, root=None):
+        self.root = root or os.path.join(DATA_DIR, "store")
+
+    def path_for(self, key) -> str:
+        return os.path.join(self.root, f"{key}.arrow")
+
+    def get(self, key):
+        """Handle for ``key`` if it is already stored, else ``None``."""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return None
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+            return DatasetHandle(key, path, tuple(table.column_names), table.num_rows)
+
+    def put(self, df: pd.DataFrame, key=None) -> DatasetHandle:
+        """Store ``df`` under ``key`` (its content hash by default); no-op if present."""
+        key = key or hash_frame(df)
+        existing = self.get(key)
+        if existing is not None:
+            return existing
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Write to a temp file and rename so concurrent readers never see a partial file.
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, self.path_for(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return DatasetHandle(key, self.path_for(key), tuple(table.column_names), table.num_rows)
+
+    def read(self, handle, columns=None, limit=None, offset=0) -> pd.DataFrame:
+        """Memory-mapped read of ``handle``, materializing only ``columns`` (and ``limit`` rows from ``offset``)."""
+        with pa.memory_map(handle.path) as source:
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(list(columns))
+            if limit is not None or offset:
+                table = table.slice(offset, limit)
+            return table.to_pandas()
+
+    def sample(self, handle, n_rows, seed=0) -> pd.DataFrame:
+        """``n_rows`` rows of ``handle`` picked uniformly at random, in file order."""
+        with pa.memory_map(handle.path) as source:
+            table = pa.ipc.open_file(source).read_all()
+            rows = np.sort(np.random.default_rng(seed).choice(table.num_rows, min(n_rows, table.num_rows), replace=False))
+            return table.take(pa.array(rows)).to_pandas()
+
+    def iter_chunks(self, handle, columns=None, chunk_rows=CHUNK_ROWS):
+        """Yield ``handle``'s rows as DataFrames of at most ``chunk_rows`` rows."""
+        with pa.memory_map(handle.path) as source:
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(list(columns))
+            for batch in table.to_batches(max_chunksize=chunk_rows):
+                yield batch.to_pandas()
+
+    def append(self, handle, rows: pd.DataFrame) -> DatasetHandle:
+        """Store ``handle``'s data followed by ``rows`` as a new dataset."""
+        key = hashlib.sha256(f"{handle.key}+{hash_frame(rows)}".encode()).hexdigest()
+        existing = self.get(key)
+        if existing is not None:
+            return existing
+        combined = pd.concat([self.read(handle), rows], ignore_index=True)
+        return self.put(combined, key)
+
+    def schema(self, handle) -> pd.DataFrame:
+        """Empty frame with the dataset's columns and pandas dtypes."""
+        def read_schema():
+            with pa.memory_map(handle.path) as source:
+                return pa.ipc.open_file(source).schema.empty_table().to_pandas()
+
+        return get_cache().get_or_set(SCHEMAS, handle.key, read_schema)
+
+    def profile_path(self, key) -> str:
+        return os.path.join(self.root, f"{key}.profile.json")
+
+    def delete(self, key):
+        get_cache().delete(SCHEMAS, key)
+        for path in (self.path_for(key), self.profile_path(key)):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+_store = None
+
+
+def get_store() -> DatasetStore:
+    global _store
+    if _store is None:
+        _store = DatasetStore()
+    return _store
+
+
+def load_dataset(dataset, columns=None, limit=None, offset=0) -> pd.DataFrame:
+    """Resolve a session dataset (handle or in-memory frame) to a DataFrame, optionally a window of its rows."""
+    if isinstance(dataset, DatasetHandle):
+        return get_store().read(dataset, columns, limit, offset)
+    data = dataset if columns is None else dataset[list(columns)]
+    if limit is None and not offset:
+        return data
+    return data.iloc[offset:None if limit is None else offset + limit]
+
+
+def sample_dataset(dataset, n_rows, seed=0) -> pd.DataFrame:
+    """Uniform random sample of at most ``n_rows`` rows of a session dataset, in row order."""
+    if dataset_len(dataset) <= n_rows:
+        return load_dataset(dataset)
+    if isinstance(dataset, DatasetHandle):
+        return get_store().sample(dataset, n_rows, seed)
+    return dataset.sample(n_rows, random_state=seed).sort_index()
+
+
+def iter_dataset(dataset, columns=None, chunk_rows=CHUNK_ROWS):
+    """Yield a session dataset in DataFrame chunks without materializing it whole."""
+    if isinstance(dataset, DatasetHandle):
+        yield from get_store().iter_chunks(dataset, columns, chunk_rows)
+        return
+    data = dataset if columns is None else dataset[list(columns)]
+    for start in range(0, len(data), chunk_rows):
+        yield data.iloc[start:start + chunk_rows]
+
+
+def dataset_key(dataset) -> str:
+    """
+    Stable content key for a session dataset. In-memory frames are hashed
+    once per object, not on every rerun, so they must not be mutated in place.
+    """
+    if isinstance(dataset, DatasetHandle):
+        return dataset.key
+    key = _frame_keys.get(id(dataset))
+    if key is None:
+        key = _frame_keys[id(dataset)] = hash_frame(dataset)
+        weakref.finalize(dataset, _frame_keys.pop, id(dataset), None)
+    return key
+
+
+def dataset_schema(dataset) -> pd.DataFrame:
+    """Zero-row frame describing a session dataset's columns and dtypes."""
+    if isinstance(dataset, DatasetHandle):
+        return get_store().schema(dataset)
+    return dataset.iloc[:0]
+
+
+def dataset_len(dataset) -> int:
+    return dataset.n_rows if isinstance(dataset, DatasetHandle) else len(dataset)
@@ -0,0 +1,34 @@
+import pandas as pd
+
+from .profile import DatasetProfile, profile_frame
+
+def get_filtered_data(df: pd.DataFrame) -> pd.DataFrame:
+    """Remove rows with missing values."""
+    # dropna already returns a new frame; copying first would double the memory
+    return df.dropna()
+
+def validate_profile(profile: DatasetProfile) -> list:
+    """Problems that stop a dataset being analysed; empty if it is usable."""
+    problems = []
+    if profile.n_rows == 0:
+        problems.append("The dataset has no rows.")
+    usable = [column for column in profile.columns if column.nulls < profile.profiled_rows]
+    if len(usable) < 2:
+        problems.append("The dataset needs at least two columns with values.")
+    return problems
+
+def dataset_warnings(profile: DatasetProfile) -> list:
+    """Non-fatal issues worth showing after an upload."""
+    warnings = []
+    if not profile.date_columns:
+        warnings.append("No date column detected; dashboards and forecasts need one.")
+    if not profile.revenue_columns:
+        warnings.append("No numeric column detected to use as revenue.")
+    empty = [str(column.name) for column in profile.columns if profile.profiled_rows and column.nulls == profile.profiled_rows]
+    if empty:
+        warnings.append(f"Columns with no values: {', '.join(empty)}.")
+    return warnings
+
+def is_valid_dataset(df: pd.DataFrame) -> bool:
+    """Check if uploaded data has the required structure."""
+    return not validate_profile(profile_frame(df))
@@ -0,0 +1,16 @@
+"""Streamlit widgets shared by several pages."""
+import streamlit as st
+
+from .sql import ENGINES, available_engines
+
+
+def query_engine(help=None):
+    """Sidebar choice of pandas or DuckDB; the choice is kept in session state across pages."""
+    engines = available_engines()
+    current = st.session_state.get("query_engine", "pandas")
+    engine = st.sidebar.selectbox(
+        "Query Engine", options=engines, index=engines.index(current) if current in engines else 0,
+        format_func=ENGINES.get, help=help,
+    )
+    st.session_state["query_engine"] = engine
+    return engine